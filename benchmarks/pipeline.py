@@ -0,0 +1,172 @@
+"""
+Замеры стадий конвейера parse -> analyze -> project на r.-6.-6.mca.
+
+    python -m benchmarks.pipeline --out results.json
+    python -m benchmarks.pipeline --tiles 3 --compare results.json --threshold 0.25
+
+--tiles N собирает мир из N x N копий региона, --compare завершает процесс с кодом 1,
+если медианное время на элемент какой-то стадии выросло больше чем на threshold относительно сохранённого прогона
+"""
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import numpy as np
+
+from mc_chunk_analyzer.domain.models.Chunk import Corners
+from mc_chunk_analyzer.domain.models.Region import RawRegion
+from mc_chunk_analyzer.domain.services.ChunkAnalyzer import McaParser, NBTTagReader, ChunkAnalyzer, ChunkLayout
+from mc_chunk_analyzer.domain.services.ChunkCache import decode_chunk
+from mc_chunk_analyzer.domain.services.Heightmaps import surface_ys
+from mc_chunk_analyzer.domain.services.WorldHandler import GroundProjector
+from mc_chunk_analyzer.domain.services.utils import ChunkManager
+
+SAMPLE = Path(__file__).resolve().parent.parent / "r.-6.-6.mca"
+TARGETS = ["minecraft:diamond_ore", "minecraft:deepslate_diamond_ore", "minecraft:iron_ore"]
+
+
+def tile_world(root: Path, tiles: int, sample: Path = SAMPLE) -> Corners:
+    """
+    Мир из tiles x tiles копий sample в root/region.
+    Координаты чанков берутся из имени файла, так что копии - полноценные разные регионы
+    :return: corners, покрывающие весь мир
+    """
+    region_dir = root / "region"
+    region_dir.mkdir(parents=True, exist_ok=True)
+    for rx in range(tiles):
+        for rz in range(tiles):
+            shutil.copyfile(sample, region_dir / f"r.{rx}.{rz}.mca")
+    return Corners(0, tiles * 32 - 1, 0, tiles * 32 - 1)
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Время fn в секундах: первый вызов - прогрев (компиляция numba), дальше repeat замеров"""
+    runs = []
+    fn()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return {"median": statistics.median(runs), "min": min(runs), "max": max(runs), "runs": repeat}
+
+
+def run(tiles: int = 1, repeat: int = 5, chunks: Optional[int] = None,
+        stages: Optional[List[str]] = None) -> Dict:
+    """
+    Все стадии на мире из tiles x tiles регионов.
+    :param chunks: сколько чанков брать для постадийных замеров (по умолчанию все чанки первого региона)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        corners = tile_world(root, tiles)
+        manager = ChunkManager(root, "Overworld")
+        paths = manager.region_files(corners)
+
+        raw_chunks = [c for c in manager.iter_chunks(Corners(0, 31, 0, 31), pad=0) if c.exists][:chunks]
+        data = [c.raw_data for c in raw_chunks]
+        sections = [ChunkLayout(d).as_sections(names_only=True) for d in data]
+        analyzers = [ChunkAnalyzer(s) for s in sections]
+        decoded = [decode_chunk(d) for d in data]
+        rng = np.random.default_rng(0)
+        cords = np.stack([rng.integers(0, 16, 256), rng.integers(-64, 320, 256), rng.integers(0, 16, 256)], 1)
+        all_chunks = manager.get_chunks(corners)
+
+        def parse():
+            for path in paths:
+                with RawRegion(path, "Overworld") as raw:
+                    McaParser().parse(raw)
+
+        benchmarks = {
+            "parse": (parse, len(paths)),
+            "nbt_read": (lambda: [NBTTagReader(d).read() for d in data], len(data)),
+            "chunk_layout": (lambda: [ChunkLayout(d).as_sections(names_only=True) for d in data], len(data)),
+            "analyzer_init": (lambda: [ChunkAnalyzer(s) for s in sections], len(sections)),
+            "get_block": (lambda: [a.get_block(*c) for a in analyzers[:10] for c in cords.tolist()], 10 * len(cords)),
+            "bulk_get_blocks": (lambda: [a.bulk_get_blocks(cords) for a in analyzers], len(analyzers)),
+            "find_blocks": (lambda: [a.find_blocks_in_area(TARGETS, -64, 320) for a in analyzers], len(analyzers)),
+            "heights": (lambda: surface_ys([d.heightmap() for d in decoded], [d.data_version for d in decoded],
+                                           [d.y_pos for d in decoded], "Overworld",
+                                           [d.height for d in decoded]), len(decoded)),
+            "project": (lambda: GroundProjector(all_chunks, cache=None).project(), len(all_chunks)),
+        }
+
+        results = {}
+        for name, (fn, items) in benchmarks.items():
+            if stages and name not in stages:
+                continue
+            result = measure(fn, repeat)
+            result["items"] = items
+            result["per_item_us"] = result["median"] / max(items, 1) * 1e6
+            results[name] = result
+
+    return {
+        "meta": {
+            "tiles": tiles,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Стадии, время которых на один элемент выросло больше чем в (1 + threshold) раз, в виде строк отчёта.
+    Сравнение на элемент, чтобы прогоны с разным --tiles были сопоставимы
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None or base["per_item_us"] <= 0:
+            continue
+        ratio = result["per_item_us"] / base["per_item_us"]
+        if ratio > 1 + threshold:
+            regressions.append(f"{name}: {base['per_item_us']:.1f} us -> {result['per_item_us']:.1f} us "
+                               f"per item (x{ratio:.2f})")
+    return regressions
+
+
+def report(current: Dict):
+    print(f"{'Stage':<16} | {'Median (ms)':>11} | {'Min (ms)':>9} | {'Items':>6} | {'Per item (us)':>13}")
+    print("-" * 68)
+    for name, r in current["results"].items():
+        print(f"{name:<16} | {r['median'] * 1e3:>11.2f} | {r['min'] * 1e3:>9.2f} | {r['items']:>6} | "
+              f"{r['per_item_us']:>13.1f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tiles", type=int, default=1, help="мир из N x N копий региона")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chunks", type=int, default=None, help="чанков для постадийных замеров")
+    parser.add_argument("--stage", action="append", dest="stages", help="только эти стадии")
+    parser.add_argument("--out", type=Path, help="сохранить результат в JSON")
+    parser.add_argument("--compare", type=Path, help="JSON прошлого прогона")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимый рост времени, 0.2 = 20%%")
+    args = parser.parse_args(argv)
+
+    current = run(args.tiles, args.repeat, args.chunks, args.stages)
+    report(current)
+    if args.out:
+        args.out.write_text(json.dumps(current, indent=2), encoding="utf-8")
+
+    if args.compare:
+        regressions = compare(current, json.loads(args.compare.read_text(encoding="utf-8")), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,5 @@
 from dataclasses import  dataclass
-from typing import Tuple, Literal, Optional, Union
+from typing import Tuple, Literal, Optional, Union, List
 from pathlib import  Path
 import numpy as np
 Dimensions = Literal["End", "Nether", "Overworld"]
@@ -73,6 +73,8 @@ class RawChunk:
     abs_cord: TwoDimCord
     raw_data: Union[bytes, None]
     dimension: Dimensions
+    region_mtime: int = 0  # mtime_ns файла региона, по нему устаревают закешированные разборы
+    region_path: Optional[Path] = None  # resolve() файла региона, None - чанк собран не из региона
 
     @property
     def exists(self) -> bool:
@@ -90,6 +92,253 @@ class RawChunk:
     def rel_cord(self) -> Tuple[int, int]:
         return self.abs_cord.x % 32, self.abs_cord.z % 32
 
+    @property
+    def cord(self) -> Tuple[int, int]:
+        return self.abs_cord.as_tuple
+
+
+# код измерения в колонке ChunkTable.dimension - индекс в этом кортеже
+DIMENSIONS: Tuple[Dimensions, ...] = ("Overworld", "Nether", "End")
+
+
+# eq=False: сгенерированные __eq__/__hash__ сравнивали бы ndarray-колонки и падали
+@dataclass(frozen=True, eq=False)
+class ChunkTable:
+    """
+    Чанки многих регионов колонками: строка на чанк, распакованные байты всех чанков подряд в data.
+    Фильтрация - маской по колонкам через select, объекты на чанк создаются только при обращении (ChunkView).
+    Отсутствующий чанк - строка с length == 0
+    """
+    x: np.ndarray             # (N,) int32, абсолютные координаты чанков
+    z: np.ndarray             # (N,) int32
+    dimension: np.ndarray     # (N,) uint8, индекс в DIMENSIONS
+    offset: np.ndarray        # (N,) int64, начало чанка в data
+    length: np.ndarray        # (N,) int64, длина распакованного чанка
+    region_mtime: np.ndarray  # (N,) int64, mtime_ns файла региона
+    region: np.ndarray        # (N,) int32, индекс файла региона в regions, -1 - неизвестен
+    data: Union[bytes, bytearray]  # общий буфер, после построения не меняется
+    regions: Tuple[Path, ...] = ()  # resolve() файлов регионов
+
+    @classmethod
+    def empty(cls) -> "ChunkTable":
+        return cls.from_chunks([])
+
+    @classmethod
+    def from_chunks(cls, chunks) -> "ChunkTable":
+        """Таблица из RawChunk (или любых объектов с тем же интерфейсом), байты копируются в один буфер"""
+        chunks = list(chunks)
+        data = bytearray()
+        offset = np.zeros(len(chunks), dtype=np.int64)
+        length = np.zeros(len(chunks), dtype=np.int64)
+        for i, chunk in enumerate(chunks):
+            offset[i] = len(data)
+            if chunk.raw_data:
+                data += chunk.raw_data
+                length[i] = len(chunk.raw_data)
+        cords = np.array([chunk.cord for chunk in chunks], dtype=np.int32).reshape(-1, 2)
+        regions = list(dict.fromkeys(chunk.region_path for chunk in chunks if chunk.region_path is not None))
+        index = {path: i for i, path in enumerate(regions)}
+        return cls(
+            x=cords[:, 0].copy(),
+            z=cords[:, 1].copy(),
+            dimension=np.array([DIMENSIONS.index(chunk.dimension) for chunk in chunks], dtype=np.uint8),
+            offset=offset,
+            length=length,
+            region_mtime=np.array([chunk.region_mtime for chunk in chunks], dtype=np.int64),
+            region=np.array([index.get(chunk.region_path, -1) for chunk in chunks], dtype=np.int32),
+            data=data,
+            regions=tuple(regions),
+        )
+
+    @classmethod
+    def stack(cls, tables: List["ChunkTable"], data: Union[bytes, bytearray]) -> "ChunkTable":
+        """Склейка таблиц, смещения которых уже указывают в общий буфер data"""
+        if not tables:
+            return cls.empty()
+        columns = {name: np.concatenate([getattr(t, name) for t in tables])
+                   for name in ("x", "z", "dimension", "offset", "length", "region_mtime")}
+        # индексы регионов каждой таблицы сдвигаются на число регионов предыдущих
+        bases = np.cumsum([0] + [len(t.regions) for t in tables[:-1]])
+        region = np.concatenate([np.where(t.region >= 0, t.region + base, -1) for t, base in zip(tables, bases)])
+        regions = tuple(path for t in tables for path in t.regions)
+        return cls(data=data, region=region.astype(np.int32), regions=regions, **columns)
+
+    @property
+    def present(self) -> np.ndarray:
+        """Маска существующих чанков"""
+        return self.length > 0
+
+    @property
+    def cords(self) -> np.ndarray:
+        """(N, 2) int32 (x, z)"""
+        return np.stack([self.x, self.z], axis=1)
+
+    def select(self, mask: np.ndarray) -> "ChunkTable":
+        """Строки по булевой маске или индексам, буфер общий"""
+        return ChunkTable(self.x[mask], self.z[mask], self.dimension[mask], self.offset[mask],
+                          self.length[mask], self.region_mtime[mask], self.region[mask], self.data, self.regions)
+
+    def raw(self, i: int) -> Union[memoryview, None]:
+        """
+        Распакованные байты чанка i: read-only memoryview поверх data, без копии.
+        Кому нужен именно bytes (поиск подстроки, NBTTagReader), копирует сам через bytes(...).
+        None если чанка нет
+        """
+        length = int(self.length[i])
+        if not length:
+            return None
+        start = int(self.offset[i])
+        return memoryview(self.data)[start:start + length].toreadonly()
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def __getitem__(self, i: int) -> "ChunkView":
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return ChunkView(self, i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield ChunkView(self, i)
+
+
+class ChunkView:
+    """Строка ChunkTable с интерфейсом RawChunk, для редкого доступа к отдельному чанку"""
+    __slots__ = ("table", "index")
+
+    def __init__(self, table: ChunkTable, index: int):
+        self.table = table
+        self.index = index
+
+    @property
+    def cord(self) -> Tuple[int, int]:
+        return int(self.table.x[self.index]), int(self.table.z[self.index])
+
+    @property
+    def abs_cord(self) -> TwoDimCord:
+        return TwoDimCord(self.cord)
+
+    @property
+    def rel_cord(self) -> Tuple[int, int]:
+        x, z = self.cord
+        return x % 32, z % 32
+
+    @property
+    def raw_data(self) -> Union[memoryview, None]:
+        """ChunkTable.raw: memoryview без копии, в отличие от bytes у RawChunk"""
+        return self.table.raw(self.index)
+
+    @property
+    def dimension(self) -> Dimensions:
+        return DIMENSIONS[self.table.dimension[self.index]]
+
+    @property
+    def region_mtime(self) -> int:
+        return int(self.table.region_mtime[self.index])
+
+    @property
+    def region_path(self) -> Optional[Path]:
+        region = int(self.table.region[self.index])
+        return self.table.regions[region] if region >= 0 else None
+
+    @property
+    def exists(self) -> bool:
+        return bool(self.table.length[self.index])
+
+    @property
+    def bytes_size(self) -> int:
+        return int(self.table.length[self.index])
+
+    def __repr__(self):
+        return f"ChunkView({self.cord}, {self.dimension}, {self.bytes_size} bytes)"
+
+
+@dataclass(frozen=True)
+class SurfaceBatch:
+    """Поверхность чанков одного региона, компактные массивы для передачи между процессами"""
+    cords: np.ndarray    # (N, 2) int32, абсолютные координаты чанков
+    heights: np.ndarray  # (N, 256) int16, Y верхнего блока, индекс z * 16 + x
+    blocks: np.ndarray   # (N, 256) uint16, индексы в palette (id реестра блоков)
+    palette: List[str]
+
+    def __len__(self):
+        return len(self.cords)
+
+# значения растра поверхности там, где чанка нет
+MISSING_BLOCK = np.iinfo(np.uint16).max
+MISSING_HEIGHT = np.iinfo(np.int16).min
+
+
+@dataclass(frozen=True)
+class SurfaceRaster:
+    """
+    Поверхность области одним куском: blocks[z, x] и heights[z, x] в блоках от угла (min_x, min_z) чанков.
+    Столбцы отсутствующих чанков заполнены MISSING_BLOCK / MISSING_HEIGHT, present - маска чанков
+    """
+    min_x: int            # координаты угла в чанках
+    min_z: int
+    blocks: np.ndarray    # (Z * 16, X * 16) uint16, id реестра
+    heights: np.ndarray   # (Z * 16, X * 16) int16
+    present: np.ndarray   # (Z, X) bool
+    palette: List[str]
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """Размер в чанках (Z, X)"""
+        return self.present.shape
+
+    @property
+    def mask(self) -> np.ndarray:
+        """bool (Z * 16, X * 16), True где данных нет, как в numpy.ma"""
+        return ~np.repeat(np.repeat(self.present, 16, axis=0), 16, axis=1)
+
+    def masked_blocks(self) -> np.ma.MaskedArray:
+        return np.ma.MaskedArray(self.blocks, mask=self.mask)
+
+    def masked_heights(self) -> np.ma.MaskedArray:
+        return np.ma.MaskedArray(self.heights, mask=self.mask)
+
+    @classmethod
+    def from_batches(cls, batches: List[SurfaceBatch], palette: List[str],
+                     bounds: Optional[Tuple[int, int, int, int]] = None) -> "SurfaceRaster":
+        """
+        Сборка растра из SurfaceBatch, blocks которых уже в ids palette.
+        :param bounds: (xmin, xmax, zmin, zmax) в чанках включительно, по умолчанию - охват всех батчей
+        """
+        cords = np.concatenate([b.cords for b in batches]) if batches else np.empty((0, 2), dtype=np.int32)
+        if bounds is None:
+            if not len(cords):
+                bounds = (0, -1, 0, -1)
+            else:
+                bounds = (int(cords[:, 0].min()), int(cords[:, 0].max()),
+                          int(cords[:, 1].min()), int(cords[:, 1].max()))
+        xmin, xmax, zmin, zmax = bounds
+        size_x, size_z = max(xmax - xmin + 1, 0), max(zmax - zmin + 1, 0)
+
+        blocks = np.full((size_z * 16, size_x * 16), MISSING_BLOCK, dtype=np.uint16)
+        heights = np.full((size_z * 16, size_x * 16), MISSING_HEIGHT, dtype=np.int16)
+        present = np.zeros((size_z, size_x), dtype=bool)
+        # вид (Z, 16, X, 16): чанк целиком пишется одним присваиванием по индексам чанков
+        blocks_4d = blocks.reshape(size_z, 16, size_x, 16)
+        heights_4d = heights.reshape(size_z, 16, size_x, 16)
+
+        for batch in batches:
+            if not len(batch):
+                continue
+            xi = batch.cords[:, 0].astype(np.int64) - xmin
+            zi = batch.cords[:, 1].astype(np.int64) - zmin
+            keep = (xi >= 0) & (xi < size_x) & (zi >= 0) & (zi < size_z)
+            xi, zi = xi[keep], zi[keep]
+            blocks_4d[zi, :, xi, :] = batch.blocks[keep].reshape(-1, 16, 16)
+            heights_4d[zi, :, xi, :] = batch.heights[keep].reshape(-1, 16, 16)
+            present[zi, xi] = True
+
+        return cls(xmin, zmin, blocks, heights, present, palette)
+
+
 @dataclass(frozen=True)
 class Chunk:
     chunk_cord: TwoDimCord
@@ -1,33 +1,72 @@
 from dataclasses import dataclass, field
-from typing import List, Optional, Literal
+from typing import List, Optional, Literal, Mapping, Union
 from .Chunk import TwoDimCord, Dimensions
 from pathlib import Path
 from typing import Tuple
 from mc_chunk_analyzer.domain.models.Chunk import RawChunk
+import numpy as np
+import mmap
 
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Tuple
 
+# Таблица чанков региона: одна строка на слот из таблицы локаций (1024 на регион)
+CHUNK_TABLE_DTYPE = np.dtype([
+    ("x", np.int32),            # абсолютные координаты чанка
+    ("z", np.int32),
+    ("offset", np.uint32),      # смещение в секторах по 4096 байт, 0 - чанка нет
+    ("sectors", np.uint8),
+    ("length", np.uint32),      # длина из заголовка чанка (с байтом сжатия)
+    ("compression", np.uint8),
+    ("timestamp", np.uint32),   # время последнего сохранения чанка из второго сектора, unix секунды
+])
+
 @dataclass(frozen=True)
 class RawRegion:
+    """
+    .mca файл, отображённый в память.
+    Файл не читается целиком: страницы подгружаются ОС только при обращении к ним
+    """
     path: Path
     dimension: Dimensions
-    data: bytes = field(init=False)
+    data: Union[mmap.mmap, bytes] = field(init=False)
     cord: TwoDimCord = field(init=False)
+    mtime_ns: int = field(init=False)  # время изменения файла на момент открытия
+    resolved: Path = field(init=False)  # абсолютный путь без ссылок, по нему кеш различает регионы
 
     def __post_init__(self):
         path = Path(self.path)
 
         if not path.is_file():
             raise FileNotFoundError(path)
-        with path.open("rb") as f:
-            data = f.read()
+        data = self._map_file(path)
         name = path.stem  # r.-6.-6
         x, z = self.cord_from_string(name)
 
         object.__setattr__(self, "data", data)
+        object.__setattr__(self, "mtime_ns", path.stat().st_mtime_ns)
         object.__setattr__(self, "cord", TwoDimCord((x, z)))
+        object.__setattr__(self, "resolved", path.resolve())
+
+    @staticmethod
+    def _map_file(path: Path) -> Union[mmap.mmap, bytes]:
+        with path.open("rb") as f:
+            try:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # пустой файл нельзя отобразить в память
+                return b""
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
     @staticmethod
     def cord_from_string(name: str) -> Tuple[int, int]:
@@ -47,9 +86,10 @@ class RawRegion:
 @dataclass(frozen=True)
 class Region:
     readable: bool
-    raw_chunks: dict[TwoDimCord, RawChunk]
+    raw_chunks: Mapping[TwoDimCord, RawChunk]
     dimension: Dimensions
     name: str
+    table: Optional[np.ndarray] = None  # CHUNK_TABLE_DTYPE
     cord: TwoDimCord = field(init=False)
 
     def __post_init__(self):
@@ -37,6 +37,13 @@ class INBTTagReader(ABC):
         """
 
 
+    def read_paths(self, paths) -> dict:
+        """
+        Проекция nbt: читаются только теги по путям, всё остальное скипается
+        :param paths: пути вида ("sections", "*", "block_states"), "*" - все элементы списка
+        :return: дерево как у read().value, но только с запрошенными ветками
+        """
+
     @abstractmethod
     def read(self) -> NBTTag:
         """Метод для чтения nbt файла"""
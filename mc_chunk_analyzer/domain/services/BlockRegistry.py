@@ -0,0 +1,53 @@
+from threading import Lock
+from typing import Dict, List, Sequence, Union
+import numpy as np
+
+AIR = "minecraft:air"
+
+
+class BlockRegistry:
+    """
+    Таблица блоков на весь скан: имя блока -> небольшое целое (uint16).
+    id выдаются один раз при первой встрече, 0 всегда minecraft:air.
+    Секции хранят только remap из локальной палитры в эти id, наружу отдаются массивы id
+    """
+    AIR_ID = 0
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {AIR: self.AIR_ID}
+        self.names: List[str] = [AIR]
+        self._lock = Lock()
+
+    def id(self, name: str) -> int:
+        block_id = self._ids.get(name)
+        if block_id is None:
+            with self._lock:
+                block_id = self._ids.get(name)
+                if block_id is None:
+                    block_id = len(self.names)
+                    if block_id > np.iinfo(np.uint16).max:
+                        raise OverflowError("Too many distinct blocks for uint16 ids")
+                    self.names.append(name)
+                    self._ids[name] = block_id
+        return block_id
+
+    def get(self, name: str) -> Union[int, None]:
+        """id без регистрации, None если блок ещё не встречался"""
+        return self._ids.get(name)
+
+    def name(self, block_id: int) -> str:
+        return self.names[block_id]
+
+    def remap(self, palette: Sequence[str]) -> np.ndarray:
+        """Локальная палитра -> массив глобальных id, remap[local_index] = id"""
+        return np.array([self.id(name) for name in palette], dtype=np.uint16)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+
+# общий реестр процесса, используется по умолчанию
+BLOCKS = BlockRegistry()
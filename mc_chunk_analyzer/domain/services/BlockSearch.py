@@ -0,0 +1,115 @@
+import logging
+from functools import partial
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+import numpy as np
+
+from .ChunkAnalyzer import McaParser, ChunkLayout, ChunkAnalyzer
+from .BlockRegistry import BlockRegistry, BLOCKS
+from .utils import ChunkManager, Bounds, in_bounds, candidate_mask
+from ..models.Chunk import Corners, Dimensions
+from ..models.Region import RawRegion
+from .Metrics import METRICS
+
+log = logging.getLogger(__name__)
+
+# весь допустимый диапазон высот мира
+MIN_Y = -2048
+MAX_Y = 2047
+
+
+def search_chunk(raw_data: bytes, cord: Tuple[int, int], names: Tuple[str, ...],
+                 min_y: int, max_y: int, registry: BlockRegistry) -> Union[np.ndarray, None]:
+    """
+    Мировые координаты блоков names в одном распакованном чанке, None если их там быть не может.
+    Отсев идёт по дешевизне: байты чанка -> палитры секций -> распаковка только подходящих секций
+    """
+    # имя блока в палитре лежит строкой, если его нет в байтах - нет и в чанке
+    if not any(name.encode() in raw_data for name in names):
+        return None
+
+    sections = [
+        section for section in ChunkLayout(raw_data).as_sections(names_only=True)
+        if any(block.get("Name") in names for block in section["block_states"]["palette"])
+    ]
+    if not sections:
+        return None
+
+    found = ChunkAnalyzer(sections, registry).find_blocks_in_area(names, min_y, max_y, chunk_cord=cord)
+    return found if len(found) else None
+
+
+def search_region(path: Path, dimension: Dimensions, bounds: Bounds,
+                  names: Tuple[str, ...] = (), min_y: int = MIN_Y, max_y: int = MAX_Y,
+                  index_dir: Optional[Path] = None) -> np.ndarray:
+    """
+    Воркер для ChunkManager.scan: все найденные блоки региона, int32 (N, 3).
+    С index_dir распаковываются только чанки, которые индекс палитр считает кандидатами
+    """
+    registry = BlockRegistry()
+    found: List[np.ndarray] = []
+
+    with RawRegion(path, dimension) as raw:
+        region = McaParser().parse(raw)
+        mask = in_bounds(region.table, bounds)
+        if index_dir is not None:
+            mask &= candidate_mask(raw, index_dir, names)
+        for chunk in region.raw_chunks.readable(mask):
+            try:
+                hits = search_chunk(chunk.raw_data, chunk.abs_cord.as_tuple, names, min_y, max_y, registry)
+            except Exception as e:
+                log.warning("Error at %s: %s", chunk.abs_cord, e)
+                METRICS.count("chunks_failed")
+                continue
+            if hits is not None:
+                found.append(hits)
+
+    if not found:
+        return np.empty((0, 3), dtype=np.int32)
+    return np.concatenate(found)
+
+
+class BlockSearcher:
+    """
+    Поиск блоков по области: Corners + набор блоков + диапазон Y -> поток батчей мировых (x, y, z).
+    Регионы обрабатываются в пуле процессов ChunkManager, если он создан с workers > 1
+    """
+
+    def __init__(self, manager: ChunkManager, registry: BlockRegistry = BLOCKS):
+        self._manager = manager
+        self._registry = registry
+
+    def search(self, corners: Corners, blocks: Iterable[Union[str, int]],
+               min_y: Optional[int] = None, max_y: Optional[int] = None) -> Iterator[np.ndarray]:
+        """
+        :param corners: область в координатах чанков, включительно
+        :param blocks: имена или id реестра
+        :return: по одному int32 (N, 3) на регион, в котором что-то нашлось
+        """
+        if isinstance(blocks, (str, int, np.integer)):
+            blocks = [blocks]
+        names = tuple(sorted({
+            self._registry.name(int(block)) if isinstance(block, (int, np.integer)) else block
+            for block in blocks
+        }))
+        if not names:
+            return
+
+        extractor = partial(
+            search_region,
+            names=names,
+            min_y=MIN_Y if min_y is None else min_y,
+            max_y=MAX_Y if max_y is None else max_y,
+            index_dir=self._manager.index_dir,
+        )
+        for found in self._manager.scan_iter(corners, extractor, pad=0):
+            if len(found):
+                yield found
+
+    def search_all(self, corners: Corners, blocks: Iterable[Union[str, int]],
+                   min_y: Optional[int] = None, max_y: Optional[int] = None) -> np.ndarray:
+        """Все найденные координаты одним массивом int32 (N, 3)"""
+        batches = list(self.search(corners, blocks, min_y, max_y))
+        if not batches:
+            return np.empty((0, 3), dtype=np.int32)
+        return np.concatenate(batches)
@@ -3,104 +3,183 @@
 
 from ..models.Chunk import RawChunk
 from ..models.NBT import NBTTag
-from ..models.Region import RawRegion, Region, TwoDimCord
+from ..models.Region import RawRegion, Region, TwoDimCord, CHUNK_TABLE_DTYPE
 from ..models.NBTInfo import *
 from ..ports.IChunkAnalyzer import IMcaParser, IChunkAnalyzer
 from ..ports.INBTReader import INBTTagReader
-from typing import Union, List
+from .BlockRegistry import BlockRegistry, BLOCKS
+from .Compression import decompress, external_path, EXTERNAL, ChunkReadError
+from .Metrics import METRICS
+from typing import Union, List, Dict, Iterable, Iterator, Mapping, Sequence
+from pathlib import Path
 import numpy as np
-import gzip
-import zlib
 import struct
 import math
-from numba import jit
+import logging
+import threading
+from numba import jit, njit
+
+log = logging.getLogger(__name__)
 
 
 class McaParser(IMcaParser):
     @staticmethod
-    def __parse_location_table(raw_bytes: bytes) -> np.ndarray:
-        table = np.frombuffer(raw_bytes[:4096], dtype=">u4")
-        entries = np.zeros(1024, dtype=[
-            ('offset', np.uint32),
-            ('count', np.uint16),
-        ])
-        entries["offset"] = table >> 8
-        entries["count"] = table & 0xFF
-        return entries
+    def build_chunk_table(raw_bytes: bytes, cord: TwoDimCord) -> np.ndarray:
+        """
+        Разбор таблицы локаций и заголовков всех чанков целиком массивами numpy.
+        Ничего не распаковывает, результат можно фильтровать маской по координатам
+        """
+        buf = np.frombuffer(raw_bytes, dtype=np.uint8)
+        table = np.zeros(1024, dtype=CHUNK_TABLE_DTYPE)
+        slots = np.arange(1024)
+        table["x"] = cord.x * 32 + slots % 32
+        table["z"] = cord.z * 32 + slots // 32
+        if buf.size < 4096:
+            return table
+
+        locations = buf[:4096].view(">u4")
+        if buf.size >= 8192:
+            table["timestamp"] = buf[4096:8192].view(">u4")
+        offset = locations >> 8
+        sectors = locations & 0xFF
+        start = offset.astype(np.int64) * 4096
+        present = (offset > 0) & (sectors > 0) & (start + 5 <= buf.size)
+
+        # заголовок чанка: 4 байта длины big-endian + байт сжатия
+        header = buf[start[present, None] + np.arange(5)].astype(np.uint32)
+        length = (header[:, 0] << 24) | (header[:, 1] << 16) | (header[:, 2] << 8) | header[:, 3]
+
+        table["offset"][present] = offset[present]
+        table["sectors"][present] = sectors[present]
+        table["length"][present] = length
+        table["compression"][present] = header[:, 4]
+        return table
 
     def parse(self, region: RawRegion) -> Region:
-        data = region.data
-        cord = region.cord
-        entries = self.__parse_location_table(data)
-        raw_chunks = {}
-
-        for i in range(1024):
-            offset = entries[i]["offset"]
-            count  = entries[i]["count"]
-            chunk_x = cord.x * 32 + (i % 32)
-            chunk_z = cord.z * 32 + (i // 32)
-            chunk_cord = TwoDimCord((chunk_x, chunk_z))
-            if offset == 0 or count == 0:
-                raw_chunks[chunk_cord] = RawChunk(chunk_cord, None, region.dimension)
-                continue
-            byte_start = offset * 4096
-            byte_end   = byte_start + count * 4096
-            chunk_bytes = data[byte_start:byte_end]
-            length = int.from_bytes(chunk_bytes[:4], "big")
-            compression_type = chunk_bytes[4]
-            compressed = chunk_bytes[5:5 + length - 1]
-
-            if compression_type == 1:
-                decompressed = gzip.decompress(compressed)
-            elif compression_type == 2:
-                decompressed = zlib.decompress(compressed)
-            else:
-                decompressed = compressed
-            raw_chunks[chunk_cord] = RawChunk(chunk_cord, decompressed, region.dimension)
+        """Читает только таблицу чанков, чанки распаковываются при первом обращении"""
+        table = self.build_chunk_table(region.data, region.cord)
 
         return Region(
             readable=True,
-            raw_chunks=raw_chunks,
+            raw_chunks=LazyChunkMap(region, table),
             dimension=region.dimension,
-            name = region.path.parts[-1]
+            name = region.path.parts[-1],
+            table = table
         )
 
+    @staticmethod
+    def read_chunk(data: bytes, entry: np.void, region_dir: Union[Path, None] = None) -> Union[bytes, None]:
+        """
+        Вырезает и распаковывает один чанк по строке таблицы чанков.
+        :param region_dir: папка региона, в ней ищутся вынесенные в .mcc чанки
+        :raises ChunkReadError: если чанк не распаковывается
+        """
+        length = int(entry["length"])
+        if entry["offset"] == 0 or length == 0:
+            return None
+        byte_start = int(entry["offset"]) * 4096 + 5
+        compression = int(entry["compression"])
+        external = None
+        if compression & EXTERNAL and region_dir is not None:
+            external = external_path(region_dir, int(entry["x"]), int(entry["z"]))
+
+        # срез memoryview без копии: распаковщик читает прямо из mmap региона.
+        # view освобождается сразу, иначе mmap нельзя будет закрыть
+        view = memoryview(data)[byte_start:byte_start + length - 1]
+        try:
+            raw = decompress(compression, view, external)
+            METRICS.count("bytes_compressed", view.nbytes)
+        finally:
+            view.release()
+        METRICS.count("chunks_read")
+        METRICS.count("bytes_decompressed", len(raw))
+        return raw
+
+
+class LazyChunkMap(Mapping):
+    """
+    TwoDimCord -> RawChunk для одного региона.
+    Ключи известны сразу из таблицы чанков, распаковка чанка происходит при первом доступе
+    """
+    def __init__(self, region: RawRegion, table: np.ndarray):
+        self._region = region
+        self.table = table
+        self._base_x = region.cord.x * 32
+        self._base_z = region.cord.z * 32
+        self._region_dir = Path(region.path).parent
+        self._loaded: Dict[int, RawChunk] = {}
+
+    def _index(self, cord: TwoDimCord) -> int:
+        rel_x = cord.x - self._base_x
+        rel_z = cord.z - self._base_z
+        if not (0 <= rel_x < 32 and 0 <= rel_z < 32):
+            raise KeyError(cord)
+        return rel_z * 32 + rel_x
+
+    def by_index(self, i: int) -> RawChunk:
+        chunk = self._loaded.get(i)
+        if chunk is None:
+            entry = self.table[i]
+            cord = TwoDimCord((int(entry["x"]), int(entry["z"])))
+            raw = McaParser.read_chunk(self._region.data, entry, self._region_dir)
+            chunk = RawChunk(cord, raw, self._region.dimension, self._region.mtime_ns, self._region.resolved)
+            self._loaded[i] = chunk
+        return chunk
+
+    def select(self, mask: np.ndarray) -> List[RawChunk]:
+        """Чанки по булевой маске над таблицей, распаковываются только выбранные"""
+        return [self.by_index(int(i)) for i in np.flatnonzero(mask)]
+
+    def readable(self, mask: np.ndarray) -> Iterator[RawChunk]:
+        """
+        Существующие чанки по маске, как select, но по одному.
+        Чанк, который не распаковался, пропускается и считается в chunks_failed, а не обрывает регион
+        """
+        for i in np.flatnonzero(mask).tolist():
+            try:
+                chunk = self.by_index(i)
+            except ChunkReadError as e:
+                log.warning("Error at X: %d, Z: %d: %s", self.table[i]['x'], self.table[i]['z'], e)
+                METRICS.count("chunks_failed")
+                continue
+            if chunk.exists:
+                yield chunk
+
+    def __getitem__(self, cord: TwoDimCord) -> RawChunk:
+        return self.by_index(self._index(cord))
+
+    def __iter__(self):
+        for x, z in zip(self.table["x"].tolist(), self.table["z"].tolist()):
+            yield TwoDimCord((x, z))
+
+    def __len__(self) -> int:
+        return 1024
+
+    def __contains__(self, cord) -> bool:
+        try:
+            self._index(cord)
+        except (KeyError, AttributeError):
+            return False
+        return True
+
 # ---------- Kinda fast nbt reading tbh ----------
-import struct
-import numpy as np
-from typing import List, Union, Dict
 
 
 class NBTTagReader(INBTTagReader):
-    def __init__(self, data: bytes):
+    # таблицы общие для всех экземпляров: ридер создаётся на каждый чанк, а то и переиспользуется через update_data
+    _tag_spec_cache = [get_tag_spec_by_id(i) for i in range(13)]
+    # Карта размеров для простых типов
+    _size_map = {1: 1, 2: 2, 3: 4, 4: 8, 5: 4, 6: 8}
+
+    def __init__(self, data: Union[bytes, memoryview]):
         super().__init__()
-        # Инициализация кэша и вспомогательных структур
-        self._tag_spec_cache = [get_tag_spec_by_id(i) for i in range(13)]
-        self.data = data
+        # строки и имена тегов декодируются срезами bytes, memoryview (ChunkTable.raw) копируется
+        self.data = data if isinstance(data, bytes) else bytes(data)
         self.mv = memoryview(self.data)
         self.current_byte = 0
         self._name_cache = {}
         self._return_bytes_for_arrays = True
 
-        # Карта размеров для простых типов
-        self._size_map = {1: 1, 2: 2, 3: 4, 4: 8, 5: 4, 6: 8}
-
-        # Вставьте это в __init__ вашего класса
-        self._cache_skip_functions = {
-            1: self._skip_byte,
-            2: self._skip_int16,
-            3: self._skip_int32,
-            4: self._skip_int64,
-            5: self._skip_int32,  # Float
-            6: self._skip_int64,  # Double
-            7: self._skip_bytearray,
-            8: self._skip_string,
-            9: self._skip_list,
-            10: self._skip_compound,
-            11: self._skip_intarray,
-            12: self._skip_long_array
-        }
-
     def _read_uint8(self) -> int:
         v = self.mv[self.current_byte]
         self.current_byte += 1
@@ -233,10 +312,10 @@ class NBTTagReader(INBTTagReader):
 
         return [self._parse_payload(list_type) for _ in range(size)]
 
-    def update_data(self, data: bytes):
+    def update_data(self, data: Union[bytes, memoryview]):
         self.current_byte = 0
-        self.mv = memoryview(data)
-        self.data = data
+        self.data = data if isinstance(data, bytes) else bytes(data)
+        self.mv = memoryview(self.data)
 
     def _read_int8(self) -> int:
         v = int.from_bytes(self.mv[self.current_byte:self.current_byte+1], 'big', signed=True)
@@ -287,24 +366,95 @@ class NBTTagReader(INBTTagReader):
         return v
 
     def parse_through_tree(self, route: List) -> Union[NBTTag, None]:
-        self.get_next_type(True)
-        length = self._read_int16()
-        self.current_byte += length
-
-        while route:
-            type_tag = self.get_next_type(True).tag_id
-            self.current_byte -= 1
-            name = self.get_next_name()
-            if type_tag == 0:
+        """Читает только тег по пути route от корневого компаунда, None если пути нет"""
+        value = self.read_paths([route])
+        for name in route:
+            if not isinstance(value, dict) or name not in value:
                 return None
-            if name != route[0]:
-                self.current_byte += 1
-                length = self._read_int16()
-                self.current_byte += length
-                self._cache_skip_functions[type_tag]()
-            elif name == route[0]:
-                return self.read()
+            value = value[name]
+        return NBTTag(name=route[-1], value=value)
+
+    def read_paths(self, paths: Iterable[Sequence[str]]) -> Dict:
+        """
+        Проекция корневого компаунда: читаются только теги по путям из paths, остальное скипается.
+        "*" в пути - каждый элемент списка, например ("sections", "*", "block_states").
+        Возвращает дерево той же формы, что read().value, но только с запрошенными ветками
+        """
+        tree = self._build_path_tree(paths)
+        tag_id = self._read_uint8()
+        if tag_id != 10:
+            raise ValueError(f"Root tag must be compound, got {tag_id}")
+        name_len = self._read_uint16()
+        self.current_byte += name_len
+        return self._project_compound(tree)
 
+    @staticmethod
+    def _build_path_tree(paths: Iterable[Sequence[str]]) -> Dict:
+        """
+        Пути -> дерево {имя в байтах: (имя, поддерево)}, None вместо поддерева - читать тег целиком.
+        Ключи в байтах, чтобы не декодировать имена пропускаемых тегов
+        """
+        tree = {}
+        for path in paths:
+            node = tree
+            for name in path[:-1]:
+                key = name.encode("utf-8")
+                if key not in node:
+                    node[key] = (name, {})
+                child = node[key][1]
+                if child is None:  # уже читаем всю ветку
+                    break
+                node = child
+            else:
+                node[path[-1].encode("utf-8")] = (path[-1], None)
+        return tree
+
+    def _project_compound(self, tree: Dict) -> Dict:
+        res = {}
+        data = self.data
+        size_map = self._size_map
+        skip_functions = self._cache_skip_functions
+        while True:
+            pos = self.current_byte
+            tag_id = data[pos]
+            if tag_id == 0:  # TAG_End
+                self.current_byte = pos + 1
+                return res
+            name_end = pos + 3 + ((data[pos + 1] << 8) | data[pos + 2])
+            node = tree.get(data[pos + 3:name_end])
+            self.current_byte = name_end
+
+            if node is None:
+                fixed = size_map.get(tag_id)
+                if fixed is not None:
+                    self.current_byte = name_end + fixed
+                else:
+                    skip_functions[tag_id](self)
+                continue
+
+            name, subtree = node
+            if subtree is None:
+                res[name] = self._parse_payload(tag_id)
+            elif tag_id == 10:
+                res[name] = self._project_compound(subtree)
+            elif tag_id == 9 and b"*" in subtree:
+                res[name] = self._project_list(subtree[b"*"][1])
+            else:
+                skip_functions[tag_id](self)
+
+    def _project_list(self, tree: Union[Dict, None]) -> List:
+        if tree is None:
+            return self._read_list()
+        list_type = self._read_uint8()
+        size = self._read_int32()
+        if list_type == 10:
+            return [self._project_compound(tree) for _ in range(size)]
+        if list_type == 9 and b"*" in tree:
+            return [self._project_list(tree[b"*"][1]) for _ in range(size)]
+        skip = self._cache_skip_functions[list_type]
+        for _ in range(size):
+            skip(self)
+        return []
 
     def _read_list_at_pos(self, data: bytes, start_pos: int):
         pos = start_pos
@@ -446,8 +596,8 @@ class NBTTagReader(INBTTagReader):
         self.current_byte += size
 
     def _skip_string(self):
-        size =  self._read_int16()
-        self.current_byte += size
+        pos = self.current_byte
+        self.current_byte = pos + 2 + ((self.data[pos] << 8) | self.data[pos + 1])
 
     def _skip_intarray(self):
         size = self._read_int32() * 4
@@ -460,18 +610,454 @@ class NBTTagReader(INBTTagReader):
     def _skip_list(self):
         tags_type = self._read_uint8()
         size = self._read_int32()
+        if size <= 0:
+            return
+
+        # примитивы фиксированной длины скипаются одним сдвигом
+        elem_size = self._size_map.get(tags_type)
+        if elem_size is not None:
+            self.current_byte += size * elem_size
+            return
 
+        skip = self._cache_skip_functions[tags_type]
         for _ in range(size):
-            self._cache_skip_functions[tags_type]()
+            skip(self)
 
     def _skip_compound(self):
+        data = self.data
+        size_map = self._size_map
+        skip_functions = self._cache_skip_functions
         while True:
-            tag_type = self.get_next_type_fast(True)
+            pos = self.current_byte
+            tag_type = data[pos]
             if tag_type == 0:
+                self.current_byte = pos + 1
                 return
-            length = self._read_int16()
-            self.current_byte += length
-            self._cache_skip_functions[tag_type]()
+            # id тега + длина имени + имя
+            pos += 3 + ((data[pos + 1] << 8) | data[pos + 2])
+            fixed = size_map.get(tag_type)
+            if fixed is not None:
+                self.current_byte = pos + fixed
+            else:
+                self.current_byte = pos
+                skip_functions[tag_type](self)
+
+    # id тега -> функция пропуска, вызывается как skip(self)
+    _cache_skip_functions = {
+        1: _skip_byte,
+        2: _skip_int16,
+        3: _skip_int32,
+        4: _skip_int64,
+        5: _skip_int32,  # Float
+        6: _skip_int64,  # Double
+        7: _skip_bytearray,
+        8: _skip_string,
+        9: _skip_list,
+        10: _skip_compound,
+        11: _skip_intarray,
+        12: _skip_long_array
+    }
+
+# ---------- numba nbt scanner ----------
+# Находит в распакованном чанке смещения block_states секций и карт высот без разбора остального nbt
+
+HEIGHTMAP_NAMES = ("WORLD_SURFACE", "MOTION_BLOCKING", "MOTION_BLOCKING_NO_LEAVES",
+                   "OCEAN_FLOOR", "WORLD_SURFACE_WG", "OCEAN_FLOOR_WG")
+
+# колонки массива секций из scan_chunk_layout, -1 - тега нет
+SEC_Y = 0               # значение Y
+SEC_Y_POS = 1           # смещение байта Y
+SEC_PALETTE_POS = 2     # смещение payload списка palette (байт типа элементов)
+SEC_PALETTE_LEN = 3     # длина payload palette в байтах
+SEC_PALETTE_COUNT = 4   # число элементов palette
+SEC_DATA_POS = 5        # смещение первого long в data
+SEC_DATA_LEN = 6        # число long в data
+SEC_COLUMNS = 7
+# глубина вложенности nbt, как у самой игры
+MAX_DEPTH = 512
+
+# коды ошибок scan_chunk_layout (внутри сканера - отрицательные смещения)
+_TRUNCATED = -1
+_TOO_DEEP = -2
+_CORRUPT = -3
+SCAN_ERRORS = {_TRUNCATED: "truncated NBT", _TOO_DEEP: f"NBT nested deeper than {MAX_DEPTH}",
+               _CORRUPT: "corrupt NBT"}
+
+# поля массива meta из scan_chunk_layout
+META_DATA_VERSION = 0   # DataVersion, -1 если тега нет (миры до 1.9)
+META_Y_POS = 1          # yPos - нижняя секция мира (1.18+)
+META_HAS_Y_POS = 2      # 1 если yPos есть
+META_COLUMNS = 3
+
+
+def _name_table(names) -> np.ndarray:
+    width = max(len(n) for n in names) + 1
+    table = np.zeros((len(names), width), dtype=np.uint8)
+    for i, name in enumerate(names):
+        table[i, 0] = len(name)
+        table[i, 1:len(name) + 1] = np.frombuffer(name.encode(), dtype=np.uint8)
+    return table
+
+# [длина, байты...] имён, которые ищет сканер
+_HEIGHTMAP_NAMES = _name_table(HEIGHTMAP_NAMES)
+_SCAN_NAMES = _name_table(("sections", "Heightmaps", "Level", "Y", "block_states", "palette", "data",
+                           "DataVersion", "yPos"))
+(_N_SECTIONS, _N_HEIGHTMAPS, _N_LEVEL, _N_Y, _N_BLOCK_STATES, _N_PALETTE, _N_DATA,
+ _N_DATA_VERSION, _N_Y_POS) = range(9)
+
+
+@njit(cache=True)
+def _u16(buf, pos):
+    return (np.int64(buf[pos]) << 8) | np.int64(buf[pos + 1])
+
+
+@njit(cache=True)
+def _i32(buf, pos):
+    v = (np.int64(buf[pos]) << 24) | (np.int64(buf[pos + 1]) << 16) | (np.int64(buf[pos + 2]) << 8) | np.int64(buf[pos + 3])
+    return v - (np.int64(1) << 32) if v >= (np.int64(1) << 31) else v
+
+
+@njit(cache=True)
+def _name_is(buf, pos, length, names, idx):
+    if names[idx, 0] != length:
+        return False
+    for i in range(length):
+        if buf[pos + i] != names[idx, i + 1]:
+            return False
+    return True
+
+
+@njit(cache=True)
+def _fixed_size(tag_id):
+    if tag_id == 1:
+        return 1
+    if tag_id == 2:
+        return 2
+    if tag_id == 3 or tag_id == 5:
+        return 4
+    if tag_id == 4 or tag_id == 6:
+        return 8
+    return -1
+
+
+@njit(cache=True)
+def _tag_header(buf, pos):
+    """
+    Заголовок именованного тега с pos: (tag_id, начало имени, длина имени, смещение payload).
+    Для TAG_End payload сразу за байтом типа, смещение < 0 - код ошибки
+    """
+    n = buf.shape[0]
+    if pos >= n:
+        return 0, 0, 0, _TRUNCATED
+    tag_id = np.int64(buf[pos])
+    if tag_id == 0:
+        return 0, 0, 0, pos + 1
+    if pos + 3 > n:
+        return tag_id, 0, 0, _TRUNCATED
+    name_len = _u16(buf, pos + 1)
+    name_pos = pos + 3
+    if name_pos + name_len > n:
+        return tag_id, name_pos, name_len, _TRUNCATED
+    return tag_id, name_pos, name_len, name_pos + name_len
+
+
+@njit(cache=True)
+def _skip_payload(buf, pos, tag_id):
+    """
+    Смещение сразу после payload тега tag_id, вложенность обходится стеком, без рекурсии.
+    Каждое чтение проверяется по длине buf, при ошибке возвращается её код < 0
+    """
+    n = buf.shape[0]
+    kinds = np.empty(MAX_DEPTH, dtype=np.int64)   # 9 - список, 10 - компаунд
+    types = np.empty(MAX_DEPTH, dtype=np.int64)   # тип элементов списка
+    left = np.empty(MAX_DEPTH, dtype=np.int64)    # сколько элементов списка осталось
+    depth = 0
+    while True:
+        fixed = _fixed_size(tag_id)
+        if fixed > 0:
+            pos += fixed
+        elif tag_id == 7 or tag_id == 11 or tag_id == 12:
+            if pos + 4 > n:
+                return _TRUNCATED
+            size = _i32(buf, pos)
+            if size < 0:
+                return _CORRUPT
+            pos += 4 + size * (1 if tag_id == 7 else 4 if tag_id == 11 else 8)
+        elif tag_id == 8:
+            if pos + 2 > n:
+                return _TRUNCATED
+            pos += 2 + _u16(buf, pos)
+        elif tag_id == 9:
+            if pos + 5 > n:
+                return _TRUNCATED
+            elem = np.int64(buf[pos])
+            size = _i32(buf, pos + 1)
+            pos += 5
+            elem_size = _fixed_size(elem)
+            if elem_size > 0:
+                pos += elem_size * max(size, 0)
+            elif size > 0:
+                if depth == MAX_DEPTH:
+                    return _TOO_DEEP
+                kinds[depth] = 9
+                types[depth] = elem
+                left[depth] = size
+                depth += 1
+        elif tag_id == 10:
+            if depth == MAX_DEPTH:
+                return _TOO_DEEP
+            kinds[depth] = 10
+            depth += 1
+        else:
+            return _CORRUPT
+        if pos > n:
+            return _TRUNCATED
+
+        # следующий тег для обработки с вершины стека
+        found = False
+        while depth > 0:
+            top = depth - 1
+            if kinds[top] == 9:
+                if left[top] > 0:
+                    left[top] -= 1
+                    tag_id = types[top]
+                    found = True
+                    break
+                depth -= 1
+            else:
+                next_id, _, _, pos = _tag_header(buf, pos)
+                if pos < 0:
+                    return pos
+                if next_id == 0:
+                    depth -= 1
+                    continue
+                tag_id = next_id
+                found = True
+                break
+        if not found:
+            return pos
+
+
+@njit(cache=True)
+def _scan_section(buf, pos, row):
+    """Разбор компаунда одной секции, pos - начало payload, возвращает смещение после него или код ошибки"""
+    n = buf.shape[0]
+    while True:
+        tag_id, name_pos, name_len, pos = _tag_header(buf, pos)
+        if pos < 0 or tag_id == 0:
+            return pos
+
+        if tag_id == 1 and _name_is(buf, name_pos, name_len, _SCAN_NAMES, _N_Y):
+            if pos >= n:
+                return _TRUNCATED
+            y = np.int64(buf[pos])
+            row[SEC_Y] = y - 256 if y > 127 else y
+            row[SEC_Y_POS] = pos
+            pos += 1
+        elif tag_id == 10 and _name_is(buf, name_pos, name_len, _SCAN_NAMES, _N_BLOCK_STATES):
+            while True:
+                inner_id, inner_pos, inner_len, pos = _tag_header(buf, pos)
+                if pos < 0:
+                    return pos
+                if inner_id == 0:
+                    break
+                end = _skip_payload(buf, pos, inner_id)
+                if end < 0:
+                    return end
+                if inner_id == 9 and _name_is(buf, inner_pos, inner_len, _SCAN_NAMES, _N_PALETTE):
+                    row[SEC_PALETTE_POS] = pos
+                    row[SEC_PALETTE_LEN] = end - pos
+                    row[SEC_PALETTE_COUNT] = _i32(buf, pos + 1)
+                elif inner_id == 12 and _name_is(buf, inner_pos, inner_len, _SCAN_NAMES, _N_DATA):
+                    row[SEC_DATA_POS] = pos + 4
+                    row[SEC_DATA_LEN] = _i32(buf, pos)
+                pos = end
+        else:
+            pos = _skip_payload(buf, pos, tag_id)
+            if pos < 0:
+                return pos
+
+
+@njit(cache=True)
+def scan_chunk_layout(buf):
+    """
+    Обход распакованного nbt чанка (uint8 массив) без создания python объектов.
+    :return: секции (N, SEC_COLUMNS), карты высот (len(HEIGHTMAP_NAMES), 2) как [смещение первого long, число long],
+             meta (META_COLUMNS,) и код ошибки: 0 или SCAN_ERRORS, тогда остальное не заполнено до конца
+    """
+    n = buf.shape[0]
+    sections = np.full((0, SEC_COLUMNS), -1, dtype=np.int64)
+    heightmaps = np.full((_HEIGHTMAP_NAMES.shape[0], 2), -1, dtype=np.int64)
+    meta = np.zeros(META_COLUMNS, dtype=np.int64)
+    meta[META_DATA_VERSION] = -1
+    n_sections = 0
+    if n < 3 or buf[0] != 10:
+        return sections, heightmaps, meta, 0
+
+    pos = 3 + _u16(buf, 1)
+    nesting = 0  # старый формат: всё лежит внутри компаунда Level
+    while True:
+        tag_id, name_pos, name_len, pos = _tag_header(buf, pos)
+        if pos < 0:
+            return sections[:n_sections], heightmaps, meta, pos
+        if tag_id == 0:
+            if nesting == 0:
+                break
+            nesting -= 1
+            continue
+
+        if tag_id == 10 and _name_is(buf, name_pos, name_len, _SCAN_NAMES, _N_LEVEL):
+            nesting += 1
+        elif tag_id == 3 and _name_is(buf, name_pos, name_len, _SCAN_NAMES, _N_DATA_VERSION):
+            if pos + 4 > n:
+                pos = _TRUNCATED
+            else:
+                meta[META_DATA_VERSION] = _i32(buf, pos)
+                pos += 4
+        elif tag_id == 3 and _name_is(buf, name_pos, name_len, _SCAN_NAMES, _N_Y_POS):
+            if pos + 4 > n:
+                pos = _TRUNCATED
+            else:
+                meta[META_Y_POS] = _i32(buf, pos)
+                meta[META_HAS_Y_POS] = 1
+                pos += 4
+        elif tag_id == 9 and _name_is(buf, name_pos, name_len, _SCAN_NAMES, _N_SECTIONS):
+            if pos + 5 > n:
+                pos = _TRUNCATED
+            elif buf[pos] != 10:
+                pos = _skip_payload(buf, pos, tag_id)
+            else:
+                size = max(_i32(buf, pos + 1), 0)
+                pos += 5
+                # каждая секция - минимум байт TAG_End, длиннее остатка буфера список быть не может
+                if size > n - pos:
+                    pos = _TRUNCATED
+                else:
+                    grown = np.full((n_sections + size, SEC_COLUMNS), -1, dtype=np.int64)
+                    grown[:n_sections] = sections[:n_sections]
+                    sections = grown
+                    for _ in range(size):
+                        pos = _scan_section(buf, pos, sections[n_sections])
+                        n_sections += 1
+                        if pos < 0:
+                            break
+        elif tag_id == 10 and _name_is(buf, name_pos, name_len, _SCAN_NAMES, _N_HEIGHTMAPS):
+            while True:
+                inner_id, inner_pos, inner_len, pos = _tag_header(buf, pos)
+                if pos < 0 or inner_id == 0:
+                    break
+                end = _skip_payload(buf, pos, inner_id)
+                if end >= 0 and inner_id == 12:
+                    for i in range(_HEIGHTMAP_NAMES.shape[0]):
+                        if _name_is(buf, inner_pos, inner_len, _HEIGHTMAP_NAMES, i):
+                            heightmaps[i, 0] = pos + 4
+                            heightmaps[i, 1] = _i32(buf, pos)
+                            break
+                pos = end
+                if pos < 0:
+                    break
+        else:
+            pos = _skip_payload(buf, pos, tag_id)
+        if pos < 0:
+            return sections[:n_sections], heightmaps, meta, pos
+
+    return sections[:n_sections], heightmaps, meta, 0
+
+
+class ChunkLayout:
+    """
+    Смещения тегов распакованного чанка, найденные scan_chunk_layout.
+    Массивы отдаются через np.frombuffer прямо поверх байтов чанка, без копий
+    """
+    def __init__(self, data: Union[bytes, memoryview]):
+        """:raises ValueError: если nbt обрывается или битый"""
+        self.data = data
+        self.sections, self.heightmaps, self.meta, error = scan_chunk_layout(np.frombuffer(data, dtype=np.uint8))
+        if error:
+            raise ValueError(f"Chunk layout: {SCAN_ERRORS[error]}")
+
+    @property
+    def data_version(self) -> int:
+        """DataVersion чанка, -1 если его нет"""
+        return int(self.meta[META_DATA_VERSION])
+
+    @property
+    def y_pos(self) -> Union[int, None]:
+        """Нижняя секция мира из yPos, None в чанках до 1.18"""
+        return int(self.meta[META_Y_POS]) if self.meta[META_HAS_Y_POS] else None
+
+    @property
+    def height(self) -> Union[int, None]:
+        """
+        Высота мира по секциям чанка: от yPos до верхней секции с block_states.
+        С 1.18 сохраняются все секции мира, поэтому так видна и высота из датапака. None до 1.18
+        """
+        if self.y_pos is None:
+            return None
+        # секции только со светом лежат на одну ниже и выше мира, палитры у них нет
+        ys = self.sections[self.sections[:, SEC_PALETTE_POS] >= 0, SEC_Y]
+        if not len(ys):
+            return None
+        return (int(ys.max()) - self.y_pos + 1) * 16
+
+    def heightmap(self, name: str = "WORLD_SURFACE") -> Union[np.ndarray, None]:
+        pos, count = self.heightmaps[HEIGHTMAP_NAMES.index(name)]
+        if pos < 0:
+            return None
+        return np.frombuffer(self.data, dtype=">i8", count=int(count), offset=int(pos))
+
+    def section_data(self, i: int) -> np.ndarray:
+        """Упакованные индексы блоков секции (big-endian int64), пустой массив если data нет"""
+        pos, count = self.sections[i, SEC_DATA_POS], self.sections[i, SEC_DATA_LEN]
+        if pos < 0:
+            return np.empty(0, dtype=">i8")
+        return np.frombuffer(self.data, dtype=">i8", count=int(count), offset=int(pos))
+
+    _NAME_ONLY = {b"Name": ("Name", None)}
+
+    def palette(self, i: int, reader: "NBTTagReader", names_only: bool = False) -> List[Dict]:
+        """Палитра секции, names_only - в элементах только Name, Properties скипаются"""
+        pos = self.sections[i, SEC_PALETTE_POS]
+        if pos < 0:
+            return []
+        if names_only:
+            reader.current_byte = int(pos)
+            return reader._project_list(self._NAME_ONLY)
+        return reader._read_list_at_pos(reader.data, int(pos))[0]
+
+    def as_sections(self, names_only: bool = False) -> List[Dict]:
+        """Секции в том же виде, что и в nbt: [{"Y", "block_states": {"palette", "data"}}]"""
+        if not isinstance(self.data, bytes):
+            # ридер декодирует строки палитр из bytes, а секции ниже держат массивы поверх data:
+            # memoryview из ChunkTable копируется один раз, чтобы разбор не держал весь буфер таблицы
+            self.data = bytes(self.data)
+        reader = _thread_reader(self.data)
+        try:
+            result = []
+            for i in range(len(self.sections)):
+                palette = self.palette(i, reader, names_only)
+                section = {"block_states": {"palette": palette, "data": self.section_data(i)}}
+                if self.sections[i, SEC_Y_POS] >= 0:
+                    section["Y"] = int(self.sections[i, SEC_Y])
+                result.append(section)
+            return result
+        finally:
+            # ридер живёт дольше чанка и не должен держать его байты
+            reader.update_data(b"")
+
+
+_readers = threading.local()
+
+
+def _thread_reader(data: bytes) -> NBTTagReader:
+    """Один NBTTagReader на поток, переключаемый на новый чанк через update_data: кеш имён тегов общий"""
+    reader = getattr(_readers, "reader", None)
+    if reader is None:
+        reader = _readers.reader = NBTTagReader(data)
+    else:
+        reader.update_data(data)
+    return reader
+
 
 @jit(nopython=True)
 def extract_block_id_fast(block_data, block_index, bits_per_block, palette_size):
@@ -484,9 +1070,121 @@ def extract_block_id_fast(block_data, block_index, bits_per_block, palette_size)
         return block_id if block_id < palette_size else 0
     return 0
 
+@njit(cache=True)
+def unpack_indices(longs, bits, count, spanning):
+    """
+    Распаковка count значений по bits бит из массива long.
+    spanning=False - формат 1.16+, значения не переходят через границу long;
+    spanning=True - старый формат, значения идут сплошным потоком бит
+    """
+    res = np.zeros(count, dtype=np.uint16)
+    n = longs.shape[0]
+    if bits <= 0 or n == 0:
+        return res
+    mask = (np.int64(1) << bits) - 1
+    if not spanning:
+        per_long = 64 // bits
+        for i in range(count):
+            long_index = i // per_long
+            if long_index >= n:
+                break
+            res[i] = (longs[long_index] >> ((i % per_long) * bits)) & mask
+    else:
+        for i in range(count):
+            bit = i * bits
+            long_index = bit >> 6
+            if long_index >= n:
+                break
+            offset = bit & 63
+            # логический сдвиг: для отрицательных long арифметический потянул бы знак
+            value = (longs[long_index] >> offset) & ((np.int64(1) << (64 - offset)) - 1) if offset else longs[long_index]
+            if offset + bits > 64 and long_index + 1 < n:
+                value |= longs[long_index + 1] << (64 - offset)
+            res[i] = value & mask
+    return res
+
+
+def unpack_section(block_data: np.ndarray, bits_per_block: int) -> np.ndarray:
+    """Все 4096 индексов палитры секции одним вызовом, uint16[y, z, x]"""
+    return unpack_indices(block_data, bits_per_block, 4096, False).reshape(16, 16, 16)
+
+
+@njit(cache=True)
+def gather_columns(data, data_start, bits, remap, remap_start, section_of, min_section, ys):
+    """
+    id реестра блоков (N, 256) на высотах ys[c, z * 16 + x] для N чанков за один вызов.
+    Секции всех чанков лежат подряд: упакованные long data[data_start[s]:data_start[s + 1]],
+    bits[s] (0 - секция из одного блока), remap[remap_start[s]:remap_start[s + 1]];
+    section_of[c, section_y - min_section[c]] - номер секции или -1.
+    Нужен только один long на столбец, секции не распаковываются
+    """
+    n = ys.shape[0]
+    span = section_of.shape[1]
+    out = np.zeros((n, 256), dtype=np.uint16)
+    for c in range(n):
+        for col in range(256):
+            y = ys[c, col]
+            slot = y // 16 - min_section[c]
+            if slot < 0 or slot >= span:
+                continue
+            s = section_of[c, slot]
+            if s < 0:
+                continue
+            palette_size = remap_start[s + 1] - remap_start[s]
+            if palette_size == 0:
+                continue
+            b = bits[s]
+            idx = np.int64(0)
+            if b > 0:
+                i = (y - (y // 16) * 16) * 256 + col
+                per_long = 64 // b
+                long_index = i // per_long
+                if long_index < data_start[s + 1] - data_start[s]:
+                    idx = (data[data_start[s] + long_index] >> ((i % per_long) * b)) & ((np.int64(1) << b) - 1)
+                # как и section_indices: индекс вне палитры -> первый блок палитры
+                if idx >= palette_size:
+                    idx = 0
+            out[c, col] = remap[remap_start[s] + idx]
+    return out
+
+
+def top_block_ids(analyzers: Sequence["ChunkAnalyzer"], ys: np.ndarray) -> np.ndarray:
+    """
+    Блоки на высотах ys (N, 256) по N чанкам одним вызовом gather_columns.
+    Массивы секций чанков склеиваются, индексы секций сдвигаются на число секций предыдущих чанков
+    """
+    ys = np.asarray(ys, dtype=np.int64).reshape(-1, 256)
+    if not len(analyzers):
+        return np.zeros((0, 256), dtype=np.uint16)
+    packed = [analyzer.packed_sections() for analyzer in analyzers]
+
+    span = max(max(p['section_of'].shape[0] for p in packed), 1)
+    section_of = np.full((len(packed), span), -1, dtype=np.int64)
+    offset = 0
+    for c, p in enumerate(packed):
+        local = p['section_of']
+        section_of[c, :local.shape[0]] = np.where(local >= 0, local + offset, -1)
+        offset += p['bits'].shape[0]
+
+    def starts(lengths):
+        return np.concatenate([[0], np.cumsum(np.concatenate(lengths))]).astype(np.int64)
+
+    return gather_columns(
+        np.concatenate([p['data'] for p in packed]),
+        starts([p['data_len'] for p in packed]),
+        np.concatenate([p['bits'] for p in packed]),
+        np.concatenate([p['remap'] for p in packed]),
+        starts([p['remap_len'] for p in packed]),
+        section_of,
+        np.array([p['min_section'] for p in packed], dtype=np.int64),
+        ys,
+    )
+
+
 class ChunkAnalyzer(IChunkAnalyzer):
-    def __init__(self, sections):
+    def __init__(self, sections, registry: BlockRegistry = BLOCKS):
         self.sections = sections
+        self.registry = registry
         self._build_lookup()
         if not sections:
             self.exist = False
@@ -504,15 +1202,47 @@ class ChunkAnalyzer(IChunkAnalyzer):
             block_data = block_states.get('data', [])
 
             palette_names = [block.get('Name', 'minecraft:air') for block in palette]
-            block_data_np = np.array(block_data, dtype=np.int64) if block_data else np.array([], dtype=np.int64)
+            block_data_np = np.asarray(block_data, dtype=np.int64)
 
             self.section_data.append({
                 'y': y_level,
                 'palette': palette_names,
+                'remap': self.registry.remap(palette_names),  # локальный индекс -> id реестра
                 'block_data': block_data_np,
                 'bits_per_block': max(4, (len(palette) - 1).bit_length()) if palette else 4,
                 'is_single_block': len(palette) == 1
             })
+        self._build_y_index()
+
+    def _build_y_index(self):
+        """
+        Плотная таблица секций по Y: self._by_y[section_y - self.min_section_y] -> секция или None.
+        При повторе Y берётся первая секция, как и при линейном поиске
+        """
+        ys = [section['y'] for section in self.section_data]
+        self.min_section_y = min(ys) if ys else 0
+        self.max_section_y = max(ys) if ys else -1
+        self._by_y = [None] * (self.max_section_y - self.min_section_y + 1)
+        for section in self.section_data:
+            slot = section['y'] - self.min_section_y
+            if self._by_y[slot] is None:
+                self._by_y[slot] = section
+
+    def section_at(self, section_y: int):
+        """Секция с данным Y за O(1), None если её нет"""
+        slot = section_y - self.min_section_y
+        if 0 <= slot < len(self._by_y):
+            return self._by_y[slot]
+        return None
+
+    def iter_sections(self, min_section_y: int, max_section_y: int):
+        """Существующие секции подряд по Y в диапазоне [min_section_y, max_section_y]"""
+        start = max(min_section_y, self.min_section_y) - self.min_section_y
+        stop = min(max_section_y, self.max_section_y) - self.min_section_y + 1
+        for slot in range(start, stop):
+            section = self._by_y[slot]
+            if section is not None:
+                yield section
 
 
     def look_for_block(self, block_name):
@@ -535,26 +1265,26 @@ class ChunkAnalyzer(IChunkAnalyzer):
 
         block_index = local_y * 256 + z * 16 + x
 
-        for section in self.section_data:
-            if section['y'] == section_y:
-                palette = section['palette']
+        section = self.section_at(section_y)
+        if section is None:
+            return "minecraft:air"
 
-                if not palette:
-                    return "minecraft:air"
+        palette = section['palette']
 
-                if section['is_single_block']:
-                    return palette[0]
+        if not palette:
+            return "minecraft:air"
 
-                block_id = extract_block_id_fast(
-                    section['block_data'],
-                    block_index,
-                    section['bits_per_block'],
-                    len(palette)
-                )
+        if section['is_single_block']:
+            return palette[0]
 
-                return palette[block_id] if block_id < len(palette) else "minecraft:air"
+        block_id = extract_block_id_fast(
+            section['block_data'],
+            block_index,
+            section['bits_per_block'],
+            len(palette)
+        )
 
-        return "minecraft:air"
+        return palette[block_id] if block_id < len(palette) else "minecraft:air"
 
     def get_palette(self):
         all_blocks = set()
@@ -562,53 +1292,140 @@ class ChunkAnalyzer(IChunkAnalyzer):
             all_blocks.update(section['palette'])
         return list(all_blocks)
 
-    def bulk_get_blocks(self, coordinates):
-        results = []
-        for x, y, z in coordinates:
-            results.append(self.get_block(x, y, z))
-        return results
-
-    def find_blocks_in_area(self, block_name, min_y=0, max_y=255):
-        locations = []
-
-        for section in self.section_data:
-            if not (min_y <= section['y'] * 16 <= max_y):
+    @staticmethod
+    def section_indices(section) -> np.ndarray:
+        """Индексы палитры всей секции uint16[y, z, x], распаковываются один раз"""
+        indices = section.get('indices')
+        if indices is None:
+            indices = unpack_section(section['block_data'], section['bits_per_block'])
+            # как и extract_block_id_fast: индекс вне палитры -> первый блок палитры
+            indices[indices >= max(len(section['palette']), 1)] = 0
+            section['indices'] = indices
+        return indices
+
+    def _dense(self, remap_of) -> np.ndarray:
+        sections = sorted((s for s in self.section_data if s['palette']), key=lambda s: s['y'])
+        if not sections:
+            self.min_y = 0
+            return np.zeros((0, 16, 16), dtype=np.uint16)
+
+        min_section = sections[0]['y']
+        height = (sections[-1]['y'] - min_section + 1) * 16
+        volume = np.zeros((height, 16, 16), dtype=np.uint16)
+        for section in sections:
+            start = (section['y'] - min_section) * 16
+            volume[start:start + 16] = remap_of(section)[self.section_indices(section)]
+        self.min_y = min_section * 16
+        return volume
+
+    def dense_volume(self):
+        """
+        Плотный объём чанка: индексы uint16[y, z, x] в общую палитру чанка.
+        Y отсчитывается от self.min_y, секций нет - (0, 16, 16)
+        :return: (volume, palette)
+        """
+        lookup = {"minecraft:air": 0}
+        volume = self._dense(lambda section: np.array(
+            [lookup.setdefault(name, len(lookup)) for name in section['palette']], dtype=np.uint16))
+        return volume, list(lookup) if volume.size else []
+
+    def dense_ids(self) -> np.ndarray:
+        """Плотный объём чанка сразу в id реестра, uint16[y, z, x] от self.min_y"""
+        return self._dense(lambda section: section['remap'])
+
+    def get_block_id(self, x, y, z) -> int:
+        return self.registry.id(self.get_block(x, y, z))
+
+    def bulk_get_block_ids(self, coordinates) -> np.ndarray:
+        """id реестра по массиву (x, y, z), каждая нужная секция распаковывается целиком один раз"""
+        cords = np.asarray(coordinates, dtype=np.int64).reshape(-1, 3)
+        results = np.full(len(cords), BlockRegistry.AIR_ID, dtype=np.uint16)
+        inside = (cords[:, 0] >= 0) & (cords[:, 0] < 16) & (cords[:, 2] >= 0) & (cords[:, 2] < 16)
+        section_y = cords[:, 1] // 16
+        if not len(cords):
+            return results
+
+        for section in self.iter_sections(int(section_y.min()), int(section_y.max())):
+            if not section['palette']:
                 continue
-
-            if block_name not in section['palette']:
+            rows = np.flatnonzero(inside & (section_y == section['y']))
+            if not rows.size:
                 continue
-
-            if section['is_single_block'] and section['palette'][0] == block_name:
-                for y in range(16):
-                    for z in range(16):
-                        for x in range(16):
-                            world_y = section['y'] * 16 + y
-                            if min_y <= world_y <= max_y:
-                                locations.append((x, world_y, z))
+            if section['is_single_block']:
+                results[rows] = section['remap'][0]
                 continue
+            picked = cords[rows]
+            local = self.section_indices(section)[picked[:, 1] - section['y'] * 16, picked[:, 2], picked[:, 0]]
+            results[rows] = section['remap'][local]
+        return results
 
-            palette_index = section['palette'].index(block_name)
-            bits_per_block = section['bits_per_block']
-            blocks_per_long = 64 // bits_per_block
+    def packed_sections(self) -> Dict[str, np.ndarray]:
+        """
+        Секции чанка плоскими массивами для gather_columns.
+        Не кешируется: это вторая копия block_data, которую ChunkCache не учитывает в nbytes
+        """
+        sections = self.section_data
+        index = {id(section): i for i, section in enumerate(sections)}
+        return {
+            'data': np.concatenate([s['block_data'] for s in sections] + [np.empty(0, np.int64)]),
+            'data_len': np.array([len(s['block_data']) for s in sections], dtype=np.int64),
+            'bits': np.array([0 if s['is_single_block'] else s['bits_per_block'] for s in sections],
+                             dtype=np.int64),
+            'remap': np.concatenate([s['remap'] for s in sections] + [np.empty(0, np.uint16)]),
+            'remap_len': np.array([len(s['remap']) for s in sections], dtype=np.int64),
+            'section_of': np.array([-1 if s is None else index[id(s)] for s in self._by_y], dtype=np.int64),
+            'min_section': self.min_section_y,
+        }
 
-            for long_index, long_val in enumerate(section['block_data']):
-                for block_in_long in range(blocks_per_long):
-                    bit_offset = block_in_long * bits_per_block
-                    block_id = (long_val >> bit_offset) & ((1 << bits_per_block) - 1)
+    def surface_block_ids(self, ys) -> np.ndarray:
+        """id реестра блоков на высотах ys[z * 16 + x] всех 256 столбцов, один вызов numba"""
+        return top_block_ids([self], np.asarray(ys).reshape(1, 256))[0]
 
-                    if block_id == palette_index:
-                        block_index = long_index * blocks_per_long + block_in_long
-                        if block_index < 4096:
-                            y_local = block_index // 256
-                            remainder = block_index % 256
-                            z_local = remainder // 16
-                            x_local = remainder % 16
+    def bulk_get_blocks(self, coordinates):
+        """Имена блоков по массиву (x, y, z)"""
+        names = self.registry.names
+        return [names[i] for i in self.bulk_get_block_ids(coordinates).tolist()]
+
+    def target_ids(self, blocks) -> np.ndarray:
+        """Имя, id или набор имён/id -> массив id реестра; блоков, которых нет в реестре, нет ни в одной палитре"""
+        if isinstance(blocks, (str, int, np.integer)):
+            blocks = [blocks]
+        ids = []
+        for block in blocks:
+            block_id = int(block) if isinstance(block, (int, np.integer)) else self.registry.get(block)
+            if block_id is not None:
+                ids.append(block_id)
+        return np.array(ids, dtype=np.uint16)
+
+    def find_blocks_in_area(self, blocks, min_y=0, max_y=255, chunk_cord=None) -> np.ndarray:
+        """
+        Координаты всех блоков из blocks (имя, id или набор) в диапазоне Y.
+        Секции без целевых блоков в палитре не распаковываются.
+        :param chunk_cord: (x, z) чанка, тогда x и z мировые, иначе локальные в чанке
+        :return: int32 (N, 3) как (x, y, z)
+        """
+        targets = self.target_ids(blocks)
+        offset_x, offset_z = (chunk_cord[0] * 16, chunk_cord[1] * 16) if chunk_cord is not None else (0, 0)
+        found = []
+
+        for section in self.iter_sections(min_y // 16, max_y // 16):
+            # битмап по палитре: какие локальные индексы - целевые блоки
+            bitmap = np.isin(section['remap'], targets)
+            if not bitmap.any():
+                continue
+
+            if section['is_single_block']:
+                ys, zs, xs = np.indices((16, 16, 16)).reshape(3, -1)
+            else:
+                ys, zs, xs = np.nonzero(bitmap[self.section_indices(section)])
 
-                            world_y = section['y'] * 16 + y_local
-                            if min_y <= world_y <= max_y:
-                                locations.append((x_local, world_y, z_local))
+            ys = ys + section['y'] * 16
+            keep = (ys >= min_y) & (ys <= max_y)
+            found.append(np.stack([xs[keep] + offset_x, ys[keep], zs[keep] + offset_z], axis=1))
 
-        return locations
+        if not found:
+            return np.empty((0, 3), dtype=np.int32)
+        return np.concatenate(found).astype(np.int32)
 
 
 
@@ -0,0 +1,142 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from pathlib import Path
+from typing import Dict, Tuple, Union
+import numpy as np
+
+from .ChunkAnalyzer import ChunkAnalyzer, ChunkLayout, HEIGHTMAP_NAMES
+from .BlockRegistry import BlockRegistry, BLOCKS
+from .Metrics import METRICS
+from ..models.Chunk import RawChunk, ChunkView, Dimensions
+
+# (измерение, файл региона, (x, z) чанка, mtime_ns файла региона)
+ChunkKey = Tuple[Dimensions, Path, Tuple[int, int], int]
+
+# грубая цена python-объектов секции (dict, палитра) поверх массивов
+SECTION_OVERHEAD = 1024
+
+
+@dataclass(frozen=True)
+class DecodedChunk:
+    """Разобранный чанк: секции внутри analyzer и карты высот (упакованные long), без исходных байтов"""
+    analyzer: ChunkAnalyzer
+    heightmaps: Dict[str, np.ndarray]
+    nbytes: int
+    data_version: int = -1
+    y_pos: Union[int, None] = None
+    height: Union[int, None] = None  # высота мира по секциям, ChunkLayout.height
+
+    def heightmap(self, name: str = "WORLD_SURFACE") -> Union[np.ndarray, None]:
+        return self.heightmaps.get(name)
+
+
+def decode_chunk(raw_data: Union[bytes, memoryview], registry: BlockRegistry = BLOCKS) -> DecodedChunk:
+    layout = ChunkLayout(raw_data)
+    analyzer = ChunkAnalyzer(layout.as_sections(names_only=True), registry)
+    heightmaps = {}
+    for name in HEIGHTMAP_NAMES:
+        longs = layout.heightmap(name)
+        if longs is not None:
+            heightmaps[name] = longs.astype(np.int64)
+
+    METRICS.count("chunks_decoded")
+    nbytes = sum(array.nbytes for array in heightmaps.values())
+    for section in analyzer.section_data:
+        nbytes += section['block_data'].nbytes + section['remap'].nbytes + SECTION_OVERHEAD
+        if not section['is_single_block']:
+            # section_indices распакует секцию позже, место под неё считаем сразу
+            nbytes += 4096 * np.dtype(np.uint16).itemsize
+    return DecodedChunk(analyzer, heightmaps, nbytes, layout.data_version, layout.y_pos, layout.height)
+
+
+class ChunkCache:
+    """
+    LRU разобранных чанков с ограничением по памяти.
+    Ключ - (измерение, файл региона, координаты, mtime региона): перезаписанный регион просто перестаёт
+    попадать в кеш, старые записи вытесняются сами.
+    Чанки без файла региона или mtime (RawChunk, собранный вручную) не кешируются: их ничто не различает
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[ChunkKey, Tuple[BlockRegistry, DecodedChunk]]" = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def key(chunk: Union[RawChunk, ChunkView]) -> Union[ChunkKey, None]:
+        """None - чанк нельзя кешировать"""
+        if chunk.region_path is None or not chunk.region_mtime:
+            return None
+        return chunk.dimension, chunk.region_path, chunk.cord, chunk.region_mtime
+
+    def get(self, chunk: Union[RawChunk, ChunkView], registry: BlockRegistry = BLOCKS) -> Union[DecodedChunk, None]:
+        """Разобранный чанк из кеша или разбор raw_data, None если чанка нет"""
+        if not chunk.exists:
+            return None
+        key = self.key(chunk)
+        if key is None:
+            return decode_chunk(chunk.raw_data, registry)
+        with self._lock:
+            entry = self._entries.get(key)
+            # remap секций привязан к реестру, с чужим реестром запись не годится
+            if entry is not None and entry[0] is registry:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                METRICS.count("chunk_cache_hits")
+                return entry[1]
+            self.misses += 1
+        METRICS.count("chunk_cache_misses")
+
+        # разбор вне блокировки, гонка двух потоков за один чанк безвредна
+        decoded = decode_chunk(chunk.raw_data, registry)
+        self.put(key, decoded, registry)
+        return decoded
+
+    def analyzer(self, chunk: RawChunk, registry: BlockRegistry = BLOCKS) -> Union[ChunkAnalyzer, None]:
+        decoded = self.get(chunk, registry)
+        return decoded.analyzer if decoded is not None else None
+
+    def put(self, key: ChunkKey, decoded: DecodedChunk, registry: BlockRegistry = BLOCKS):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1].nbytes
+            if decoded.nbytes > self.max_bytes:
+                return
+            self._entries[key] = (registry, decoded)
+            self.nbytes += decoded.nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+                METRICS.count("chunk_cache_evictions")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "nbytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, chunk: RawChunk) -> bool:
+        key = self.key(chunk)
+        return key is not None and key in self._entries
+
+
+# общий кеш процесса, используется по умолчанию
+CHUNKS = ChunkCache()
@@ -0,0 +1,185 @@
+import importlib
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+import numpy as np
+from numba import njit
+
+# байт сжатия в заголовке чанка .mca
+GZIP = 1
+ZLIB = 2
+UNCOMPRESSED = 3
+LZ4 = 4
+CUSTOM = 127
+# флаг: чанк не поместился в регион и лежит целиком в c.<x>.<z>.mcc рядом с .mca, сжатый тем же способом
+EXTERNAL = 0x80
+
+# совместимые с zlib модули по убыванию скорости, MCA_ZLIB=<модуль> выбирает конкретный
+ZLIB_BACKENDS = ("isal.isal_zlib", "zlib_ng.zlib_ng", "zlib")
+
+# кадр LZ4BlockOutputStream из lz4-java, которым пишет игра
+LZ4_MAGIC = b"LZ4Block"
+LZ4_HEADER = struct.Struct("<8sBiii")  # magic, метод | уровень, сжатая длина, исходная длина, checksum
+LZ4_RAW = 0x10
+LZ4_COMPRESSED = 0x20
+
+# распаковщик получает bytes или memoryview поверх mmap региона и возвращает свои bytes,
+# ссылок на входной буфер в результате оставаться не должно
+Decompressor = Callable[[Union[bytes, memoryview]], bytes]
+
+
+class ChunkReadError(ValueError):
+    """Чанк не удалось распаковать: неизвестное сжатие, битые данные или нет файла .mcc"""
+
+
+def _zlib_backend():
+    forced = os.environ.get("MCA_ZLIB")
+    for name in (forced,) if forced else ZLIB_BACKENDS:
+        try:
+            return name, importlib.import_module(name)
+        except ImportError:
+            continue
+    return "zlib", zlib
+
+
+ZLIB_BACKEND, _zlib = _zlib_backend()
+
+try:
+    import lz4.block as _lz4
+    LZ4_BACKEND = "lz4"
+except ImportError:
+    _lz4 = None
+    LZ4_BACKEND = "numba"
+
+
+@njit(cache=True)
+def lz4_block_decode(src: np.ndarray, dst: np.ndarray) -> int:
+    """
+    Один блок LZ4 (без кадра) из src в dst, оба uint8.
+    :return: число записанных байт, -1 если данные битые или не влезают в dst
+    """
+    n = src.shape[0]
+    cap = dst.shape[0]
+    i = 0
+    o = 0
+    while i < n:
+        token = np.int64(src[i])
+        i += 1
+        literals = token >> 4
+        if literals == 15:
+            while i < n:
+                b = np.int64(src[i])
+                i += 1
+                literals += b
+                if b != 255:
+                    break
+        if i + literals > n or o + literals > cap:
+            return -1
+        dst[o:o + literals] = src[i:i + literals]
+        i += literals
+        o += literals
+        # последняя последовательность состоит только из литералов
+        if i >= n:
+            break
+
+        if i + 2 > n:
+            return -1
+        offset = np.int64(src[i]) | (np.int64(src[i + 1]) << 8)
+        i += 2
+        if offset == 0 or offset > o:
+            return -1
+        match = token & 15
+        if match == 15:
+            while i < n:
+                b = np.int64(src[i])
+                i += 1
+                match += b
+                if b != 255:
+                    break
+        match += 4
+        if o + match > cap:
+            return -1
+        # копии могут перекрываться (offset < match), поэтому побайтно
+        for k in range(match):
+            dst[o + k] = dst[o - offset + k]
+        o += match
+    return o
+
+
+def lz4_block(payload: bytes, size: int) -> bytes:
+    if _lz4 is not None:
+        return _lz4.decompress(payload, uncompressed_size=size)
+    dst = np.empty(size, dtype=np.uint8)
+    written = lz4_block_decode(np.frombuffer(payload, dtype=np.uint8), dst)
+    if written != size:
+        raise ChunkReadError("corrupt LZ4 block")
+    return dst.tobytes()
+
+
+def lz4_java(data: bytes) -> bytes:
+    """Поток LZ4BlockOutputStream: блоки с заголовком LZ4_HEADER до пустого завершающего. Checksum не проверяется"""
+    # срезы memoryview держали бы буфер региона, пока жив traceback ошибки
+    data = bytes(data)
+    parts = []
+    pos = 0
+    while pos + LZ4_HEADER.size <= len(data):
+        magic, token, packed, size, _ = LZ4_HEADER.unpack_from(data, pos)
+        if magic != LZ4_MAGIC or packed < 0 or size < 0:
+            raise ChunkReadError("bad LZ4 block header")
+        pos += LZ4_HEADER.size
+        if size == 0:
+            break
+        payload = data[pos:pos + packed]
+        pos += packed
+        method = token & 0xF0
+        if method == LZ4_RAW:
+            parts.append(payload)
+        elif method == LZ4_COMPRESSED:
+            parts.append(lz4_block(payload, size))
+        else:
+            raise ChunkReadError(f"unknown LZ4 block method {method:#x}")
+    return b"".join(parts)
+
+
+# сжатие -> распаковщик, register добавляет свои
+DECOMPRESSORS: Dict[int, Decompressor] = {
+    GZIP: lambda data: _zlib.decompress(data, 31),
+    ZLIB: lambda data: _zlib.decompress(data),
+    UNCOMPRESSED: bytes,
+    LZ4: lz4_java,
+}
+
+
+def register(compression: int, fn: Decompressor):
+    DECOMPRESSORS[compression] = fn
+
+
+def external_path(region_dir: Path, x: int, z: int) -> Path:
+    return region_dir / f"c.{x}.{z}.mcc"
+
+
+def decompress(compression: int, data: Union[bytes, memoryview], external: Optional[Path] = None) -> bytes:
+    """
+    Распаковка тела чанка по байту сжатия.
+    :param external: файл .mcc, из него берутся данные, если в compression стоит EXTERNAL
+    """
+    if compression & EXTERNAL:
+        if external is None:
+            raise ChunkReadError("external chunk without region directory")
+        try:
+            data = external.read_bytes()
+        except OSError as e:
+            raise ChunkReadError(f"missing external chunk {external.name}") from e
+        compression &= ~EXTERNAL
+
+    fn = DECOMPRESSORS.get(compression)
+    if fn is None:
+        raise ChunkReadError(f"unsupported compression type {compression}")
+    try:
+        return fn(data)
+    except ChunkReadError:
+        raise
+    except Exception as e:
+        raise ChunkReadError(f"compression type {compression}: {e}") from e
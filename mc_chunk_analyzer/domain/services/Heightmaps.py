@@ -0,0 +1,103 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+from numba import njit
+import numpy as np
+
+from .ChunkAnalyzer import unpack_indices
+from ..models.Chunk import Dimensions
+
+# 20w17a (1.16): значения перестали переходить через границу long
+SPANNING_BEFORE = 2526
+# 1.18: верхний мир стал -64..320
+TALL_OVERWORLD_FROM = 2825
+
+
+def world_range(dimension: Dimensions, data_version: int, y_pos: Optional[int] = None,
+                height: Optional[int] = None) -> Tuple[int, int]:
+    """
+    (min_y, высота мира) для измерения и версии.
+    yPos и высота по секциям чанка (1.18+) точнее версии и учитывают высоту из датапака
+    """
+    if dimension == "Overworld" and data_version >= TALL_OVERWORLD_FROM:
+        min_y, default_height = -64, 384
+    else:
+        min_y, default_height = 0, 256
+    if y_pos is not None:
+        min_y = y_pos * 16
+    return min_y, height or default_height
+
+
+def heightmap_bits(height: int) -> int:
+    """Бит на значение карты высот: хранятся числа 0..height включительно"""
+    return max(int(height).bit_length(), 1)
+
+
+def heightmap_longs(bits: int, spanning: bool) -> int:
+    """Число long в карте высот из 256 значений"""
+    if spanning:
+        return -(-256 * bits // 64)
+    return -(-256 // (64 // bits))
+
+
+def heightmap_layout(count: int, data_version: int, height: int) -> Tuple[int, bool]:
+    """
+    (bits, spanning) для карты высот из count long.
+    bits берутся из высоты мира; если длина с ней не сходится, подбираются по длине,
+    но только когда подходит ровно одно значение: без переноса через long 11 и 12 бит дают те же 52 long
+    """
+    spanning = data_version < SPANNING_BEFORE
+    bits = heightmap_bits(height)
+    if heightmap_longs(bits, spanning) == count:
+        return bits, spanning
+    fits = [bits for bits in range(1, 17) if heightmap_longs(bits, spanning) == count]
+    if len(fits) == 1:
+        return fits[0], spanning
+    if fits:
+        raise ValueError(f"Ambiguous heightmap length {count} for height {height}: bits {fits}")
+    raise ValueError(f"Unexpected heightmap length {count} for DataVersion {data_version}")
+
+
+@njit(cache=True)
+def unpack_heightmaps(longs, bits, spanning):
+    """Пачка карт высот одной раскладки: (N, L) int64 -> (N, 256) int64 за один вызов"""
+    n = longs.shape[0]
+    res = np.empty((n, 256), dtype=np.int64)
+    for i in range(n):
+        res[i] = unpack_indices(longs[i], bits, 256, spanning)
+    return res
+
+
+def surface_ys(longs: Sequence[Optional[np.ndarray]], data_versions: Sequence[int],
+               y_positions: Sequence[Optional[int]], dimension: Dimensions,
+               heights: Optional[Sequence[Optional[int]]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Y верхнего блока по картам высот пачки чанков.
+    Чанки группируются по раскладке, каждая группа распаковывается одним вызовом unpack_heightmaps
+    :param heights: высота мира по каждому чанку (DecodedChunk.height), None - по измерению и версии
+    :return: Y (N, 256) int64, индекс z * 16 + x, и маска (N,) чанков, у которых карта высот разобралась
+    """
+    n = len(longs)
+    ys = np.zeros((n, 256), dtype=np.int64)
+    valid = np.zeros(n, dtype=bool)
+    min_ys = np.zeros(n, dtype=np.int64)
+    groups: Dict[Tuple[int, int, bool], List[int]] = defaultdict(list)
+
+    for i in range(n):
+        min_ys[i], height = world_range(dimension, data_versions[i], y_positions[i],
+                                        heights[i] if heights is not None else None)
+        if longs[i] is None or not len(longs[i]):
+            continue
+        try:
+            bits, spanning = heightmap_layout(len(longs[i]), data_versions[i], height)
+        except ValueError:
+            continue
+        groups[(len(longs[i]), bits, spanning)].append(i)
+
+    for (_, bits, spanning), rows in groups.items():
+        stacked = np.stack([longs[i] for i in rows]).astype(np.int64)
+        ys[rows] = unpack_heightmaps(stacked, bits, spanning)
+        valid[rows] = True
+
+    # в карте высот число блоков над дном мира: верхний блок на единицу ниже
+    ys += min_ys[:, None] - 1
+    return ys, valid
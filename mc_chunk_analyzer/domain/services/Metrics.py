@@ -0,0 +1,256 @@
+import json
+import os
+import re
+import time
+from bisect import bisect_left
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+# границы корзин гистограмм в секундах: от 1 мкс до 100 с, 10 корзин на порядок
+BUCKETS = tuple(10 ** (e / 10) for e in range(-60, 21))
+QUANTILES = (0.5, 0.95, 0.99)
+PREFIX = "mca"
+
+
+class Histogram:
+    """Счётчики по логарифмическим корзинам BUCKETS, складываются между процессами без потерь"""
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        # последняя корзина - всё, что больше BUCKETS[-1]
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: Dict[str, Any]):
+        for i, n in enumerate(other["counts"]):
+            self.counts[i] += n
+        self.count += other["count"]
+        self.total += other["total"]
+        self.min = min(self.min, other["min"])
+        self.max = max(self.max, other["max"])
+
+    def quantile(self, q: float) -> float:
+        """Верхняя граница корзины, в которую попал квантиль, не больше максимума"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                bound = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return max(min(bound, self.max), self.min)
+        return self.max
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"counts": list(self.counts), "count": self.count, "total": self.total,
+                "min": self.min, "max": self.max}
+
+
+class _Timer:
+    __slots__ = ("_metrics", "_name", "_start")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self._metrics.observe(self._name, time.perf_counter() - self._start)
+
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_NO_TIMER = _NoTimer()
+
+
+def _enabled_from_env() -> bool:
+    return os.environ.get("MCA_METRICS", "1").lower() not in ("0", "false", "off", "no")
+
+
+class Metrics:
+    """
+    Счётчики и гистограммы времени стадий.
+        with METRICS.stage("nbt_reading"): ...
+        METRICS.count("bytes_decompressed", len(data))
+    Потокобезопасно. Из воркеров пула данные приходят через snapshot/merge (это делает ChunkManager.map_regions).
+    enabled = False (или MCA_METRICS=0 в окружении) превращает вызовы в проверку одного флага
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = _enabled_from_env() if enabled is None else enabled
+        self._counters: Dict[str, int] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = Lock()
+
+    def stage(self, name: str):
+        """Контекстный менеджер: время блока попадает в гистограмму name"""
+        if not self.enabled:
+            return _NO_TIMER
+        return _Timer(self, name)
+
+    def observe(self, name: str, seconds: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name: str, value: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def counter(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def histogram(self, name: str) -> Optional[Histogram]:
+        return self._histograms.get(name)
+
+    # ---------- между процессами ----------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Состояние простыми типами: пиклится и сериализуется в JSON"""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {name: h.as_dict() for name, h in self._histograms.items()},
+            }
+
+    def drain(self) -> Dict[str, Any]:
+        """snapshot и обнуление, для передачи прироста из воркера"""
+        with self._lock:
+            snapshot = {
+                "counters": self._counters,
+                "histograms": {name: h.as_dict() for name, h in self._histograms.items()},
+            }
+            self._counters = {}
+            self._histograms = {}
+        return snapshot
+
+    def merge(self, snapshot: Dict[str, Any]):
+        with self._lock:
+            for name, value in snapshot["counters"].items():
+                self._counters[name] = self._counters.get(name, 0) + value
+            for name, data in snapshot["histograms"].items():
+                histogram = self._histograms.get(name)
+                if histogram is None:
+                    histogram = self._histograms[name] = Histogram()
+                histogram.merge(data)
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+    # ---------- экспорт ----------
+
+    def hit_rates(self) -> Dict[str, float]:
+        """Доля попаданий для каждой пары счётчиков <name>_hits / <name>_misses"""
+        rates = {}
+        for name, hits in self._counters.items():
+            if name.endswith("_hits"):
+                base = name[:-len("_hits")]
+                total = hits + self._counters.get(base + "_misses", 0)
+                rates[base] = hits / total if total else 0.0
+        return rates
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {
+                name: {
+                    "count": h.count,
+                    "total": h.total,
+                    "mean": h.total / h.count if h.count else 0.0,
+                    **{f"p{round(q * 100)}": h.quantile(q) for q in QUANTILES},
+                    "max": h.max,
+                }
+                for name, h in self._histograms.items()
+            }
+            return {"counters": dict(self._counters), "hit_rates": self.hit_rates(), "stages": stages}
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.summary(), indent=indent)
+
+    def to_prometheus(self, prefix: str = PREFIX) -> str:
+        """Текстовый формат Prometheus: счётчики как <prefix>_<name>_total, стадии - гистограмма <prefix>_stage_seconds"""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                metric = f"{prefix}_{_metric_name(name)}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {self._counters[name]}")
+
+            if self._histograms:
+                metric = f"{prefix}_stage_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+            for name in sorted(self._histograms):
+                h = self._histograms[name]
+                label = f'stage="{_metric_name(name)}"'
+                cumulative = 0
+                for bound, n in zip(BUCKETS, h.counts):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{{label},le="{bound:.6g}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {h.count}')
+                lines.append(f"{metric}_sum{{{label}}} {h.total!r}")
+                lines.append(f"{metric}_count{{{label}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def report(self):
+        summary = self.summary()
+        print(f"\n{'=' * 20} PERFORMANCE REPORT {'=' * 20}")
+        print(f"{'Stage':<20} | {'Total (s)':>10} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'p99 (ms)':>9} | {'Calls':>7}")
+        print("-" * 80)
+        for name, s in sorted(summary["stages"].items(), key=lambda item: item[1]["total"], reverse=True):
+            print(f"{name:<20} | {s['total']:>10.4f} | {s['p50'] * 1e3:>9.3f} | {s['p95'] * 1e3:>9.3f} | "
+                  f"{s['p99'] * 1e3:>9.3f} | {s['count']:>7}")
+        for name, value in sorted(summary["counters"].items()):
+            print(f"{name:<20} | {value}")
+        for name, rate in sorted(summary["hit_rates"].items()):
+            print(f"{name + ' hit rate':<20} | {rate:.1%}")
+        print("=" * 80)
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def measured(enabled: bool, fn, *args):
+    """
+    Обёртка воркера пула: fn(*args) и прирост METRICS этого процесса за вызов.
+    Перед вызовом состояние сбрасывается - после fork в воркере остаются чужие данные родителя
+    """
+    METRICS.enabled = enabled
+    METRICS.reset()
+    result = fn(*args)
+    return result, METRICS.drain()
+
+
+# общие метрики процесса
+METRICS = Metrics()
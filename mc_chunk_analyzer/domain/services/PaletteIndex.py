@@ -0,0 +1,131 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, List, Union
+import numpy as np
+
+from .ChunkAnalyzer import McaParser, ChunkLayout, NBTTagReader, SEC_Y
+from .BlockRegistry import BlockRegistry, BLOCKS
+from ..models.Region import RawRegion
+
+# версия формата файла индекса, при изменении старые файлы перестраиваются
+INDEX_VERSION = 1
+
+
+class RegionPaletteIndex:
+    """
+    Палитры всех секций одного региона, без данных блоков.
+    Строка = секция: slot чанка в регионе (z * 32 + x), Y секции и срез block_ids[start[i]:start[i + 1]]
+    """
+
+    def __init__(self, slots: np.ndarray, ys: np.ndarray, start: np.ndarray,
+                 block_ids: np.ndarray, unknown: np.ndarray):
+        self.slots = slots          # int16 (rows,)
+        self.ys = ys                # int16 (rows,)
+        self.start = start          # int32 (rows + 1,)
+        self.block_ids = block_ids  # uint16 id реестра
+        self.unknown = unknown      # bool (1024,), чанки, которые не удалось разобрать при построении
+        self._row_of = np.repeat(np.arange(len(slots)), np.diff(start))
+
+    def candidate_chunks(self, targets: np.ndarray) -> np.ndarray:
+        """bool (1024,) по слотам таблицы чанков: где хотя бы одна палитра содержит цель"""
+        mask = self.unknown.copy()
+        mask[self.slots[self._row_of[np.isin(self.block_ids, targets)]]] = True
+        return mask
+
+
+class PaletteIndex:
+    """
+    Файлы индекса палитр в cache_dir, по одному на .mca.
+    Файл действителен, пока у региона те же путь, mtime и размер, иначе перестраивается при обращении
+    """
+
+    def __init__(self, cache_dir: Path, registry: BlockRegistry = BLOCKS):
+        self.cache_dir = Path(cache_dir)
+        self._registry = registry
+
+    def index_path(self, region_path: Path) -> Path:
+        region_path = Path(region_path)
+        digest = hashlib.sha1(str(region_path.resolve()).encode()).hexdigest()[:12]
+        return self.cache_dir / f"{region_path.stem}.{digest}.palette.npz"
+
+    @staticmethod
+    def _key(region_path: Path) -> np.ndarray:
+        stat = os.stat(region_path)
+        return np.array([INDEX_VERSION, stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+
+    def get(self, region: RawRegion) -> RegionPaletteIndex:
+        """Индекс региона: из кеша, если он не устарел, иначе строится и сохраняется"""
+        key = self._key(region.path)
+        path = self.index_path(region.path)
+        stored = self._load(path, key)
+        if stored is None:
+            stored = self._build(region)
+            self._save(path, key, stored)
+
+        names = stored["names"].tolist()
+        remap = self._registry.remap(names) if names else np.empty(0, dtype=np.uint16)
+        return RegionPaletteIndex(
+            slots=stored["slots"],
+            ys=stored["ys"],
+            start=stored["start"],
+            block_ids=remap[stored["blocks"]],
+            unknown=stored["unknown"],
+        )
+
+    @staticmethod
+    def _load(path: Path, key: np.ndarray) -> Union[Dict[str, np.ndarray], None]:
+        if not path.is_file():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                if not np.array_equal(stored["key"], key):
+                    return None
+                return {name: stored[name] for name in stored.files}
+        except (OSError, ValueError, KeyError):
+            # битый или чужой файл просто перестраиваем
+            return None
+
+    def _save(self, path: Path, key: np.ndarray, stored: Dict[str, np.ndarray]):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, key=key, **stored)
+        # атомарная замена: воркеры могут строить один и тот же индекс одновременно
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _build(region: RawRegion) -> Dict[str, np.ndarray]:
+        table = McaParser.build_chunk_table(region.data, region.cord)
+        names: Dict[str, int] = {}
+        slots: List[int] = []
+        ys: List[int] = []
+        start: List[int] = [0]
+        blocks: List[int] = []
+        unknown = np.zeros(1024, dtype=bool)
+
+        for slot in np.flatnonzero(table["offset"]).tolist():
+            try:
+                # напрямую через read_chunk, чтобы не держать распакованные чанки всего региона
+                raw = McaParser.read_chunk(region.data, table[slot], Path(region.path).parent)
+                if raw is None:
+                    continue
+                layout = ChunkLayout(raw)
+                reader = NBTTagReader(raw)
+                for i in range(len(layout.sections)):
+                    palette = layout.palette(i, reader, names_only=True)
+                    slots.append(slot)
+                    ys.append(int(layout.sections[i, SEC_Y]))
+                    blocks.extend(names.setdefault(b.get("Name", "minecraft:air"), len(names)) for b in palette)
+                    start.append(len(blocks))
+            except Exception:
+                unknown[slot] = True
+
+        return {
+            "names": np.array(list(names), dtype=np.str_),
+            "slots": np.array(slots, dtype=np.int16),
+            "ys": np.array(ys, dtype=np.int16),
+            "start": np.array(start, dtype=np.int32),
+            "blocks": np.array(blocks, dtype=np.int32),
+            "unknown": unknown,
+        }
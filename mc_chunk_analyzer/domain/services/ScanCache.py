@@ -0,0 +1,77 @@
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, Generic, Optional, Tuple, TypeVar
+import numpy as np
+
+T = TypeVar("T")
+
+# версия формата файла кеша, при изменении старый файл игнорируется
+CACHE_VERSION = 1
+# в таблице меток: результата для слота нет, чанк нужно разобрать
+UNKNOWN = -1
+
+
+class RegionState(Generic[T]):
+    """
+    Результаты прошлого прохода по одному региону.
+    stamps[slot] - timestamp чанка из заголовка .mca, для которого посчитан results[slot], UNKNOWN если не считали
+    """
+
+    def __init__(self):
+        self.file_key: Tuple[int, int] = (0, 0)  # (mtime_ns, size) файла региона
+        self.stamps = np.full(1024, UNKNOWN, dtype=np.int64)
+        self.results: Dict[int, T] = {}
+
+    def merge(self, stamps: np.ndarray, changed: np.ndarray, results: Dict[int, T]):
+        """changed - слоты, которые пересчитали; слот без результата значит, что чанка больше нет"""
+        for slot in changed.tolist():
+            if slot in results:
+                self.results[slot] = results[slot]
+            else:
+                self.results.pop(slot, None)
+        self.stamps[changed] = stamps[changed]
+
+
+class ScanCache(Generic[T]):
+    """
+    Состояние инкрементального скана для ChunkManager.scan_incremental: метки и результаты по регионам.
+    Между запусками хранится в файле path (pickle), результаты экстрактора должны пиклиться
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path is not None else None
+        self.regions: Dict[str, RegionState[T]] = {}
+        # сколько чанков разобрано и сколько взято из кеша за последний скан
+        self.decoded = 0
+        self.reused = 0
+
+    def region(self, region_path: Path) -> RegionState[T]:
+        key = str(Path(region_path).resolve())
+        state = self.regions.get(key)
+        if state is None:
+            state = self.regions[key] = RegionState()
+        return state
+
+    @classmethod
+    def load(cls, path: Path) -> "ScanCache[T]":
+        """Кеш из файла, пустой если файла нет или он от другой версии"""
+        cache = cls(path)
+        try:
+            with open(path, "rb") as f:
+                version, regions = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError):
+            return cache
+        if version == CACHE_VERSION:
+            cache.regions = regions
+        return cache
+
+    def save(self, path: Optional[Path] = None):
+        path = Path(path) if path is not None else self.path
+        if path is None:
+            raise ValueError("ScanCache has no path to save to")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump((CACHE_VERSION, self.regions), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
@@ -1,164 +1,169 @@
+import logging
 from pathlib import Path
-from typing import List, Union
-from numba import njit
+from typing import Iterable, List, Union, Tuple
 import numpy as np
 
 
-from .ChunkAnalyzer import NBTTagReader, ChunkAnalyzer
-from ..models.Chunk import RawChunk, Corners, Dimensions
-from .utils import ChunkManager, Profiler
-
-
-@njit(fastmath=True)
-def build_cords(ys: np.ndarray, dim: Dimensions):
-    res = np.empty((256, 3), dtype=np.int64)
-    height_diff = 65 if dim == "Overworld" else 1
-    for z in range(16):
-        for x in range(16):
-            idx = z * 16 + x
-            res[idx, 0] = x
-            res[idx, 1] = np.int64(ys[idx] - height_diff)
-            res[idx, 2] = z
-
-    return res
-
-#skip first bit because only 63 can be easily divided by 9
-@njit(fastmath=True)
-def extract_heights(heights_longs: np.ndarray):
-    res = np.zeros(256, dtype=np.int64)
-    mask = np.int64((1 << 9) - 1)
-
-    for i in range(37):
-        current_long = heights_longs[i]
-        for j in range(7):
-            idx = i * 7 + j
-            if idx < 256:
-                res[idx] = (current_long >> (j * 9)) & mask
-    return res
-
-
-prof = Profiler()
+from .ChunkAnalyzer import McaParser, top_block_ids
+from .BlockRegistry import BlockRegistry, BLOCKS
+from .ChunkCache import ChunkCache, DecodedChunk, CHUNKS, decode_chunk
+from .Heightmaps import surface_ys
+from ..models.Chunk import RawChunk, ChunkTable, DIMENSIONS, Corners, Dimensions, SurfaceBatch, SurfaceRaster
+from ..models.Region import RawRegion
+from .Metrics import METRICS
+from .utils import ChunkManager, Bounds, in_bounds
+
+log = logging.getLogger(__name__)
+
+
+def surfaces(decoded: List[DecodedChunk], dimension: Dimensions) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Поверхность пачки разобранных чанков.
+    :return: Y (N, 256) int64, id реестра (N, 256) uint16 и маска (N,) чанков с картой высот
+    """
+    with METRICS.stage("heightmaps"):
+        ys, valid = surface_ys(
+            [chunk.heightmap("WORLD_SURFACE") for chunk in decoded],
+            [chunk.data_version for chunk in decoded],
+            [chunk.y_pos for chunk in decoded],
+            dimension,
+            [chunk.height for chunk in decoded],
+        )
+
+    with METRICS.stage("top_blocks"):
+        blocks = np.zeros((len(decoded), 256), dtype=np.uint16)
+        rows = np.flatnonzero(valid)
+        blocks[rows] = top_block_ids([decoded[i].analyzer for i in rows.tolist()], ys[rows])
+
+    return ys, blocks, valid
+
+
+def chunk_surface(raw_data: bytes, dimension: Dimensions,
+                  registry: BlockRegistry = BLOCKS) -> Union[Tuple[np.ndarray, np.ndarray], None]:
+    """Y и id реестра верхнего блока для каждого из 256 столбцов чанка, None если нет карты высот"""
+    with METRICS.stage("nbt_reading"):
+        decoded = decode_chunk(raw_data, registry)
+    return decoded_surface(decoded, dimension)
+
+
+def decoded_surface(decoded: DecodedChunk, dimension: Dimensions) -> Union[Tuple[np.ndarray, np.ndarray], None]:
+    """chunk_surface по уже разобранному чанку, например из ChunkCache"""
+    ys, blocks, valid = surfaces([decoded], dimension)
+    if not valid[0]:
+        return None
+    return ys[0], blocks[0]
+
+
+def _surface_batch(cords: List[Tuple[int, int]], decoded: List[DecodedChunk], dimension: Dimensions,
+                   palette: List[str]) -> SurfaceBatch:
+    ys, blocks, valid = surfaces(decoded, dimension)
+    return SurfaceBatch(
+        cords=np.array(cords, dtype=np.int32).reshape(-1, 2)[valid],
+        heights=ys[valid].astype(np.int16),
+        blocks=blocks[valid],
+        palette=palette,
+    )
+
+
+def project_region(path: Path, dimension: Dimensions, bounds: Bounds) -> SurfaceBatch:
+    """
+    Воркер для ChunkManager.scan: проекция поверхности чанков одного региона.
+    id блоков локальные для региона, palette - их имена; в общий реестр их переводит project_parallel
+    """
+    cords, decoded = [], []
+    registry = BlockRegistry()
+
+    with RawRegion(path, dimension) as raw:
+        region = McaParser().parse(raw)
+        for chunk in region.raw_chunks.readable(in_bounds(region.table, bounds)):
+            try:
+                with METRICS.stage("nbt_reading"):
+                    decoded.append(decode_chunk(chunk.raw_data, registry))
+            except Exception as e:
+                log.warning("Error at %s: %s", chunk.abs_cord, e)
+                METRICS.count("chunks_failed")
+                continue
+            cords.append(chunk.abs_cord.as_tuple)
+
+    return _surface_batch(cords, decoded, dimension, registry.names)
+
+
+def project_parallel(manager: ChunkManager, corners: Corners,
+                     registry: BlockRegistry = BLOCKS) -> List[SurfaceBatch]:
+    """
+    Проекция поверхности по регионам в пуле процессов ChunkManager.
+    blocks в результате - id общего реестра, palette - registry.names
+    """
+    result = []
+    for batch in manager.scan(corners, project_region):
+        if not len(batch):
+            continue
+        blocks = registry.remap(batch.palette)[batch.blocks]
+        result.append(SurfaceBatch(batch.cords, batch.heights, blocks, registry.names))
+    return result
 
 class GroundProjector:
-    def __init__(self, chunks: List[RawChunk]):
-        self.min_x = 0
-        self.min_z = 0
-        self._chunks_arr = self._build_chunk_matrix(chunks)
-
-    def _build_chunk_matrix(self, chunks: List[RawChunk]) -> List[List[Union[RawChunk, None]]]:
-        if not chunks:
-            return []
-
-        all_x = [chunk.abs_cord.x for chunk in chunks]
-        all_z = [chunk.abs_cord.z for chunk in chunks]
-
-        self.min_x, max_x = min(all_x), max(all_x)
-        self.min_z, max_z = min(all_z), max(all_z)
-
-        width = max_x - self.min_x + 1
-        height = max_z - self.min_z + 1
-
-        # 3. Создаем пустую матрицу [Rows][Cols] -> [Z][X]
-        # Мы инициализируем её так, чтобы matrix[z][x] не вызывал IndexError
-        matrix = [[None for _ in range(width)] for _ in range(height)]
-
-        # 4. Заполняем матрицу
-        for chunk in chunks:
-            # Индекс столбца (X)
-            x_idx = chunk.abs_cord.x - self.min_x
-            # Индекс строки (Z)
-            z_idx = chunk.abs_cord.z - self.min_z
-
-            # Кладём чанк в матрицу: сначала Z, потом X
-            matrix[z_idx][x_idx] = chunk
-
-        return matrix
-
-    # def project(self) -> List[List[np.ndarray]]:
-    #     """
-    #     Преобразует чанки в данные о блоках на поверхности.
-    #     """
-    #     # Инициализируем структуру результата той же размерности, что и матрица чанков
-    #     width = len(self._chunks_arr)
-    #     height = len(self._chunks_arr[0]) if width > 0 else 0
-    #
-    #     data_parsed = [[None for _ in range(height)] for _ in range(width)]
-    #
-    #     for x_idx in range(width):
-    #         for z_idx in range(height):
-    #             chunk = self._chunks_arr[x_idx][z_idx]
-    #
-    #             if chunk is None:
-    #                 data_parsed[x_idx][z_idx] = np.zeros((16, 16), dtype=int)
-    #                 continue
-    #
-    #             try:
-    #                 reader = NBTTagReader(chunk.raw_data)
-    #                 chunk_nbt = reader.read().value
-    #                 level_data = chunk_nbt.get("Level", chunk_nbt)
-    #                 heightmaps = level_data.get("Heightmaps", {})
-    #                 heights_raw = heightmaps.get("WORLD_SURFACE")
-    #
-    #                 if heights_raw is None:
-    #                     continue
-    #
-    #                 heights = extract_heights(np.array(heights_raw))
-    #                 sections = level_data.get("sections", [])
-    #                 if not sections:
-    #                     continue
-    #                 parser = ChunkAnalyzer(sections)
-    #                 cords = build_cords(heights, chunk.dimension)
-    #
-    #                 blocks = parser.bulk_get_blocks(cords)
-    #                 data_parsed[x_idx][z_idx] = blocks
-    #
-    #
-    #             except Exception as e:
-    #                 data_parsed[x_idx][z_idx] = None
-
-        return data_parsed
-
-    def project(self):
-        width = len(self._chunks_arr)
-        height = len(self._chunks_arr[0]) if width > 0 else 0
-        data_parsed = [[None for _ in range(height)] for _ in range(width)]
-
-        for x_idx in range(width):
-            for z_idx in range(height):
-                chunk = self._chunks_arr[x_idx][z_idx]
-                if chunk is None: continue
-
-                try:
-                    # 1. Замеряем чтение NBT (самое тяжелое место обычно тут)
-                    with prof("NBT Reading"):
-                        reader = NBTTagReader(chunk.raw_data)
-                        chunk_nbt = reader.read().value
-                        level_data = chunk_nbt.get("Level", chunk_nbt)
-
-                    # 2. Замеряем распаковку высот
-                    with prof("Heightmaps Extract"):
-                        heights_raw = level_data.get("Heightmaps", {}).get("WORLD_SURFACE")
-                        if heights_raw is None: continue
-                        heights = extract_heights(np.array(heights_raw))
-                        cords = build_cords(heights)
-
-                    # 3. Замеряем поиск блоков в секциях
-                    with prof("Chunk Analysis"):
-                        sections = level_data.get("sections", [])
-                        parser = ChunkAnalyzer(sections)
-                        blocks = parser.bulk_get_blocks(cords)
-                        data_parsed[x_idx][z_idx] = blocks
-
-                except Exception as e:
-                    print(f"Error at {chunk.abs_cord}: {e}")
-
-        # Печатаем результат в конце работы
-        prof.report()
-        return data_parsed
-
-
-cm = ChunkManager(Path(r"C:\Users\Taras\AppData\Roaming\PrismLauncher\instances\Quantum Tech\minecraft\.bobby\Andrey2006.go.ro_25565\1892924735912129312\minecraft\the_nether"), "Nether")
-corners = Corners(-100,20,0,60)
-c = cm.get_chunks(corners)
-gp = GroundProjector(c)
-a = gp.project()
+    def __init__(self, chunks: Union[ChunkTable, Iterable[RawChunk]], cache: Union[ChunkCache, None] = CHUNKS):
+        """
+        :param chunks: ChunkTable из ChunkManager.get_chunks, список RawChunk переводится в таблицу
+        :param cache: кеш разобранных чанков, None - разбирать каждый раз заново
+        """
+        table = chunks if isinstance(chunks, ChunkTable) else ChunkTable.from_chunks(chunks)
+        self._chunks = table.select(table.present)
+        self._cache = cache
+        self.min_x, self.min_z = (int(table.x.min()), int(table.z.min())) if len(table) else (0, 0)
+        self.max_x, self.max_z = (int(table.x.max()), int(table.z.max())) if len(table) else (-1, -1)
+
+    def _decode(self, i: int) -> DecodedChunk:
+        if self._cache is not None:
+            return self._cache.get(self._chunks[i])
+        with METRICS.stage("nbt_reading"):
+            return decode_chunk(self._chunks.raw(i))
+
+    def project(self) -> SurfaceRaster:
+        """
+        Растр поверхности по охвату всех переданных чанков: id реестра BLOCKS и высоты верхних блоков.
+        Чанки без данных или с ошибкой разбора остаются MISSING
+        """
+        keep, decoded = [], []
+        for i in range(len(self._chunks)):
+            try:
+                decoded.append(self._decode(i))
+            except Exception as e:
+                log.warning("Error at %s: %s", self._chunks[i].abs_cord, e)
+                METRICS.count("chunks_failed")
+                continue
+            keep.append(i)
+
+        # чанки разных измерений в одном растре не смешиваются, измерение берётся у первого
+        dimension = DIMENSIONS[self._chunks.dimension[0]] if len(self._chunks) else "Overworld"
+        batch = _surface_batch(self._chunks.cords[keep].tolist(), decoded, dimension, BLOCKS.names)
+        return SurfaceRaster.from_batches([batch], BLOCKS.names, (self.min_x, self.max_x, self.min_z, self.max_z))
+
+
+def project_stream(manager: ChunkManager, corners: Corners, registry: BlockRegistry = BLOCKS) -> SurfaceRaster:
+    """
+    Растр поверхности в текущем процессе через ChunkManager.iter_batches:
+    от каждого региона остаётся только его SurfaceBatch, пик памяти - один регион и сам растр
+    """
+    batches = [
+        _surface_batch(cords.tolist(), decoded, manager.dimension, registry.names)
+        for cords, decoded in manager.iter_batches(corners, registry, pad=0)
+    ]
+    return SurfaceRaster.from_batches(batches, registry.names, (corners.xmin, corners.xmax, corners.ymin, corners.ymax))
+
+
+def project_raster(manager: ChunkManager, corners: Corners, registry: BlockRegistry = BLOCKS) -> SurfaceRaster:
+    """project_parallel, собранный в один растр ровно по corners"""
+    batches = project_parallel(manager, corners, registry)
+    return SurfaceRaster.from_batches(batches, registry.names, (corners.xmin, corners.xmax, corners.ymin, corners.ymax))
+
+
+# под main: воркеры пула процессов импортируют этот модуль заново
+if __name__ == "__main__":
+    cm = ChunkManager(Path(r"C:\Users\Taras\AppData\Roaming\PrismLauncher\instances\Quantum Tech\minecraft\.bobby\Andrey2006.go.ro_25565\1892924735912129312\minecraft\the_nether"), "Nether")
+    corners = Corners(-100,20,0,60)
+    c = cm.get_chunks(corners)
+    gp = GroundProjector(c)
+    raster = gp.project()
+    METRICS.report()
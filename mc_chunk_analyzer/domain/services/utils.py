@@ -1,35 +1,289 @@
 from pathlib import Path
-from typing import List, Set, Tuple
+from typing import Dict, List, Set, Tuple, Callable, Optional, TypeVar, Iterator, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import repeat
+import numpy as np
+import logging
+import os
 import re
 
 from ..models.Region import RawRegion
-from ..models.Chunk import RawChunk
+from ..models.Chunk import ChunkTable, ChunkView, DIMENSIONS
 from ..models.Chunk import Corners
 from ...domain.models.Chunk import Dimensions
 from ..services.ChunkAnalyzer import McaParser
-from ...infrastructure.fs.services import search_for_files
+from .BlockRegistry import BlockRegistry, BLOCKS
+from .ChunkCache import DecodedChunk, decode_chunk
+from .Compression import ChunkReadError
+from .Metrics import METRICS, measured
+from .PaletteIndex import PaletteIndex
+from .ScanCache import ScanCache, UNKNOWN
+from ...infrastructure.fs.services import region_directory
+
+log = logging.getLogger(__name__)
+
+
+# (xmin, xmax, zmin, zmax) в координатах чанков, включительно
+Bounds = Tuple[int, int, int, int]
+T = TypeVar("T")
+
+
+def in_bounds(table: np.ndarray, bounds: Bounds) -> np.ndarray:
+    """Маска по таблице чанков региона"""
+    xmin, xmax, zmin, zmax = bounds
+    return ((table["x"] >= xmin) & (table["x"] <= xmax)
+            & (table["z"] >= zmin) & (table["z"] <= zmax))
+
+
+def candidate_mask(region: RawRegion, index_dir: Path, blocks: Iterable[str]) -> np.ndarray:
+    """bool (1024,) по таблице чанков региона: чанки, в палитрах которых могут быть blocks"""
+    registry = BlockRegistry()
+    index = PaletteIndex(index_dir, registry).get(region)
+    return index.candidate_chunks(registry.remap(list(blocks)))
+
+
+def rescan_region(path: Path, dimension: Dimensions, bounds: Bounds,
+                  chunk_fn: Callable[[bytes, Tuple[int, int]], T],
+                  stamps: np.ndarray) -> Tuple[np.ndarray, np.ndarray, Dict[int, T]]:
+    """
+    Воркер для ChunkManager.scan_incremental: chunk_fn только по слотам, чей timestamp не равен stamps.
+    :return: timestamps всех слотов, пересчитанные слоты, slot -> результат (без отсутствующих чанков)
+    """
+    results: Dict[int, T] = {}
+    with RawRegion(path, dimension) as raw:
+        region = McaParser().parse(raw)
+        now = region.table["timestamp"].astype(np.int64)
+        mask = in_bounds(region.table, bounds) & (now != stamps)
+        changed = np.flatnonzero(mask)
+        # не распаковавшийся чанк не попадает в results, но его timestamp запоминается:
+        # заново он читается, только когда игра его перезапишет
+        for chunk in region.raw_chunks.readable(mask):
+            slot = chunk.rel_cord[1] * 32 + chunk.rel_cord[0]
+            results[slot] = chunk_fn(chunk.raw_data, chunk.abs_cord.as_tuple)
+    return now, changed, results
 
 
 class ChunkManager:
     """
-    path + corners -> List[RawChunk]
+    path + corners -> ChunkTable
     """
 
-    def __init__(self, root: Path, dimension: Dimensions):
+    def __init__(self, root: Path, dimension: Dimensions, workers: Optional[int] = 1,
+                 index_dir: Optional[Path] = None):
+        """
+        :param workers: число процессов для scan, 1 - в текущем процессе, None - все ядра
+        :param index_dir: папка для индекса палитр, без неё поиск по блокам распаковывает все чанки
+        """
         self._root = root
         self._parser = McaParser()
         self._dimension = dimension
+        self._workers = workers
+        self.index_dir = index_dir
 
-    def get_chunks(self, corners: Corners) -> List[RawChunk]:
-        regions = self._load_required_regions(corners)
-        return self._extract(regions, corners)
+    @property
+    def dimension(self) -> Dimensions:
+        return self._dimension
 
-    # ---------- region logic ----------
+    def get_chunks(self, corners: Corners, blocks: Optional[Iterable[str]] = None, pad: int = 1) -> ChunkTable:
+        """
+        Чанки области одной таблицей: итерация по ней отдаёт ChunkView с интерфейсом RawChunk.
+        :param blocks: если задан и есть index_dir - только чанки, в палитрах которых есть хоть один из блоков
+        """
+        buffer = bytearray()
+        return ChunkTable.stack(list(self._region_tables(corners, blocks, pad, buffer)), buffer)
+
+    def iter_tables(self, corners: Corners, blocks: Optional[Iterable[str]] = None,
+                    pad: int = 1) -> Iterator[ChunkTable]:
+        """
+        ChunkTable по каждому региону области, у каждой свой буфер.
+        Регион закрывается до того, как его таблица отдана: в памяти одновременно
+        только текущий регион и те таблицы, которые держит вызывающий.
+        Таблица распаковывает регион целиком, поштучно и с меньшим пиком памяти - iter_chunks
+        """
+        yield from self._region_tables(corners, blocks, pad)
 
-    def _load_required_regions(self, corners: Corners) -> List[RawRegion]:
-        region_coords = self._get_required_region_coords(corners)
-        region_paths = self._find_region_files(region_coords)
-        return [RawRegion(path, self._dimension) for path in region_paths]
+    def iter_chunks(self, corners: Corners, blocks: Optional[Iterable[str]] = None,
+                    pad: int = 1) -> Iterator[ChunkView]:
+        """
+        Чанки области по одному, регион за регионом.
+        Каждый чанк распаковывается в свою таблицу из одной строки только при запросе следующего:
+        в памяти одновременно открытый регион, один распакованный чанк и то, что держит вызывающий
+        """
+        bounds = self._bounds(corners, pad)
+        for path in self.region_files(corners):
+            with RawRegion(path, self._dimension) as region:
+                rows = self._select_rows(region, bounds, blocks)
+                for i in range(len(rows)):
+                    yield self._read_rows(region, rows[i:i + 1], bytearray())[0]
+
+    def iter_batches(self, corners: Corners, registry: BlockRegistry = BLOCKS,
+                     pad: int = 1) -> Iterator[Tuple[np.ndarray, List[DecodedChunk]]]:
+        """
+        Разобранные чанки пачками по регионам: ((N, 2) координат, N DecodedChunk).
+        Чанки, которые не удалось разобрать, пропускаются
+        """
+        for table in self.iter_tables(corners, pad=pad):
+            table = table.select(table.present)
+            keep, decoded = [], []
+            for i in range(len(table)):
+                try:
+                    decoded.append(decode_chunk(table.raw(i), registry))
+                except Exception as e:
+                    log.warning("Error at %s: %s", table[i].abs_cord, e)
+                    METRICS.count("chunks_failed")
+                    continue
+                keep.append(i)
+            if decoded:
+                yield table.cords[keep], decoded
+
+    def _region_tables(self, corners: Corners, blocks: Optional[Iterable[str]], pad: int,
+                       buffer: Optional[bytearray] = None) -> Iterator[ChunkTable]:
+        """
+        Таблицы регионов области (с фильтром по блокам), регион закрывается до выдачи его таблицы.
+        :param buffer: общий буфер для всех таблиц, None - свой у каждой
+        """
+        bounds = self._bounds(corners, pad)
+        for path in self.region_files(corners):
+            with RawRegion(path, self._dimension) as region:
+                rows = self._select_rows(region, bounds, blocks)
+                chunks = self._read_rows(region, rows, bytearray() if buffer is None else buffer)
+            yield chunks
+
+    def _select_rows(self, region: RawRegion, bounds: Bounds, blocks: Optional[Iterable[str]]) -> np.ndarray:
+        """Строки таблицы чанков региона в bounds, с index_dir - только кандидаты по blocks"""
+        table = self._parser.build_chunk_table(region.data, region.cord)
+        mask = in_bounds(table, bounds)
+        if blocks is not None and self.index_dir is not None:
+            mask &= candidate_mask(region, self.index_dir, blocks)
+        return table[mask]
+
+    def _read_rows(self, region: RawRegion, rows: np.ndarray, buffer: bytearray) -> ChunkTable:
+        """Распаковка строк таблицы региона в конец buffer, смещения в результате - от начала buffer"""
+        offset = np.zeros(len(rows), dtype=np.int64)
+        length = np.zeros(len(rows), dtype=np.int64)
+        region_dir = Path(region.path).parent
+        for i, entry in enumerate(rows):
+            offset[i] = len(buffer)
+            try:
+                raw = self._parser.read_chunk(region.data, entry, region_dir)
+            except ChunkReadError as e:
+                # битый чанк остаётся строкой с length == 0, как отсутствующий
+                log.warning("Error at X: %d, Z: %d: %s", entry['x'], entry['z'], e)
+                METRICS.count("chunks_failed")
+                continue
+            if raw:
+                buffer += raw
+                length[i] = len(raw)
+        return ChunkTable(
+            x=rows["x"].astype(np.int32),
+            z=rows["z"].astype(np.int32),
+            dimension=np.full(len(rows), DIMENSIONS.index(self._dimension), dtype=np.uint8),
+            offset=offset,
+            length=length,
+            region_mtime=np.full(len(rows), region.mtime_ns, dtype=np.int64),
+            region=np.zeros(len(rows), dtype=np.int32),
+            data=buffer,
+            regions=(region.resolved,),
+        )
+
+    def scan(self, corners: Corners, extractor: Callable[[Path, Dimensions, Bounds], T], pad: int = 1) -> List[T]:
+        """
+        Обработка регионов целиком в пуле процессов.
+        extractor(path, dimension, bounds) вызывается в воркере, сам распаковывает и разбирает чанки
+        и должен возвращать компактный результат: сырые чанки между процессами не передаются.
+        extractor должен быть функцией уровня модуля (или partial от неё), иначе его не запиклить
+        :param pad: на сколько чанков расширить corners, как в get_chunks
+        """
+        return list(self.scan_iter(corners, extractor, pad))
+
+    def scan_iter(self, corners: Corners, extractor: Callable[[Path, Dimensions, Bounds], T],
+                  pad: int = 1) -> Iterator[T]:
+        """То же, что scan, но результаты регионов отдаются по мере готовности (в порядке регионов)"""
+        region_paths = self._find_region_files(self._get_required_region_coords(corners))
+        bounds = self._bounds(corners, pad)
+        yield from self.map_regions(extractor, region_paths, repeat(self._dimension), repeat(bounds))
+
+    def scan_incremental(self, corners: Corners, chunk_fn: Callable[[bytes, Tuple[int, int]], T],
+                         cache: ScanCache[T], pad: int = 1) -> Dict[Tuple[int, int], T]:
+        """
+        Повторный скан: chunk_fn(raw_data, (x, z)) вызывается только для чанков,
+        у которых timestamp в заголовке .mca изменился с прошлого скана с тем же cache.
+        Регион с прежними mtime и размером файла даже не открывается.
+        chunk_fn должен быть функцией уровня модуля, как extractor в scan
+        :return: (x, z) -> результат для всех существующих чанков области, новые вперемешку с кешем
+        """
+        region_paths = self._find_region_files(self._get_required_region_coords(corners))
+        bounds = self._bounds(corners, pad)
+
+        stale = []
+        for path in region_paths:
+            state = cache.region(path)
+            stat = os.stat(path)
+            file_key = (stat.st_mtime_ns, stat.st_size)
+            if state.file_key == file_key and (state.stamps[self._region_mask(path, bounds)] != UNKNOWN).all():
+                continue
+            stale.append((path, state, file_key))
+
+        cache.decoded = 0
+        updates = self.map_regions(
+            rescan_region, [path for path, _, _ in stale], repeat(self._dimension), repeat(bounds),
+            repeat(chunk_fn), [state.stamps for _, state, _ in stale],
+        )
+        for (_, state, file_key), (stamps, changed, results) in zip(stale, updates):
+            state.merge(stamps, changed, results)
+            state.file_key = file_key
+            cache.decoded += len(results)
+
+        merged: Dict[Tuple[int, int], T] = {}
+        for path in region_paths:
+            rx, rz = RawRegion.cord_from_string(path.stem)
+            mask = self._region_mask(path, bounds)
+            for slot, value in cache.region(path).results.items():
+                if mask[slot]:
+                    merged[(rx * 32 + slot % 32, rz * 32 + slot // 32)] = value
+        cache.reused = len(merged) - cache.decoded
+        return merged
+
+    def region_files(self, corners: Optional[Corners] = None) -> List[Path]:
+        """Файлы регионов области, без corners - все регионы измерения"""
+        if corners is None:
+            files = region_directory(self._root).files()
+            return [files[cord].path for cord in sorted(files)]
+        return self._find_region_files(self._get_required_region_coords(corners))
+
+    def map_regions(self, fn: Callable[..., T], region_paths: List[Path], *args) -> Iterator[T]:
+        """
+        fn(path, *args) по регионам: в текущем процессе или в пуле, результаты в порядке регионов.
+        Для fn действуют те же ограничения, что и для extractor в scan.
+        METRICS воркеров складываются в METRICS текущего процесса
+        """
+        if self._workers == 1 or len(region_paths) <= 1:
+            yield from map(fn, region_paths, *args)
+            return
+
+        pool = ProcessPoolExecutor(max_workers=self._workers)
+        try:
+            for result, snapshot in pool.map(partial(measured, METRICS.enabled, fn), region_paths, *args):
+                METRICS.merge(snapshot)
+                yield result
+        finally:
+            # генератор закрыли раньше времени (отмена скана): ещё не начатые регионы не запускаются,
+            # ждём только те, что уже в работе
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def _region_mask(path: Path, bounds: Bounds) -> np.ndarray:
+        """Маска in_bounds по слотам региона без чтения файла"""
+        rx, rz = RawRegion.cord_from_string(path.stem)
+        slots = np.arange(1024)
+        return in_bounds({"x": rx * 32 + slots % 32, "z": rz * 32 + slots // 32}, bounds)
+
+    @staticmethod
+    def _bounds(corners: Corners, pad: int = 1) -> Bounds:
+        return corners.xmin - pad, corners.xmax + pad, corners.ymin - pad, corners.ymax + pad
+
+    # ---------- region logic ----------
 
     def _get_required_region_coords(self, corners: Corners) -> Set[tuple[int, int]]:
         # Используем .zmin / .zmax если они есть,
@@ -45,75 +299,10 @@ class ChunkManager:
             for rz in range(rz_min, rz_max + 1)
         }
 
-    from pathlib import Path
-    from typing import List, Set, Tuple
-
-    def _find_region_files(
-            self,
-            region_coords: Set[Tuple[int, int]]
-    ) -> List[Path]:
-        """
-        Finds only region files matching the given region_coords (rx, rz)
-        using `search_for_files` and without regex.
-        """
-        region_dir = self._root
-        target_files = {f"r.{rx}.{rz}.mca" for rx, rz in region_coords}
-        all_mca_files = search_for_files(files=list(target_files), root=region_dir)
-        return all_mca_files
-
-    # ---------- chunk logic ----------
-
-    def _extract(self, data: List[RawRegion], corners: Corners) -> List[RawChunk]:
-        xmin = corners.xmin - 1
-        xmax = corners.xmax + 1
-        zmin = corners.ymin - 1
-        zmax = corners.ymax + 1
-
-        result: List[RawChunk] = []
-
-        for region in data:
-            parsed = self._parser.parse(region)
-
-            for cord, chunk in parsed.raw_chunks.items():
-                if xmin <= cord.x <= xmax and zmin <= cord.z <= zmax:
-                    result.append(chunk)
-
-        return result
-
-
-import time
-from collections import defaultdict
-
-class Profiler:
-    def __init__(self):
-        self.stats = defaultdict(float)
-        self.counts = defaultdict(int)
-
-    def __call__(self, name):
-        """Используется как контекстный менеджер: with prof('name'):"""
-        class Timer:
-            def __init__(self, outer, name):
-                self.outer = outer
-                self.name = name
-            def __enter__(self):
-                self.start = time.perf_counter()
-            def __exit__(self, *args):
-                dt = time.perf_counter() - self.start
-                self.outer.stats[self.name] += dt
-                self.outer.counts[self.name] += 1
-        return Timer(self, name)
-
-    def report(self):
-        print(f"\n{'='*20} PERFORMANCE REPORT {'='*20}")
-        print(f"{'Step':<20} | {'Total (s)':<10} | {'Avg (ms)':<10} | {'Calls':<8}")
-        print("-" * 55)
-        for name in sorted(self.stats, key=self.stats.get, reverse=True):
-            total = self.stats[name]
-            count = self.counts[name]
-            avg = (total / count) * 1000
-            print(f"{name:<20} | {total:<10.4f} | {avg:<10.2f} | {count:<8}")
-        print("=" * 55)
-
+    def _find_region_files(self, region_coords: Set[Tuple[int, int]]) -> List[Path]:
+        """Существующие файлы регионов из region_coords по индексу папки, в порядке (rx, rz)"""
+        files = region_directory(self._root).files()
+        return [files[cord].path for cord in sorted(region_coords) if cord in files]
 
 
 if __name__ == "__main__":
@@ -18,4 +18,7 @@ class WorldTree:
     bobby_words: Optional[Dict[str, list]]
 
 
-
+@dataclass(frozen=True)
+class RegionFile:
+    path: Path
+    size: int  # размер на момент последнего обхода папки
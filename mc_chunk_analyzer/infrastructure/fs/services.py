@@ -1,17 +1,74 @@
 from pathlib import Path
-from typing import Dict, List
-from .models import WorldTree
+from threading import Lock
+from types import MappingProxyType
+from typing import Dict, Mapping, Tuple, Union
+from .models import WorldTree, RegionFile
 import os
+import re
 
-def search_for_files(files: List[str], root: Path) -> List[Path]:
-    targets = set(files)
-    found: List[Path] = []
 
-    for path in root.rglob("*"):
-        if path.is_file() and path.name in targets:
-            found.append(path)
+REGION_NAME = re.compile(r"r\.(-?\d+)\.(-?\d+)\.mca")
+# измерение -> возможные папки внутри мира: сохранение и кеш bobby
+DIM_DIRS: Dict[str, Tuple[str, ...]] = {
+    "over": ("", "minecraft/overworld"),
+    "nether": ("DIM-1", "minecraft/the_nether"),
+    "end": ("DIM1", "minecraft/the_end"),
+}
 
-    return found
+
+class RegionDirectory:
+    """
+    Индекс файлов регионов одного измерения: (rx, rz) -> RegionFile.
+    Папка читается одним os.scandir без обхода поддеревьев (entities/, poi/, data/ и т.д.)
+    и перечитывается, только когда меняется её mtime - то есть файлы добавились, удалились или переименовались.
+    Запись в существующий регион mtime папки не меняет, поэтому size может отставать
+    """
+
+    def __init__(self, root: Path):
+        root = Path(root)
+        # мир: <dim>/region/*.mca, кеш bobby: *.mca прямо в папке измерения
+        self.path = root / "region" if (root / "region").is_dir() else root
+        self._mtime_ns = None
+        self._files: Dict[Tuple[int, int], RegionFile] = {}
+        self._lock = Lock()
+
+    def _refresh(self) -> Dict[Tuple[int, int], RegionFile]:
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return {}
+        with self._lock:
+            if mtime_ns != self._mtime_ns:
+                files = {}
+                with os.scandir(self.path) as it:
+                    for entry in it:
+                        match = REGION_NAME.fullmatch(entry.name)
+                        if match and entry.is_file():
+                            cord = int(match.group(1)), int(match.group(2))
+                            files[cord] = RegionFile(Path(entry.path), entry.stat().st_size)
+                self._files, self._mtime_ns = files, mtime_ns
+            return self._files
+
+    def get(self, rx: int, rz: int) -> Union[RegionFile, None]:
+        return self._refresh().get((rx, rz))
+
+    def files(self) -> Mapping[Tuple[int, int], RegionFile]:
+        """Все регионы папки, (rx, rz) -> RegionFile, только для чтения"""
+        return MappingProxyType(self._refresh())
+
+
+_directories: Dict[Path, RegionDirectory] = {}
+_directories_lock = Lock()
+
+
+def region_directory(root: Path) -> RegionDirectory:
+    """Общий на процесс RegionDirectory для папки измерения"""
+    key = Path(root).resolve()
+    with _directories_lock:
+        directory = _directories.get(key)
+        if directory is None:
+            directory = _directories[key] = RegionDirectory(key)
+        return directory
 
 
 class PathInfo:
@@ -75,7 +132,15 @@ class WorldInfo:
     def name(self) -> str:
         return self.path.parts[-1]
 
-    def path_to_dim(self, dim: str):
-        if dim not in ["over", "end", "nether"]:
-            raise ValueError(f"Can't get path to dim {dim}") from ValueError
+    def path_to_dim(self, dim: str) -> Path:
+        """Папка измерения: в сохранении <мир>, <мир>/DIM-1, <мир>/DIM1, в кеше bobby - <мир>/minecraft/<измерение>"""
+        dim = dim.lower()
+        if dim not in DIM_DIRS:
+            raise ValueError(f"Can't get path to dim {dim}")
+        for sub in DIM_DIRS[dim]:
+            candidate = self.path / sub
+            # у верхнего мира папка измерения - сам мир, она есть всегда, смотрим на region
+            if candidate.is_dir() and (sub or (candidate / "region").is_dir()):
+                return candidate
+        raise FileNotFoundError(f"No {dim} dimension in {self.path}")
 
@@ -0,0 +1,129 @@
+import hashlib
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+
+RGB = Tuple[int, int, int]
+
+# цвета блоков на карте, примерно как на ванильной карте
+BLOCK_COLORS: Dict[str, RGB] = {
+    "minecraft:air": (0, 0, 0),
+    "minecraft:cave_air": (0, 0, 0),
+    "minecraft:void_air": (0, 0, 0),
+    "minecraft:grass_block": (127, 178, 56),
+    "minecraft:short_grass": (109, 153, 48),
+    "minecraft:tall_grass": (109, 153, 48),
+    "minecraft:fern": (104, 145, 52),
+    "minecraft:dirt": (151, 109, 77),
+    "minecraft:coarse_dirt": (119, 85, 59),
+    "minecraft:podzol": (106, 76, 42),
+    "minecraft:mycelium": (111, 99, 105),
+    "minecraft:dirt_path": (148, 122, 65),
+    "minecraft:farmland": (115, 78, 46),
+    "minecraft:mud": (60, 57, 61),
+    "minecraft:stone": (112, 112, 112),
+    "minecraft:cobblestone": (110, 110, 110),
+    "minecraft:mossy_cobblestone": (96, 116, 86),
+    "minecraft:deepslate": (80, 80, 85),
+    "minecraft:andesite": (120, 120, 118),
+    "minecraft:diorite": (188, 188, 188),
+    "minecraft:granite": (149, 103, 85),
+    "minecraft:tuff": (108, 109, 102),
+    "minecraft:calcite": (222, 223, 220),
+    "minecraft:gravel": (131, 127, 126),
+    "minecraft:clay": (160, 166, 179),
+    "minecraft:sand": (247, 233, 163),
+    "minecraft:sandstone": (216, 203, 155),
+    "minecraft:red_sand": (190, 102, 33),
+    "minecraft:red_sandstone": (186, 99, 29),
+    "minecraft:terracotta": (152, 94, 67),
+    "minecraft:snow": (255, 255, 255),
+    "minecraft:snow_block": (255, 255, 255),
+    "minecraft:powder_snow": (248, 253, 253),
+    "minecraft:ice": (160, 160, 255),
+    "minecraft:packed_ice": (141, 180, 250),
+    "minecraft:blue_ice": (116, 167, 253),
+    "minecraft:water": (64, 64, 255),
+    "minecraft:bubble_column": (64, 64, 255),
+    "minecraft:lava": (255, 0, 0),
+    "minecraft:obsidian": (21, 18, 30),
+    "minecraft:bedrock": (85, 85, 85),
+    "minecraft:netherrack": (112, 2, 0),
+    "minecraft:nether_wart_block": (115, 3, 2),
+    "minecraft:warped_wart_block": (22, 119, 121),
+    "minecraft:crimson_nylium": (189, 48, 49),
+    "minecraft:warped_nylium": (22, 126, 134),
+    "minecraft:soul_sand": (81, 62, 50),
+    "minecraft:soul_soil": (75, 57, 46),
+    "minecraft:basalt": (80, 81, 86),
+    "minecraft:blackstone": (42, 35, 40),
+    "minecraft:glowstone": (247, 233, 163),
+    "minecraft:magma_block": (142, 63, 31),
+    "minecraft:end_stone": (219, 222, 158),
+    "minecraft:purpur_block": (169, 125, 169),
+    "minecraft:chorus_plant": (93, 57, 93),
+    "minecraft:chorus_flower": (151, 120, 151),
+    "minecraft:pumpkin": (216, 127, 51),
+    "minecraft:melon": (127, 204, 25),
+    "minecraft:cactus": (0, 124, 0),
+    "minecraft:sugar_cane": (148, 192, 101),
+    "minecraft:bamboo": (93, 144, 19),
+    "minecraft:lily_pad": (32, 128, 48),
+    "minecraft:kelp": (50, 110, 42),
+    "minecraft:seagrass": (50, 110, 42),
+    "minecraft:moss_block": (89, 109, 45),
+    "minecraft:moss_carpet": (89, 109, 45),
+    "minecraft:dripstone_block": (134, 107, 92),
+    "minecraft:oak_planks": (143, 119, 72),
+    "minecraft:glass": (200, 220, 230),
+}
+
+# запасные цвета по части имени, первое совпадение
+KEYWORD_COLORS: Sequence[Tuple[str, RGB]] = (
+    ("water", (64, 64, 255)),
+    ("lava", (255, 0, 0)),
+    ("leaves", (0, 124, 0)),
+    ("_log", (102, 81, 51)),
+    ("_wood", (102, 81, 51)),
+    ("planks", (143, 119, 72)),
+    ("flower", (200, 180, 60)),
+    ("grass", (109, 153, 48)),
+    ("snow", (255, 255, 255)),
+    ("ice", (160, 160, 255)),
+    ("sand", (247, 233, 163)),
+    ("terracotta", (152, 94, 67)),
+    ("deepslate", (80, 80, 85)),
+    ("stone", (112, 112, 112)),
+    ("ore", (112, 112, 112)),
+    ("dirt", (151, 109, 77)),
+    ("glass", (200, 220, 230)),
+    ("wool", (199, 199, 199)),
+    ("concrete", (160, 160, 160)),
+    ("copper", (192, 107, 79)),
+    ("nether", (112, 2, 0)),
+)
+
+
+class ColorTable:
+    """Имя блока -> RGB. Неизвестные блоки красятся по части имени, иначе стабильным цветом из хеша имени"""
+
+    def __init__(self, colors: Optional[Dict[str, RGB]] = None):
+        self.colors: Dict[str, RGB] = dict(BLOCK_COLORS if colors is None else colors)
+
+    def color(self, name: str) -> RGB:
+        rgb = self.colors.get(name)
+        if rgb is None:
+            rgb = self._fallback(name)
+            self.colors[name] = rgb
+        return rgb
+
+    @staticmethod
+    def _fallback(name: str) -> RGB:
+        for keyword, rgb in KEYWORD_COLORS:
+            if keyword in name:
+                return rgb
+        digest = hashlib.md5(name.encode()).digest()
+        return digest[0], digest[1], digest[2]
+
+    def lut(self, palette: Sequence[str]) -> np.ndarray:
+        """uint8 (len(palette), 3): цвета по id палитры, для индексации растра блоков"""
+        return np.array([self.color(name) for name in palette], dtype=np.uint8).reshape(-1, 3)
@@ -0,0 +1,175 @@
+import json
+import os
+from functools import partial
+from itertools import repeat
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from PIL import Image
+
+from .colors import ColorTable
+from ...domain.models.Chunk import Corners, Dimensions, SurfaceRaster
+from ...domain.models.Region import RawRegion
+from ...domain.services.WorldHandler import project_region
+from ...domain.services.utils import ChunkManager
+
+# сторона тайла в пикселях: регион 32x32 чанка по 16 блоков, 1 пиксель на блок на нулевом уровне
+TILE_SIZE = 512
+MANIFEST = "tiles.json"
+# версия рендера, при изменении все тайлы перерисовываются
+RENDER_VERSION = 1
+
+
+def colorize(raster: SurfaceRaster, colors: ColorTable, shading: bool = True) -> np.ndarray:
+    """Растр поверхности -> RGBA uint8 (H, W, 4), отсутствующие чанки прозрачные"""
+    missing = raster.mask
+    lut = colors.lut(raster.palette)
+    if not len(lut):
+        lut = np.zeros((1, 3), dtype=np.uint8)
+    rgb = lut[np.where(missing, 0, raster.blocks)].astype(np.float32)
+
+    if shading:
+        # рельеф: блок выше северного соседа светлее, ниже - темнее
+        heights = raster.heights.astype(np.float32)
+        north = np.vstack([heights[:1], heights[:-1]])
+        diff = np.where(missing | np.vstack([missing[:1], missing[:-1]]), 0, heights - north)
+        rgb *= (1 + np.clip(diff, -4, 4) * 0.05)[..., None]
+
+    image = np.empty(rgb.shape[:2] + (4,), dtype=np.uint8)
+    image[..., :3] = np.clip(rgb, 0, 255)
+    image[..., 3] = np.where(missing, 0, 255)
+    return image
+
+
+def region_image(path: Path, dimension: Dimensions, colors: ColorTable, shading: bool = True) -> np.ndarray:
+    """Воркер для ChunkManager.map_regions: тайл нулевого уровня одного региона, RGBA (512, 512, 4)"""
+    rx, rz = RawRegion.cord_from_string(path.stem)
+    bounds = (rx * 32, rx * 32 + 31, rz * 32, rz * 32 + 31)
+    batch = project_region(path, dimension, bounds)
+    raster = SurfaceRaster.from_batches([batch], batch.palette, bounds)
+    return colorize(raster, colors, shading)
+
+
+def downsample(image: np.ndarray) -> np.ndarray:
+    """RGBA (2H, 2W, 4) -> (H, W, 4): среднее по 2x2 с весом по альфе, прозрачное не темнит края"""
+    h, w = image.shape[0] // 2, image.shape[1] // 2
+    blocks = image[:h * 2, :w * 2].reshape(h, 2, w, 2, 4).astype(np.float32)
+    alpha = blocks[..., 3:]
+    weight = alpha.sum(axis=(1, 3))
+    rgb = (blocks[..., :3] * alpha).sum(axis=(1, 3)) / np.maximum(weight, 1)
+    result = np.empty((h, w, 4), dtype=np.uint8)
+    result[..., :3] = np.clip(np.rint(rgb), 0, 255)
+    result[..., 3] = np.rint(weight[..., 0] / 4)
+    return result
+
+
+class TileRenderer:
+    """
+    Карта поверхности тайлами PNG: out_dir/<уровень>/<tx>.<tz>.png.
+    Уровень 0 - по тайлу на регион, каждый следующий уровень в 2 раза мельче и собирается из 4 тайлов предыдущего.
+    В out_dir/tiles.json хранятся mtime и размер отрисованных регионов: перерисовываются только изменившиеся
+    регионы и тайлы пирамиды над ними. Тайлы удалённых регионов удаляются, пирамида над ними пересобирается
+    """
+
+    def __init__(self, manager: ChunkManager, out_dir: Path, colors: Optional[ColorTable] = None,
+                 levels: int = 5, shading: bool = True):
+        self._manager = manager
+        self.out_dir = Path(out_dir)
+        self.colors = colors or ColorTable()
+        self.levels = levels
+        self.shading = shading
+
+    def tile_path(self, level: int, tx: int, tz: int) -> Path:
+        return self.out_dir / str(level) / f"{tx}.{tz}.png"
+
+    def render(self, corners: Optional[Corners] = None, force: bool = False) -> List[Path]:
+        """
+        Перерисовка изменившихся регионов области (без corners - всех регионов измерения).
+        Регионы из манифеста, файлов которых в области больше нет, убираются вместе с тайлами
+        :return: регионы, которые были перерисованы
+        """
+        manifest = self._load_manifest()
+        regions: Dict[str, List[int]] = manifest["regions"]
+        if force or manifest.get("version") != RENDER_VERSION or manifest.get("shading") != self.shading:
+            regions.clear()
+
+        files = self._manager.region_files(corners)
+        stale, stamps = [], []
+        for path in files:
+            stat = path.stat()
+            stamp = [stat.st_mtime_ns, stat.st_size]
+            if regions.get(path.name) != stamp:
+                stale.append(path)
+                stamps.append(stamp)
+
+        dirty: Set[Tuple[int, int]] = set()
+        present = {path.name for path in files}
+        for name in [name for name in regions if name not in present]:
+            cord = RawRegion.cord_from_string(Path(name).stem)
+            if corners is not None and not self._in_area(cord, corners):
+                continue
+            self.tile_path(0, *cord).unlink(missing_ok=True)
+            del regions[name]
+            dirty.add(cord)
+
+        worker = partial(region_image, colors=self.colors, shading=self.shading)
+        images = self._manager.map_regions(worker, stale, repeat(self._manager.dimension))
+        for path, stamp, image in zip(stale, stamps, images):
+            cord = RawRegion.cord_from_string(path.stem)
+            self._save(image, self.tile_path(0, *cord))
+            regions[path.name] = stamp
+            dirty.add(cord)
+
+        for level in range(1, self.levels):
+            dirty = {(tx // 2, tz // 2) for tx, tz in dirty}
+            for tx, tz in dirty:
+                image = self._compose(level, tx, tz)
+                if image is None:
+                    self.tile_path(level, tx, tz).unlink(missing_ok=True)
+                else:
+                    self._save(image, self.tile_path(level, tx, tz))
+
+        self._save_manifest({"version": RENDER_VERSION, "shading": self.shading, "regions": regions})
+        return stale
+
+    def _compose(self, level: int, tx: int, tz: int) -> Optional[np.ndarray]:
+        """Тайл уровня level из 4 тайлов уровня level - 1, отсутствующие - прозрачные. None - нет ни одного"""
+        canvas = np.zeros((TILE_SIZE * 2, TILE_SIZE * 2, 4), dtype=np.uint8)
+        found = False
+        for dz in range(2):
+            for dx in range(2):
+                child = self.tile_path(level - 1, tx * 2 + dx, tz * 2 + dz)
+                if child.is_file():
+                    found = True
+                    with Image.open(child) as img:
+                        canvas[dz * TILE_SIZE:(dz + 1) * TILE_SIZE,
+                               dx * TILE_SIZE:(dx + 1) * TILE_SIZE] = np.asarray(img.convert("RGBA"))
+        return downsample(canvas) if found else None
+
+    @staticmethod
+    def _in_area(cord: Tuple[int, int], corners: Corners) -> bool:
+        """Регион попадает в область corners (в чанках), как в ChunkManager.region_files"""
+        rx, rz = cord
+        return corners.xmin // 32 <= rx <= corners.xmax // 32 and corners.ymin // 32 <= rz <= corners.ymax // 32
+
+    @staticmethod
+    def _save(image: np.ndarray, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        Image.fromarray(image, "RGBA").save(path)
+
+    def _load_manifest(self) -> Dict:
+        try:
+            with open(self.out_dir / MANIFEST, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        manifest.setdefault("regions", {})
+        return manifest
+
+    def _save_manifest(self, manifest: Dict):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        path = self.out_dir / MANIFEST
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, path)
@@ -0,0 +1,146 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from .utils import EventBus
+from .models.events import Event, TaskProgress, TaskFinished, TaskFailed, TaskCancelled
+
+
+class Cancelled(Exception):
+    """Бросается из TaskContext.check, когда задачу отменили"""
+
+
+class TaskContext:
+    """
+    Передаётся в задачу: отмена и прогресс. Методы вызываются из потока задачи,
+    события до интерфейса доходят через очередь TaskRunner
+    """
+
+    def __init__(self, task_id: int, post: Callable[[Event, Any], None]):
+        self.task_id = task_id
+        self._post = post
+        self._cancel = threading.Event()
+        self._start = time.perf_counter()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        """Точка отмены: задача проверяет её между регионами"""
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def progress(self, done: float, chunks: int, message: str = ""):
+        """
+        :param done: доля выполненной работы 0..1, по ней считается ETA
+        :param chunks: сколько чанков обработано с начала задачи
+        """
+        elapsed = self.elapsed
+        eta = elapsed * (1 - done) / done if done > 0 else None
+        throughput = chunks / elapsed if elapsed > 0 else 0.0
+        self._post(Event.TASK_PROGRESS, TaskProgress(self.task_id, done, chunks, elapsed, throughput, eta, message))
+
+
+class TaskRunner:
+    """
+    Одна фоновая задача за раз между EventBus и доменными сервисами.
+    Задача fn(context) выполняется в потоке (тяжёлую часть она отдаёт в пул процессов ChunkManager),
+    её события копятся в очереди и отправляются в bus из потока Tk через after() в poll.
+    Новая задача отменяет текущую, события отменённой задачи отбрасываются
+    """
+
+    def __init__(self, widget, bus: EventBus, poll_ms: int = 100):
+        """:param widget: любой виджет Tk, нужен только его after"""
+        self._widget = widget
+        self._bus = bus
+        self.poll_ms = poll_ms
+        self._queue: "queue.Queue" = queue.Queue()
+        self._current: Optional[TaskContext] = None
+        self._thread: Optional[threading.Thread] = None
+        self._next_id = 0
+        self._polling = False
+
+    @property
+    def busy(self) -> bool:
+        return self._current is not None
+
+    def submit(self, fn: Callable[[TaskContext], Any]) -> int:
+        """Запуск задачи, текущая отменяется. :return: task_id для сверки с событиями"""
+        self.cancel()
+        self._next_id += 1
+        context = TaskContext(self._next_id, lambda event, payload: self._queue.put((event, payload)))
+        self._current = context
+        self._thread = threading.Thread(target=self._run, args=(fn, context), daemon=True,
+                                        name=f"task-{context.task_id}")
+        self._thread.start()
+        self._schedule()
+        return context.task_id
+
+    def cancel(self):
+        """Отмена текущей задачи. Поток доработает до ближайшей точки отмены сам, интерфейс его не ждёт"""
+        context = self._current
+        if context is None:
+            return
+        context.cancel()
+        self._current = None
+        self._bus.emit(Event.TASK_CANCELLED, TaskCancelled(context.task_id))
+
+    def join(self, timeout: Optional[float] = None):
+        """Ожидание потока последней задачи, для закрытия окна и тестов"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @staticmethod
+    def _run(fn: Callable[[TaskContext], Any], context: TaskContext):
+        try:
+            result = fn(context)
+        except Cancelled:
+            return
+        except Exception as e:
+            context._post(Event.TASK_FAILED, TaskFailed(context.task_id, f"{type(e).__name__}: {e}"))
+            return
+        if not context.cancelled:
+            context._post(Event.TASK_FINISHED, TaskFinished(context.task_id, result, context.elapsed))
+
+    def poll(self):
+        """
+        Разбор очереди в потоке Tk. Из нескольких накопившихся TASK_PROGRESS отправляется только последний,
+        чтобы медленный интерфейс не отставал от быстрой задачи
+        """
+        self._polling = False
+        progress = None
+        while True:
+            try:
+                event, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            current = self._current
+            if current is None or payload.task_id != current.task_id:
+                continue
+            if event is Event.TASK_PROGRESS:
+                progress = payload
+                continue
+            if progress is not None:
+                self._bus.emit(Event.TASK_PROGRESS, progress)
+                progress = None
+            self._current = None
+            self._bus.emit(event, payload)
+        if progress is not None:
+            self._bus.emit(Event.TASK_PROGRESS, progress)
+        if self._current is not None:
+            self._schedule()
+
+    def _schedule(self):
+        if not self._polling:
+            self._polling = True
+            self._widget.after(self.poll_ms, self.poll)
+
@@ -184,7 +184,20 @@ class DimensionSelector(ttk.Frame, IDimensionSelector):
         self._combos[0].grid(row = 0, column = 0 , padx =  (0,50))
 
 
+class ProgressWidget(ttk.Frame):
+    """Полоса прогресса фоновой задачи и строка со статусом"""
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self._bar = ttk.Progressbar(self, orient=tk.HORIZONTAL, mode="determinate", maximum=1000, length=600)
+        self._bar.grid(row=0, column=0, sticky="we")
+        self._label = ttk.Label(self, text="")
+        self._label.grid(row=1, column=0, sticky="w", pady=(4, 0))
+        self.grid_columnconfigure(0, weight=1)
 
+    def update_progress(self, done: float, text: str):
+        self._bar.config(value=max(0.0, min(done, 1.0)) * 1000)
+        self._label.config(text=text)
 
-
-
+    def reset(self, text: str = ""):
+        self._bar.config(value=0)
+        self._label.config(text=text)
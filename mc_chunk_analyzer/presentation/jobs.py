@@ -0,0 +1,52 @@
+from collections import Counter
+from contextlib import closing
+from itertools import repeat
+from pathlib import Path
+from typing import Dict, Optional
+import numpy as np
+
+from .TaskRunner import TaskContext
+from ..domain.models.Chunk import Dimensions
+from ..domain.services.WorldHandler import project_region
+from ..domain.services.utils import ChunkManager
+from ..infrastructure.fs.services import region_directory
+
+# значения DimensionSelector -> измерения домена
+DIMENSIONS: Dict[str, Dimensions] = {"Over": "Overworld", "Nether": "Nether", "End": "End"}
+
+
+def survey_world(context: TaskContext, root: Path, dimension: Dimensions, workers: Optional[int] = None) -> Dict:
+    """
+    Задача для TaskRunner: проекция поверхности всех регионов измерения в пуле процессов.
+    Прогресс - по суммарному размеру обработанных файлов регионов, отмена проверяется после каждого региона.
+    От регионов остаются только счётчики блоков, память не растёт с размером мира
+    """
+    files = region_directory(root).files()
+    cords = sorted(files)
+    paths = [files[cord].path for cord in cords]
+    total = sum(files[cord].size for cord in cords) or 1
+    # поверхность целых регионов: границы по всем чанкам, которые вообще могут быть в файлах
+    bounds = (-2 ** 31, 2 ** 31 - 1, -2 ** 31, 2 ** 31 - 1)
+
+    manager = ChunkManager(root, dimension, workers=workers)
+    done = chunks = 0
+    blocks: Counter = Counter()
+    # closing: при отмене генератор закрывается и пул не запускает оставшиеся регионы
+    with closing(manager.map_regions(project_region, paths, repeat(dimension), repeat(bounds))) as batches:
+        for cord, batch in zip(cords, batches):
+            context.check()
+            done += files[cord].size
+            chunks += len(batch)
+            ids, counts = np.unique(batch.blocks, return_counts=True)
+            blocks.update({batch.palette[i]: n for i, n in zip(ids.tolist(), counts.tolist())})
+            context.progress(done / total, chunks, f"r.{cord[0]}.{cord[1]}.mca")
+    return {"regions": len(cords), "chunks": chunks, "blocks": blocks.most_common(5)}
+
+
+def format_seconds(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
@@ -1,7 +1,7 @@
 from enum import Enum
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Type
+from typing import Any, Dict, Optional, Type
 
 #event registration
 
@@ -9,6 +9,10 @@ from typing import Dict, Type
 class Event(Enum):
     PATH_CHANGED = "path_changed"
     WORLD_SELECTED = "world_selected"
+    TASK_PROGRESS = "task_progress"
+    TASK_FINISHED = "task_finished"
+    TASK_FAILED = "task_failed"
+    TASK_CANCELLED = "task_cancelled"
 
 @dataclass(frozen=True)
 class PathChanged:
@@ -19,8 +23,39 @@ class WorldSelected:
     path: Path
     dim: str
 
+# события фоновых задач TaskRunner, приходят в потоке Tk
+
+@dataclass(frozen=True)
+class TaskProgress:
+    task_id: int
+    done: float        # доля выполненной работы, 0..1
+    chunks: int        # обработано чанков
+    elapsed: float     # секунды с начала задачи
+    throughput: float  # чанков в секунду
+    eta: Optional[float]  # секунд до конца, None пока оценки нет
+    message: str = ""
+
+@dataclass(frozen=True)
+class TaskFinished:
+    task_id: int
+    result: Any
+    elapsed: float
+
+@dataclass(frozen=True)
+class TaskFailed:
+    task_id: int
+    error: str
+
+@dataclass(frozen=True)
+class TaskCancelled:
+    task_id: int
+
 EVENT_PAYLOAD: Dict[Event, Type] = {
     Event.PATH_CHANGED: PathChanged,
-    Event.WORLD_SELECTED: WorldSelected
+    Event.WORLD_SELECTED: WorldSelected,
+    Event.TASK_PROGRESS: TaskProgress,
+    Event.TASK_FINISHED: TaskFinished,
+    Event.TASK_FAILED: TaskFailed,
+    Event.TASK_CANCELLED: TaskCancelled,
 }
 
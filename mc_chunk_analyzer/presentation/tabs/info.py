@@ -1,8 +1,15 @@
+from pathlib import Path
+import os
+
 from ..models.events import Event
 from ..interfaces.INotebook import INotebookPage
-from ..Widgets import ConsoleWidget, PathWidget, DimensionSelector
+from ..Widgets import ConsoleWidget, PathWidget, DimensionSelector, ProgressWidget
+from ..TaskRunner import TaskRunner
+from ..jobs import DIMENSIONS, survey_world, format_seconds
 import ttkbootstrap as ttk
 from ..utils import EventBus
+from ...infrastructure.fs.services import WorldInfo
+
 
 class InfoTab(INotebookPage, ttk.Frame):
     def __init__(self):
@@ -11,18 +18,55 @@ class InfoTab(INotebookPage, ttk.Frame):
         self._console = ConsoleWidget(self)
         self._path_widget = PathWidget(self, self.bus)
         self._dim_selector = DimensionSelector(self, self.bus)
+        self._progress = ProgressWidget(self)
+        # один процесс оставляем окну
+        self._runner = TaskRunner(self, self.bus)
+        self._workers = max(1, (os.cpu_count() or 2) - 1)
         self._setup_ui()
 
     def _setup_ui(self):
         self._path_widget.grid(row = 0, column = 0, pady = 10, padx = 20, stick = "w")
         self._dim_selector.grid(row = 1,column = 0, pady = 20, padx = 40, stick = "w")
         self._console.place(width = 900, height = 400, y = 200, x = 40)
+        self._progress.place(width = 900, y = 620, x = 40)
         self._console.log("App started","success")
         self.bus.subscribe(Event.WORLD_SELECTED, self._process_world_selection)
+        self.bus.subscribe(Event.PATH_CHANGED, lambda path: self._runner.cancel())
+        self.bus.subscribe(Event.TASK_PROGRESS, self._on_progress)
+        self.bus.subscribe(Event.TASK_FINISHED, self._on_finished)
+        self.bus.subscribe(Event.TASK_FAILED, self._on_failed)
+        self.bus.subscribe(Event.TASK_CANCELLED, self._on_cancelled)
 
 
     def _process_world_selection(self, path, dim):
         self._console.clear()
         self._console.log(f"Selected {path}\n dimension: {dim}", "success")
+        try:
+            root = WorldInfo(Path(path)).path_to_dim(dim)
+        except (ValueError, OSError) as e:
+            self._runner.cancel()
+            self._console.log(str(e), "error")
+            return
+        dimension = DIMENSIONS[dim]
+        # выбор другого мира отменяет идущий анализ внутри submit
+        self._runner.submit(lambda context: survey_world(context, root, dimension, self._workers))
+        self._progress.reset("Analyzing...")
+
+    def _on_progress(self, task_id, done, chunks, elapsed, throughput, eta, message):
+        eta_text = format_seconds(eta) if eta is not None else "?"
+        self._progress.update_progress(
+            done, f"{done:.0%}  {chunks} chunks  {throughput:.0f} chunks/s  ETA {eta_text}  {message}"
+        )
+
+    def _on_finished(self, task_id, result, elapsed):
+        self._progress.update_progress(1.0, f"Done in {format_seconds(elapsed)}")
+        self._console.log(f"{result['regions']} regions, {result['chunks']} chunks", "success")
+        for name, count in result["blocks"]:
+            self._console.log(f"{name}: {count} columns")
 
+    def _on_failed(self, task_id, error):
+        self._progress.reset()
+        self._console.log(f"Analysis failed: {error}", "error")
 
+    def _on_cancelled(self, task_id):
+        self._progress.reset("Cancelled")
@@ -0,0 +1,29 @@
+import unittest
+import tempfile
+from pathlib import Path
+from benchmarks.pipeline import run, compare, tile_world
+from mc_chunk_analyzer.domain.services.utils import ChunkManager
+
+
+class TestBenchmarkHarness(unittest.TestCase):
+
+    def test_tile_world(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            corners = tile_world(Path(tmp), 2)
+            self.assertEqual((corners.xmax, corners.ymax), (63, 63))
+            self.assertEqual(len(ChunkManager(Path(tmp), "Overworld").region_files(corners)), 4)
+
+    def test_run_and_compare(self):
+        current = run(tiles=1, repeat=1, chunks=5, stages=["parse", "heights"])
+        self.assertEqual(set(current["results"]), {"parse", "heights"})
+        self.assertEqual(current["results"]["heights"]["items"], 5)
+        self.assertEqual(compare(current, current, 0.2), [])
+
+        slower = {"results": {name: dict(r, per_item_us=r["per_item_us"] * 2)
+                              for name, r in current["results"].items()}}
+        self.assertEqual(len(compare(slower, current, 0.5)), 2)
+        self.assertEqual(compare(slower, current, 1.5), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
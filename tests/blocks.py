@@ -0,0 +1,119 @@
+import unittest
+import numpy as np
+from pathlib import Path
+from mc_chunk_analyzer.domain.models.Region import RawRegion
+from mc_chunk_analyzer.domain.services.ChunkAnalyzer import (
+    McaParser, ChunkLayout, ChunkAnalyzer, extract_block_id_fast, unpack_section, unpack_indices, top_block_ids
+)
+from mc_chunk_analyzer.domain.services.BlockRegistry import BlockRegistry
+
+SAMPLE = Path(__file__).resolve().parent.parent / "r.-6.-6.mca"
+
+
+class TestSectionUnpacking(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with RawRegion(SAMPLE, "Overworld") as raw:
+            region = McaParser().parse(raw)
+            chunks = [c.raw_data for c in region.raw_chunks.values() if c.exists][:10]
+        cls.sections = [ChunkLayout(data).as_sections(names_only=True) for data in chunks]
+
+    def test_unpack_matches_single_lookup(self):
+        rng = np.random.default_rng(1)
+        for bits in range(1, 17):
+            per_long = 64 // bits
+            longs = rng.integers(-2 ** 63, 2 ** 63 - 1, size=-(-4096 // per_long), dtype=np.int64)
+            volume = unpack_section(longs, bits)
+            self.assertEqual(volume.shape, (16, 16, 16))
+            for index in rng.integers(0, 4096, 50).tolist():
+                expected = extract_block_id_fast(longs, index, bits, 1 << 16)
+                self.assertEqual(volume.reshape(-1)[index], expected)
+
+    def test_unpack_spanning(self):
+        rng = np.random.default_rng(2)
+        longs = rng.integers(-2 ** 63, 2 ** 63 - 1, size=36, dtype=np.int64)
+        stream = "".join(format(int(v) & (2 ** 64 - 1), "064b")[::-1] for v in longs.tolist())
+        expected = [int(stream[i * 9:i * 9 + 9][::-1], 2) for i in range(256)]
+        self.assertEqual(unpack_indices(longs, 9, 256, True).tolist(), expected)
+
+    def test_bulk_and_dense_match_get_block(self):
+        rng = np.random.default_rng(3)
+        for sections in self.sections:
+            analyzer = ChunkAnalyzer(sections)
+            cords = np.stack([rng.integers(0, 16, 200), rng.integers(-64, 320, 200), rng.integers(0, 16, 200)], 1)
+            expected = [analyzer.get_block(*c) for c in cords.tolist()]
+            self.assertEqual(analyzer.bulk_get_blocks(cords), expected)
+
+            volume, palette = analyzer.dense_volume()
+            for (x, y, z), name in zip(cords.tolist(), expected):
+                if analyzer.min_y <= y < analyzer.min_y + volume.shape[0]:
+                    self.assertEqual(palette[volume[y - analyzer.min_y, z, x]], name)
+
+    def test_section_index(self):
+        sections = [{"Y": y, "block_states": {"palette": [{"Name": f"test:{y}"}]}} for y in (3, -2, 0, 255, 3)]
+        analyzer = ChunkAnalyzer(sections)
+        self.assertEqual(analyzer.min_section_y, -2)
+        self.assertEqual(analyzer.max_section_y, 3)
+        self.assertEqual(analyzer.section_at(-1)["palette"], ["test:255"])  # 255 -> -1
+        self.assertIsNone(analyzer.section_at(1))
+        self.assertIsNone(analyzer.section_at(40))
+        # первая из секций с одинаковым Y
+        self.assertIs(analyzer.section_at(3), analyzer.section_data[0])
+        self.assertEqual([s['y'] for s in analyzer.iter_sections(-10, 2)], [-2, -1, 0])
+        self.assertEqual(analyzer.get_block(0, -17, 0), "test:-2")
+
+    def test_find_blocks(self):
+        for sections in self.sections[:3]:
+            analyzer = ChunkAnalyzer(sections)
+            targets = {"minecraft:stone", "minecraft:iron_ore"}
+            found = analyzer.find_blocks_in_area(targets, -64, 100, chunk_cord=(-2, 5))
+            self.assertEqual(found.shape[1], 3)
+            expected = sorted(
+                (x - 32, y, z + 80)
+                for y in range(-64, 101) for z in range(16) for x in range(16)
+                if analyzer.get_block(x, y, z) in targets
+            )
+            self.assertEqual(sorted(map(tuple, found.tolist())), expected)
+
+        self.assertEqual(analyzer.find_blocks_in_area("minecraft:not_a_block").shape, (0, 3))
+
+    def test_top_block_kernel(self):
+        rng = np.random.default_rng(6)
+        analyzers = [ChunkAnalyzer(sections) for sections in self.sections]
+        ys = rng.integers(-80, 340, (len(analyzers), 256))
+        batch = top_block_ids(analyzers, ys)
+        self.assertEqual(batch.dtype, np.uint16)
+        xs, zs = np.arange(256) % 16, np.arange(256) // 16
+        for analyzer, row, got in zip(analyzers, ys, batch):
+            expected = analyzer.bulk_get_block_ids(np.stack([xs, row, zs], 1))
+            self.assertEqual(got.tolist(), expected.tolist())
+            self.assertEqual(analyzer.surface_block_ids(row).tolist(), expected.tolist())
+
+        # секции с повтором Y и без данных
+        odd = ChunkAnalyzer([{"Y": 1, "block_states": {"palette": [{"Name": "test:a"}]}},
+                             {"Y": 1, "block_states": {"palette": [{"Name": "test:b"}]}},
+                             {"Y": 2, "block_states": {"palette": [{"Name": "test:c"}, {"Name": "test:d"}]}}])
+        ids = odd.surface_block_ids(np.array([20, 40, 60] * 85 + [0]))
+        self.assertEqual([odd.registry.name(i) for i in ids[:3].tolist()], ["test:a", "test:c", "minecraft:air"])
+
+    def test_registry_ids(self):
+        registry = BlockRegistry()
+        rng = np.random.default_rng(4)
+        for sections in self.sections:
+            analyzer = ChunkAnalyzer(sections, registry)
+            cords = np.stack([rng.integers(0, 16, 200), rng.integers(-64, 320, 200), rng.integers(0, 16, 200)], 1)
+            ids = analyzer.bulk_get_block_ids(cords)
+            self.assertEqual(ids.dtype, np.uint16)
+            self.assertEqual([registry.name(i) for i in ids.tolist()], analyzer.bulk_get_blocks(cords))
+
+            volume, palette = analyzer.dense_volume()
+            dense = analyzer.dense_ids()
+            self.assertEqual([registry.name(i) for i in dense.reshape(-1)[::97].tolist()],
+                             [palette[i] for i in volume.reshape(-1)[::97].tolist()])
+        self.assertEqual(registry.name(BlockRegistry.AIR_ID), "minecraft:air")
+        self.assertEqual(registry.id("minecraft:stone"), registry.id("minecraft:stone"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import numpy as np
+from pathlib import Path
+from dataclasses import replace
+from mc_chunk_analyzer.domain.models.Region import RawRegion
+from mc_chunk_analyzer.domain.models.Chunk import RawChunk
+from mc_chunk_analyzer.domain.services.ChunkAnalyzer import McaParser
+from mc_chunk_analyzer.domain.services.BlockRegistry import BlockRegistry
+from mc_chunk_analyzer.domain.services.ChunkCache import ChunkCache
+from mc_chunk_analyzer.domain.services.WorldHandler import GroundProjector
+
+SAMPLE = Path(__file__).resolve().parent.parent / "r.-6.-6.mca"
+
+
+class TestChunkCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with RawRegion(SAMPLE, "Overworld") as raw:
+            region = McaParser().parse(raw)
+            mask = (region.table["x"] <= -178) & (region.table["z"] <= -178)
+            cls.chunks = [c for c in region.raw_chunks.select(mask) if c.exists]
+
+    def test_hits_and_misses(self):
+        cache = ChunkCache()
+        first = [cache.get(chunk) for chunk in self.chunks]
+        self.assertEqual((cache.hits, cache.misses), (0, len(self.chunks)))
+        second = [cache.get(chunk) for chunk in self.chunks]
+        self.assertEqual(cache.hits, len(self.chunks))
+        self.assertTrue(all(a is b for a, b in zip(first, second)))
+        self.assertEqual(cache.nbytes, sum(d.nbytes for d in first))
+
+        # другой mtime региона или другой реестр - промах
+        cache.get(replace(self.chunks[0], region_mtime=self.chunks[0].region_mtime + 1))
+        cache.get(self.chunks[1], BlockRegistry())
+        self.assertEqual(cache.misses, len(self.chunks) + 2)
+
+    def test_same_cords_different_regions(self):
+        a, b = self.chunks[0], replace(self.chunks[1], abs_cord=self.chunks[0].abs_cord)
+        cache = ChunkCache()
+        # файл региона у a и b один и тот же, отличается только путь
+        moved = replace(b, region_path=Path("/elsewhere") / SAMPLE.name)
+        self.assertIsNot(cache.get(a), cache.get(moved))
+        self.assertEqual(len(cache), 2)
+
+        # собранные вручную чанки без региона не кешируются вовсе
+        loose = [RawChunk(a.abs_cord, a.raw_data, "Overworld"), RawChunk(b.abs_cord, b.raw_data, "Overworld")]
+        self.assertIsNot(cache.get(loose[0]), cache.get(loose[1]))
+        self.assertNotIn(loose[0], cache)
+        first = GroundProjector(loose[:1], cache=cache).project()
+        second = GroundProjector(loose[1:], cache=cache).project()
+        self.assertEqual(second.blocks.tolist(), GroundProjector(loose[1:], cache=None).project().blocks.tolist())
+        self.assertNotEqual(first.blocks.tolist(), second.blocks.tolist())
+
+    def test_lru_budget(self):
+        one = ChunkCache().get(self.chunks[0]).nbytes
+        cache = ChunkCache(max_bytes=int(one * 2.5))
+        for chunk in self.chunks[:3]:
+            cache.get(chunk)
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+        self.assertNotIn(self.chunks[0], cache)
+        self.assertIn(self.chunks[2], cache)
+        self.assertGreater(cache.evictions, 0)
+
+        cache.get(self.chunks[1])  # становится самым свежим
+        cache.get(self.chunks[3])
+        self.assertIn(self.chunks[1], cache)
+
+    def test_projector_uses_cache(self):
+        cache = ChunkCache()
+        expected = GroundProjector(self.chunks, cache=None).project()
+        GroundProjector(self.chunks, cache=cache).project()
+        result = GroundProjector(self.chunks, cache=cache).project()
+        self.assertEqual(cache.hits, len(self.chunks))
+        self.assertTrue(np.array_equal(expected.blocks, result.blocks))
+        self.assertTrue(np.array_equal(expected.heights, result.heights))
+
+
+if __name__ == "__main__":
+    unittest.main()
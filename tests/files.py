@@ -1,8 +1,9 @@
 import unittest
 import tempfile
 import shutil
+import os
 from pathlib import Path
-from mc_chunk_analyzer.infrastructure.fs.services import PathInfo, WorldTree  # замени your_module на фактический модуль
+from mc_chunk_analyzer.infrastructure.fs.services import PathInfo, WorldTree, RegionDirectory  # замени your_module на фактический модуль
 
 class TestPathInfo(unittest.TestCase):
 
@@ -43,5 +44,44 @@ class TestPathInfo(unittest.TestCase):
         self.assertEqual(set(data.bobby_words["BobbyWorld1"]), {"SubworldA", "SubworldB"})
         self.assertEqual(set(data.bobby_words["BobbyWorld2"]), {"SubworldX"})
 
+class TestRegionDirectory(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        region = self.temp_dir / "region"
+        region.mkdir()
+        (region / "r.0.0.mca").write_bytes(b"\0" * 8192)
+        (region / "r.-3.12.mca").write_bytes(b"")
+        (region / "r.1.1.mca.tmp").write_bytes(b"")
+        (region / "r.2.2.mca").mkdir()
+        # соседние папки мира не сканируются
+        (self.temp_dir / "entities").mkdir()
+        (self.temp_dir / "entities" / "r.5.5.mca").write_bytes(b"")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_index(self):
+        directory = RegionDirectory(self.temp_dir)
+        self.assertEqual(set(directory.files()), {(0, 0), (-3, 12)})
+        self.assertEqual(directory.get(0, 0).size, 8192)
+        self.assertEqual(directory.get(0, 0).path, self.temp_dir / "region" / "r.0.0.mca")
+        self.assertIsNone(directory.get(5, 5))
+
+    def test_refresh_on_directory_change(self):
+        directory = RegionDirectory(self.temp_dir)
+        directory.files()
+        region = self.temp_dir / "region"
+        (region / "r.7.-7.mca").write_bytes(b"")
+        # время папки меняем явно: два изменения подряд могут попасть в один тик часов ФС
+        stat = region.stat()
+        os.utime(region, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNotNone(directory.get(7, -7))
+
+    def test_flat_bobby_folder(self):
+        flat = self.temp_dir / "region"
+        self.assertEqual(set(RegionDirectory(flat).files()), {(0, 0), (-3, 12)})
+
+
 if __name__ == "__main__":
     unittest.main()
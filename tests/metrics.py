@@ -0,0 +1,88 @@
+import unittest
+import json
+import pickle
+import tempfile
+import shutil
+from pathlib import Path
+from mc_chunk_analyzer.domain.models.Chunk import Corners
+from mc_chunk_analyzer.domain.services.Metrics import Metrics, METRICS
+from mc_chunk_analyzer.domain.services.WorldHandler import project_parallel
+from mc_chunk_analyzer.domain.services.utils import ChunkManager
+
+SAMPLE = Path(__file__).resolve().parent.parent / "r.-6.-6.mca"
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_quantiles(self):
+        metrics = Metrics(enabled=True)
+        for i in range(1, 101):
+            metrics.observe("stage", i / 1000)
+        h = metrics.histogram("stage")
+        self.assertEqual(h.count, 100)
+        self.assertAlmostEqual(h.total, 5.05)
+        # корзины по 10 на порядок: ошибка квантиля не больше ширины корзины (~26%)
+        for q, expected in ((0.5, 0.05), (0.95, 0.095), (0.99, 0.099)):
+            self.assertLessEqual(abs(h.quantile(q) - expected) / expected, 0.26)
+        self.assertEqual(h.quantile(1.0), 0.1)
+
+    def test_merge_snapshots(self):
+        a, b, total = Metrics(enabled=True), Metrics(enabled=True), Metrics(enabled=True)
+        for metrics, n in ((a, 3), (b, 5)):
+            with metrics.stage("read"):
+                pass
+            metrics.count("chunks", n)
+            metrics.count("cache_hits", n)
+            metrics.count("cache_misses", 1)
+        total.merge(pickle.loads(pickle.dumps(a.drain())))
+        total.merge(b.snapshot())
+        self.assertEqual(a.counter("chunks"), 0)
+        self.assertEqual(total.counter("chunks"), 8)
+        self.assertEqual(total.histogram("read").count, 2)
+        self.assertAlmostEqual(total.hit_rates()["cache"], 0.8)
+
+        summary = json.loads(total.to_json())
+        self.assertEqual(summary["stages"]["read"]["count"], 2)
+        self.assertIn("p99", summary["stages"]["read"])
+
+        text = total.to_prometheus()
+        self.assertIn("# TYPE mca_chunks_total counter\nmca_chunks_total 8", text)
+        self.assertIn('mca_stage_seconds_bucket{stage="read",le="+Inf"} 2', text)
+        self.assertIn('mca_stage_seconds_count{stage="read"} 2', text)
+
+    def test_disabled(self):
+        metrics = Metrics(enabled=False)
+        with metrics.stage("read"):
+            pass
+        metrics.count("chunks")
+        self.assertEqual(metrics.snapshot(), {"counters": {}, "histograms": {}})
+
+
+class TestWorkerAggregation(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        (self.temp_dir / "region").mkdir()
+        for name in ("r.0.0.mca", "r.1.0.mca"):
+            shutil.copy(SAMPLE, self.temp_dir / "region" / name)
+        self.corners = Corners(0, 63, 0, 31)
+        METRICS.reset()
+
+    def tearDown(self):
+        METRICS.reset()
+        shutil.rmtree(self.temp_dir)
+
+    def test_pool_counters(self):
+        inline = project_parallel(ChunkManager(self.temp_dir, "Overworld"), self.corners)
+        expected = METRICS.snapshot()
+        METRICS.reset()
+
+        pooled = project_parallel(ChunkManager(self.temp_dir, "Overworld", workers=2), self.corners)
+        self.assertEqual(sum(len(b) for b in pooled), sum(len(b) for b in inline))
+        self.assertGreater(METRICS.counter("chunks_decoded"), 0)
+        self.assertEqual(METRICS.snapshot()["counters"], expected["counters"])
+        self.assertEqual(METRICS.histogram("nbt_reading").count, expected["histograms"]["nbt_reading"]["count"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import struct
+from pathlib import Path
+from mc_chunk_analyzer.domain.models.Region import RawRegion
+from mc_chunk_analyzer.domain.services.ChunkAnalyzer import McaParser, NBTTagReader, ChunkLayout, HEIGHTMAP_NAMES, SEC_Y
+
+SAMPLE = Path(__file__).resolve().parent.parent / "r.-6.-6.mca"
+
+
+class TestNBTProjection(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with RawRegion(SAMPLE, "Overworld") as raw:
+            region = McaParser().parse(raw)
+            cls.chunks = [c.raw_data for c in region.raw_chunks.values() if c.exists][:20]
+
+    def test_only_requested_paths(self):
+        paths = [("Heightmaps", "WORLD_SURFACE"), ("sections", "*", "Y"), ("sections", "*", "block_states")]
+        for data in self.chunks:
+            full = NBTTagReader(data).read().value
+            part = NBTTagReader(data).read_paths(paths)
+
+            self.assertEqual(set(part), {"Heightmaps", "sections"})
+            self.assertEqual(part["Heightmaps"], {"WORLD_SURFACE": full["Heightmaps"]["WORLD_SURFACE"]})
+            expected = [
+                {k: section[k] for k in ("Y", "block_states") if k in section}
+                for section in full["sections"]
+            ]
+            self.assertEqual(part["sections"], expected)
+
+    def test_nested_list_path(self):
+        data = self.chunks[0]
+        full = NBTTagReader(data).read().value
+        part = NBTTagReader(data).read_paths([("sections", "*", "block_states", "palette", "*", "Name")])
+        for got, section in zip(part["sections"], full["sections"]):
+            names = [b["Name"] for b in section["block_states"]["palette"]]
+            self.assertEqual([b["Name"] for b in got["block_states"]["palette"]], names)
+
+    def test_prefix_path_reads_whole_branch(self):
+        data = self.chunks[0]
+        full = NBTTagReader(data).read().value
+        part = NBTTagReader(data).read_paths([("Heightmaps", "WORLD_SURFACE"), ("Heightmaps",)])
+        self.assertEqual(part["Heightmaps"], full["Heightmaps"])
+
+    def test_parse_through_tree(self):
+        data = self.chunks[0]
+        tag = NBTTagReader(data).parse_through_tree(["DataVersion"])
+        self.assertEqual(tag.value, NBTTagReader(data).read().value["DataVersion"])
+        self.assertIsNone(NBTTagReader(data).parse_through_tree(["Missing"]))
+
+
+def name(text: bytes) -> bytes:
+    return struct.pack(">H", len(text)) + text
+
+
+class TestChunkLayout(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with RawRegion(SAMPLE, "Overworld") as raw:
+            region = McaParser().parse(raw)
+            cls.chunks = [c.raw_data for c in region.raw_chunks.values() if c.exists][:20]
+
+    def test_heightmaps(self):
+        for data in self.chunks:
+            full = NBTTagReader(data).read().value
+            layout = ChunkLayout(data)
+            for name in HEIGHTMAP_NAMES:
+                heights = layout.heightmap(name)
+                if name in full["Heightmaps"]:
+                    self.assertEqual(heights.tolist(), full["Heightmaps"][name])
+                else:
+                    self.assertIsNone(heights)
+
+    def test_sections(self):
+        for data in self.chunks:
+            full = NBTTagReader(data).read().value
+            sections = ChunkLayout(data).as_sections()
+            self.assertEqual(len(sections), len(full["sections"]))
+            for got, section in zip(sections, full["sections"]):
+                # reader отдаёт байт без знака, сканер - со знаком
+                self.assertEqual(got["Y"] % 256, section["Y"])
+                block_states = section.get("block_states", {})
+                self.assertEqual(got["block_states"]["palette"], block_states.get("palette", []))
+                self.assertEqual(got["block_states"]["data"].tolist(), block_states.get("data", []))
+
+    def test_truncated(self):
+        data = self.chunks[0]
+        for cut in (3, 100, len(data) // 2, len(data) - 1):
+            with self.assertRaises(ValueError):
+                ChunkLayout(data[:cut])
+
+    def test_many_sections(self):
+        # высокий мир из датапака: 100 секций, все в разметке
+        sections = b"".join(b"\x01" + name(b"Y") + struct.pack(">b", y) + b"\x00" for y in range(-50, 50))
+        data = (b"\x0a" + name(b"") + b"\x03" + name(b"yPos") + struct.pack(">i", -50)
+                + b"\x09" + name(b"sections") + b"\x0a" + struct.pack(">i", 100) + sections + b"\x00")
+        layout = ChunkLayout(data)
+        self.assertEqual(layout.sections[:, SEC_Y].tolist(), list(range(-50, 50)))
+
+    def test_too_deep(self):
+        nested = b"\x09" + struct.pack(">i", 1)
+        data = b"\x0a" + name(b"") + b"\x09" + name(b"x") + nested * 600 + b"\x00" + struct.pack(">i", 0) + b"\x00"
+        with self.assertRaises(ValueError):
+            ChunkLayout(data)
+
+    def test_not_a_compound(self):
+        layout = ChunkLayout(b"\x00\x00\x00")
+        self.assertEqual(len(layout.sections), 0)
+        self.assertIsNone(layout.heightmap())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,361 @@
+import unittest
+import gzip
+import struct
+import zlib
+import shutil
+import tempfile
+import importlib.util
+import numpy as np
+from pathlib import Path
+from mc_chunk_analyzer.domain.models.Region import RawRegion
+from mc_chunk_analyzer.domain.models.Chunk import TwoDimCord, Corners, ChunkTable
+from mc_chunk_analyzer.domain.services.ChunkAnalyzer import McaParser, ChunkLayout, NBTTagReader
+from mc_chunk_analyzer.domain.services.Compression import (
+    ChunkReadError, lz4_block_decode, lz4_java, LZ4_HEADER, LZ4_MAGIC, LZ4_COMPRESSED
+)
+from mc_chunk_analyzer.domain.services.Metrics import METRICS
+from mc_chunk_analyzer.domain.services.ScanCache import ScanCache
+from mc_chunk_analyzer.domain.services.WorldHandler import project_region, project_stream
+from mc_chunk_analyzer.domain.services.utils import ChunkManager
+
+SAMPLE = Path(__file__).resolve().parent.parent / "r.-6.-6.mca"
+
+
+class TestMcaParser(unittest.TestCase):
+
+    def setUp(self):
+        self.raw = RawRegion(SAMPLE, "Overworld")
+        self.region = McaParser().parse(self.raw)
+
+    def tearDown(self):
+        self.raw.close()
+
+    def test_chunks_are_lazy(self):
+        chunks = self.region.raw_chunks
+        self.assertEqual(len(chunks), 1024)
+        # ключи есть сразу, но ничего ещё не распаковано
+        self.assertEqual(len(list(chunks)), 1024)
+        self.assertEqual(chunks._loaded, {})
+
+        cord = TwoDimCord((-6 * 32, -6 * 32))
+        chunk = chunks[cord]
+        self.assertEqual(len(chunks._loaded), 1)
+        self.assertIs(chunks[cord], chunk)
+
+    def test_chunk_bytes_match_file(self):
+        data = SAMPLE.read_bytes()
+        existing = 0
+        for cord in self.region.raw_chunks:
+            chunk = self.region.raw_chunks[cord]
+            if not chunk.exists:
+                continue
+            existing += 1
+            i = chunk.rel_cord[1] * 32 + chunk.rel_cord[0]
+            loc = int.from_bytes(data[i * 4:i * 4 + 3], "big") * 4096
+            length = int.from_bytes(data[loc:loc + 4], "big")
+            self.assertEqual(chunk.raw_data, zlib.decompress(data[loc + 5:loc + 4 + length]))
+        self.assertEqual(existing, 387)
+
+    def test_chunk_table(self):
+        data = SAMPLE.read_bytes()
+        table = self.region.table
+        self.assertEqual(table.shape, (1024,))
+        for i in range(1024):
+            row = table[i]
+            self.assertEqual((row["x"], row["z"]), (-192 + i % 32, -192 + i // 32))
+            offset = int.from_bytes(data[i * 4:i * 4 + 3], "big")
+            self.assertEqual(row["offset"], offset)
+            if offset:
+                self.assertEqual(row["length"], int.from_bytes(data[offset * 4096:offset * 4096 + 4], "big"))
+                self.assertEqual(row["compression"], 2)
+
+        # фильтрация маской до распаковки
+        mask = table["x"] < -190
+        chunks = self.region.raw_chunks.select(mask)
+        self.assertEqual(len(chunks), 64)
+        self.assertEqual(len(self.region.raw_chunks._loaded), 64)
+
+    def test_region_closes_after_reads(self):
+        # read_chunk читает через memoryview над mmap: после чтения, в том числе неудачного, mmap закрывается
+        chunk = self.region.raw_chunks.by_index(int(np.flatnonzero(self.region.table["offset"])[0]))
+        broken = self.region.table[self.region.table["offset"] > 0][0].copy()
+        broken["compression"] = 1
+        with self.assertRaises(ChunkReadError):
+            McaParser.read_chunk(self.raw.data, broken)
+        self.raw.close()
+        self.assertTrue(self.raw.data.closed)
+
+        # переиспользуемый ридер потока даёт те же секции, что и свежий
+        layout = ChunkLayout(chunk.raw_data)
+        fresh = [layout.palette(i, NBTTagReader(chunk.raw_data)) for i in range(len(layout.sections))]
+        self.assertEqual([s["block_states"]["palette"] for s in layout.as_sections()], fresh)
+        self.assertEqual([s["block_states"]["palette"] for s in layout.as_sections()], fresh)
+
+    def test_foreign_cord(self):
+        with self.assertRaises(KeyError):
+            _ = self.region.raw_chunks[TwoDimCord((0, 0))]
+        self.assertNotIn(TwoDimCord((0, 0)), self.region.raw_chunks)
+
+
+class TestIterChunks(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        shutil.copy(SAMPLE, self.temp_dir / "r.-6.-6.mca")
+        self.manager = ChunkManager(self.temp_dir, "Overworld")
+        self.corners = Corners(-185, -175, -184, -178)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_same_chunks_as_region_map(self):
+        chunks = list(self.manager.iter_chunks(self.corners))
+        self.assertEqual(len(chunks), 13 * 9)
+        with RawRegion(self.temp_dir / "r.-6.-6.mca", "Overworld") as raw:
+            region = McaParser().parse(raw)
+            for chunk in chunks:
+                expected = region.raw_chunks[chunk.abs_cord]
+                self.assertEqual(chunk.raw_data, expected.raw_data)
+                self.assertEqual(chunk.region_mtime, raw.mtime_ns)
+        self.assertEqual([c.abs_cord for c in self.manager.get_chunks(self.corners)], [c.abs_cord for c in chunks])
+
+    def test_batches(self):
+        batches = list(self.manager.iter_batches(self.corners, pad=0))
+        self.assertEqual(len(batches), 1)
+        cords, decoded = batches[0]
+        existing = [c for c in self.manager.iter_chunks(self.corners, pad=0) if c.exists]
+        self.assertEqual(cords.tolist(), [list(c.abs_cord.as_tuple) for c in existing])
+        self.assertEqual(len(decoded), len(existing))
+
+
+class TestChunkTable(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        for name in ("r.-6.-6.mca", "r.-5.-6.mca"):
+            shutil.copy(SAMPLE, self.temp_dir / name)
+        self.manager = ChunkManager(self.temp_dir, "Overworld")
+        # область через границу двух регионов
+        self.corners = Corners(-170, -150, -184, -178)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_columns_match_regions(self):
+        table = self.manager.get_chunks(self.corners, pad=0)
+        self.assertIsInstance(table, ChunkTable)
+        self.assertEqual(len(table), 21 * 7)
+        self.assertEqual(table.x.dtype, np.int32)
+        self.assertEqual(sorted(set(table.x.tolist())), list(range(-170, -149)))
+
+        views = list(table)
+        for name in ("r.-6.-6.mca", "r.-5.-6.mca"):
+            with RawRegion(self.temp_dir / name, "Overworld") as raw:
+                region = McaParser().parse(raw)
+                for chunk in views:
+                    if chunk.cord[0] // 32 == raw.cord.x:
+                        expected = region.raw_chunks[chunk.abs_cord]
+                        self.assertEqual(chunk.raw_data, expected.raw_data)
+                        self.assertEqual(chunk.region_mtime, raw.mtime_ns)
+        self.assertEqual(table.present.tolist(), [c.exists for c in views])
+        self.assertEqual(views[0].dimension, "Overworld")
+
+    def test_select_and_from_chunks(self):
+        table = self.manager.get_chunks(self.corners, pad=0)
+        picked = table.select((table.x >= -160) & table.present)
+        self.assertTrue((picked.x >= -160).all())
+        # буфер общий, строки смотрят в те же байты
+        self.assertIs(picked.data, table.data)
+        # raw_data - read-only окно в буфер, без копии
+        view = picked[0].raw_data
+        self.assertIsInstance(view, memoryview)
+        self.assertTrue(view.readonly)
+        self.assertIs(view.obj, table.data)
+        self.assertEqual([c.raw_data for c in picked], [c.raw_data for c in table if c.cord[0] >= -160 and c.exists])
+
+        copy = ChunkTable.from_chunks(list(table))
+        self.assertEqual(copy.cords.tolist(), table.cords.tolist())
+        self.assertEqual(copy.length.tolist(), table.length.tolist())
+        self.assertEqual([c.raw_data for c in copy], [c.raw_data for c in table])
+        self.assertEqual(len(ChunkTable.empty()), 0)
+        # таблицы сравниваются и хешируются по идентичности, а не по колонкам
+        self.assertNotEqual(copy, table)
+        self.assertEqual(len({copy, table}), 2)
+
+    def test_iter_chunks_streams(self):
+        # у каждого чанка своя таблица из одной строки, в буфере только его байты
+        for chunk in self.manager.iter_chunks(self.corners, pad=0):
+            self.assertEqual(len(chunk.table), 1)
+            self.assertEqual(len(chunk.table.data), chunk.bytes_size)
+
+
+def chunk_size(raw_data, cord):
+    return len(raw_data)
+
+
+class TestIncrementalScan(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.path = self.temp_dir / "r.-6.-6.mca"
+        shutil.copy(SAMPLE, self.path)
+        self.manager = ChunkManager(self.temp_dir, "Overworld")
+        self.corners = Corners(-182, -176, -182, -178)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _touch_chunk(self, slot):
+        with open(self.path, "r+b") as f:
+            f.seek(4096 + slot * 4)
+            stamp = int.from_bytes(f.read(4), "big")
+            f.seek(4096 + slot * 4)
+            f.write((stamp + 1).to_bytes(4, "big"))
+
+    def test_timestamps_in_table(self):
+        data = SAMPLE.read_bytes()
+        with RawRegion(SAMPLE, "Overworld") as raw:
+            table = McaParser().parse(raw).table
+        for i in (0, 37, 1023):
+            self.assertEqual(table[i]["timestamp"], int.from_bytes(data[4096 + i * 4:4100 + i * 4], "big"))
+
+    def test_only_changed_chunks_are_decoded(self):
+        cache = ScanCache()
+        first = self.manager.scan_incremental(self.corners, chunk_size, cache, pad=0)
+        self.assertGreater(len(first), 0)
+        self.assertEqual(cache.decoded, len(first))
+
+        # файл не менялся - регион даже не открывается
+        self.assertEqual(self.manager.scan_incremental(self.corners, chunk_size, cache, pad=0), first)
+        self.assertEqual((cache.decoded, cache.reused), (0, len(first)))
+
+        self._touch_chunk(12 * 32 + 13)  # чанк (-179, -180)
+        again = self.manager.scan_incremental(self.corners, chunk_size, cache, pad=0)
+        self.assertEqual(again, first)
+        self.assertEqual((cache.decoded, cache.reused), (1, len(first) - 1))
+
+        # область шире прошлой - досчитываются только новые чанки
+        wider = Corners(-182, -172, -182, -178)
+        result = self.manager.scan_incremental(wider, chunk_size, cache, pad=0)
+        self.assertGreater(len(result), len(first))
+        self.assertEqual(cache.decoded, len(result) - len(first))
+
+    def test_cache_file(self):
+        cache = ScanCache(self.temp_dir / "cache" / "scan.pkl")
+        first = self.manager.scan_incremental(self.corners, chunk_size, cache, pad=0)
+        cache.save()
+
+        restored = ScanCache.load(self.temp_dir / "cache" / "scan.pkl")
+        self.assertEqual(self.manager.scan_incremental(self.corners, chunk_size, restored, pad=0), first)
+        self.assertEqual(restored.decoded, 0)
+        self.assertEqual(len(ScanCache.load(self.temp_dir / "missing.pkl").regions), 0)
+
+
+def lz4_literals(data: bytes) -> bytes:
+    """Кадр lz4-java из одного блока LZ4 без совпадений: только литералы"""
+    rest = len(data) - 15
+    lengths = b"\xff" * (rest // 255) + bytes([rest % 255])
+    block = b"\xf0" + lengths + data
+    header = LZ4_HEADER.pack(LZ4_MAGIC, LZ4_COMPRESSED, len(block), len(data), 0)
+    end = LZ4_HEADER.pack(LZ4_MAGIC, 0x10, 0, 0, 0)
+    return header + block + end
+
+
+def write_region(path: Path, chunks):
+    """.mca из [(слот, байт сжатия, тело)], по сектору на чанк"""
+    header = bytearray(8192)
+    body = bytearray()
+    for slot, compression, payload in chunks:
+        record = struct.pack(">IB", len(payload) + 1, compression) + payload
+        sectors = -(-len(record) // 4096)
+        offset = 2 + len(body) // 4096
+        header[slot * 4:slot * 4 + 4] = struct.pack(">I", offset << 8 | sectors)
+        body += record.ljust(sectors * 4096, b"\0")
+    path.write_bytes(bytes(header) + bytes(body))
+
+
+class TestCompression(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with RawRegion(SAMPLE, "Overworld") as raw:
+            region = McaParser().parse(raw)
+            cls.nbt = [c.raw_data for c in region.raw_chunks.select(region.table["offset"] > 0)[:5]]
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_lz4_block(self):
+        # "ab" и совпадение длины 6 со смещением 2: копия перекрывает сама себя
+        src = bytes([0x22]) + b"ab" + bytes([2, 0]) + bytes([0x30]) + b"xyz"
+        dst = np.zeros(11, dtype=np.uint8)
+        self.assertEqual(lz4_block_decode(np.frombuffer(src, dtype=np.uint8), dst), 11)
+        self.assertEqual(dst.tobytes(), b"abababab" + b"xyz")
+        # смещение за начало вывода
+        self.assertEqual(lz4_block_decode(np.frombuffer(bytes([0x10]) + b"a" + bytes([5, 0]), dtype=np.uint8),
+                                          np.zeros(16, dtype=np.uint8)), -1)
+        self.assertEqual(lz4_java(lz4_literals(self.nbt[0])), self.nbt[0])
+
+    @unittest.skipUnless(importlib.util.find_spec("lz4"), "lz4 not installed")
+    def test_lz4_block_matches_library(self):
+        import lz4.block
+        for data in self.nbt:
+            block = lz4.block.compress(data, store_size=False)
+            dst = np.empty(len(data), dtype=np.uint8)
+            self.assertEqual(lz4_block_decode(np.frombuffer(block, dtype=np.uint8), dst), len(data))
+            self.assertEqual(dst.tobytes(), data)
+
+    def test_region_formats(self):
+        region_dir = self.temp_dir / "region"
+        region_dir.mkdir()
+        gz, zl, lz, ext, plain = self.nbt
+        write_region(region_dir / "r.0.0.mca", [
+            (0, 1, gzip.compress(gz)),
+            (1, 2, zlib.compress(zl)),
+            (2, 4, lz4_literals(lz)),
+            (3, 0x82, b""),
+            (4, 3, plain),
+        ])
+        (region_dir / "c.3.0.mcc").write_bytes(zlib.compress(ext))
+
+        chunks = list(ChunkManager(self.temp_dir, "Overworld").iter_chunks(Corners(0, 4, 0, 0), pad=0))
+        self.assertEqual([c.raw_data for c in chunks], self.nbt)
+
+        (region_dir / "c.3.0.mcc").unlink()
+        with RawRegion(region_dir / "r.0.0.mca", "Overworld") as raw:
+            region = McaParser().parse(raw)
+            with self.assertRaises(ChunkReadError):
+                region.raw_chunks.by_index(3)
+            self.assertEqual(region.raw_chunks.by_index(2).raw_data, lz)
+
+    def test_bad_chunk_is_skipped(self):
+        region_dir = self.temp_dir / "region"
+        region_dir.mkdir()
+        write_region(region_dir / "r.0.0.mca", [
+            (0, 127, b"custom"),
+            (1, 2, zlib.compress(self.nbt[0])),
+            (2, 0x82, b""),
+        ])
+        manager = ChunkManager(self.temp_dir, "Overworld")
+        corners = Corners(0, 2, 0, 0)
+        METRICS.reset()
+
+        with self.assertLogs("mc_chunk_analyzer.domain.services.utils", "WARNING") as logs:
+            table = manager.get_chunks(corners, pad=0)
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(table.present.tolist(), [False, True, False])
+        self.assertEqual(table.raw(1), self.nbt[0])
+        self.assertEqual(METRICS.counter("chunks_failed"), 2)
+
+        (cords, decoded), = manager.iter_batches(corners, pad=0)
+        self.assertEqual(cords.tolist(), [[1, 0]])
+        batch = project_region(region_dir / "r.0.0.mca", "Overworld", (0, 2, 0, 0))
+        self.assertEqual(batch.cords.tolist(), [[1, 0]])
+        self.assertEqual(project_stream(manager, corners).present.tolist(), [[False, True, False]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import tempfile
+import shutil
+import os
+import numpy as np
+from pathlib import Path
+from PIL import Image
+from mc_chunk_analyzer.domain.services.utils import ChunkManager
+from mc_chunk_analyzer.infrastructure.render.colors import ColorTable
+from mc_chunk_analyzer.infrastructure.render.services import TileRenderer, downsample, TILE_SIZE
+
+SAMPLE = Path(__file__).resolve().parent.parent / "r.-6.-6.mca"
+
+
+class TestTileRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        (self.temp_dir / "region").mkdir()
+        self.region = self.temp_dir / "region" / "r.-6.-6.mca"
+        shutil.copy(SAMPLE, self.region)
+        self.out = self.temp_dir / "tiles"
+        self.renderer = TileRenderer(ChunkManager(self.temp_dir / "region", "Overworld"), self.out, levels=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_pyramid(self):
+        self.assertEqual(self.renderer.render(), [self.region])
+        for level, cord in [(0, (-6, -6)), (1, (-3, -3)), (2, (-2, -2))]:
+            self.assertTrue(self.renderer.tile_path(level, *cord).is_file())
+
+        with Image.open(self.renderer.tile_path(0, -6, -6)) as img:
+            tile = np.asarray(img)
+        self.assertEqual(tile.shape, (TILE_SIZE, TILE_SIZE, 4))
+        # чанк (-192, -192) не сгенерирован, (-180, -180) есть
+        self.assertTrue((tile[:16, :16, 3] == 0).all())
+        self.assertTrue((tile[12 * 16:13 * 16, 12 * 16:13 * 16, 3] == 255).all())
+
+        with Image.open(self.renderer.tile_path(1, -3, -3)) as img:
+            parent = np.asarray(img)
+        # регион -6 - левый верхний из четырёх детей тайла (-3, -3)
+        expected = downsample(np.pad(tile, ((0, TILE_SIZE), (0, TILE_SIZE), (0, 0))))
+        self.assertTrue(np.array_equal(parent, expected))
+
+    def test_incremental(self):
+        self.renderer.render()
+        self.assertEqual(self.renderer.render(), [])
+
+        stat = self.region.stat()
+        os.utime(self.region, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(self.renderer.render(), [self.region])
+        self.assertEqual(self.renderer.render(force=True), [self.region])
+
+    def test_deleted_region(self):
+        # второй регион - сосед по тайлу (-3, -3) первого уровня
+        other = self.temp_dir / "region" / "r.-5.-6.mca"
+        shutil.copy(SAMPLE, other)
+        self.renderer.render()
+        with Image.open(self.renderer.tile_path(1, -3, -3)) as img:
+            both = np.asarray(img)
+
+        other.unlink()
+        self.assertEqual(self.renderer.render(), [])
+        self.assertFalse(self.renderer.tile_path(0, -5, -6).is_file())
+        with Image.open(self.renderer.tile_path(1, -3, -3)) as img:
+            parent = np.asarray(img)
+        self.assertFalse(np.array_equal(parent, both))
+        self.assertTrue((parent[:TILE_SIZE // 2, TILE_SIZE // 2:, 3] == 0).all())
+
+        # без регионов пирамида исчезает целиком
+        self.region.unlink()
+        self.renderer.render()
+        for level, cord in [(0, (-6, -6)), (1, (-3, -3)), (2, (-2, -2))]:
+            self.assertFalse(self.renderer.tile_path(level, *cord).is_file())
+
+    def test_colors(self):
+        colors = ColorTable()
+        self.assertEqual(tuple(colors.lut(["minecraft:water"])[0]), (64, 64, 255))
+        self.assertEqual(colors.color("minecraft:birch_leaves"), colors.color("minecraft:jungle_leaves"))
+        self.assertEqual(colors.color("mod:unknown"), ColorTable().color("mod:unknown"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import tempfile
+import shutil
+import os
+import numpy as np
+from pathlib import Path
+from mc_chunk_analyzer.domain.models.Chunk import Corners
+from mc_chunk_analyzer.domain.services.ChunkAnalyzer import NBTTagReader, ChunkAnalyzer, McaParser, ChunkLayout
+from mc_chunk_analyzer.domain.services.BlockSearch import BlockSearcher
+from mc_chunk_analyzer.domain.services.utils import ChunkManager
+from mc_chunk_analyzer.domain.services.BlockRegistry import BlockRegistry
+from mc_chunk_analyzer.domain.services.PaletteIndex import PaletteIndex
+from mc_chunk_analyzer.domain.models.Region import RawRegion
+
+SAMPLE = Path(__file__).resolve().parent.parent / "r.-6.-6.mca"
+TARGETS = ["minecraft:diamond_ore", "minecraft:deepslate_diamond_ore", "minecraft:ancient_debris"]
+
+
+class TestBlockSearcher(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        (self.temp_dir / "region").mkdir()
+        shutil.copy(SAMPLE, self.temp_dir / "region" / "r.-6.-6.mca")
+        self.corners = Corners(-180, -177, -180, -179)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _reference(self):
+        found = []
+        for chunk in ChunkManager(self.temp_dir, "Overworld").get_chunks(self.corners):
+            x, z = chunk.abs_cord.as_tuple
+            if not chunk.exists or not (-180 <= x <= -177 and -180 <= z <= -179):
+                continue
+            analyzer = ChunkAnalyzer(NBTTagReader(chunk.raw_data).read().value["sections"])
+            for name in TARGETS:
+                for y in range(-64, 320):
+                    for lz in range(16):
+                        for lx in range(16):
+                            if analyzer.get_block(lx, y, lz) == name:
+                                found.append((x * 16 + lx, y, z * 16 + lz))
+        return sorted(found)
+
+    def test_search_matches_full_parse(self):
+        searcher = BlockSearcher(ChunkManager(self.temp_dir, "Overworld"))
+        found = searcher.search_all(self.corners, TARGETS)
+        self.assertEqual(found.dtype, np.int32)
+        self.assertGreater(len(found), 0)
+        self.assertEqual(sorted(map(tuple, found.tolist())), self._reference())
+
+    def test_y_range(self):
+        searcher = BlockSearcher(ChunkManager(self.temp_dir, "Overworld"))
+        found = searcher.search_all(self.corners, TARGETS, min_y=-10, max_y=10)
+        self.assertTrue(((found[:, 1] >= -10) & (found[:, 1] <= 10)).all())
+
+    def test_absent_block(self):
+        searcher = BlockSearcher(ChunkManager(self.temp_dir, "Overworld"))
+        self.assertEqual(list(searcher.search(self.corners, ["minecraft:not_a_block"])), [])
+
+
+class TestPaletteIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        (self.temp_dir / "region").mkdir()
+        self.region_path = self.temp_dir / "region" / "r.-6.-6.mca"
+        shutil.copy(SAMPLE, self.region_path)
+        self.cache = self.temp_dir / "index"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_candidates_match_palettes(self):
+        registry = BlockRegistry()
+        with RawRegion(self.region_path, "Overworld") as raw:
+            index = PaletteIndex(self.cache, registry).get(raw)
+            region = McaParser().parse(raw)
+            targets = registry.remap(["minecraft:diamond_ore"])
+            expected = np.zeros(1024, dtype=bool)
+            for slot in np.flatnonzero(region.table["offset"]).tolist():
+                data = region.raw_chunks.by_index(slot).raw_data
+                expected[slot] = any(
+                    b.get("Name") == "minecraft:diamond_ore"
+                    for section in ChunkLayout(data).as_sections(names_only=True)
+                    for b in section["block_states"]["palette"]
+                )
+        self.assertTrue(expected.any())
+        self.assertEqual(index.candidate_chunks(targets).tolist(), expected.tolist())
+
+    def test_cache_reuse_and_invalidation(self):
+        index = PaletteIndex(self.cache)
+        with RawRegion(self.region_path, "Overworld") as raw:
+            index.get(raw)
+        path = index.index_path(self.region_path)
+        self.assertTrue(path.is_file())
+        built = path.stat().st_mtime_ns
+
+        with RawRegion(self.region_path, "Overworld") as raw:
+            index.get(raw)
+        self.assertEqual(path.stat().st_mtime_ns, built)
+
+        stat = self.region_path.stat()
+        os.utime(self.region_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        with RawRegion(self.region_path, "Overworld") as raw:
+            index.get(raw)
+        self.assertNotEqual(path.stat().st_mtime_ns, built)
+
+    def test_search_with_index(self):
+        corners = Corners(-180, -177, -180, -179)
+        plain = BlockSearcher(ChunkManager(self.temp_dir, "Overworld")).search_all(corners, TARGETS)
+        indexed = BlockSearcher(ChunkManager(self.temp_dir, "Overworld", index_dir=self.cache))
+        found = indexed.search_all(corners, TARGETS)
+        self.assertEqual(sorted(map(tuple, found.tolist())), sorted(map(tuple, plain.tolist())))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import unittest
+import tempfile
+import shutil
+import numpy as np
+from pathlib import Path
+from mc_chunk_analyzer.domain.models.Chunk import Corners, MISSING_BLOCK, MISSING_HEIGHT
+from mc_chunk_analyzer.domain.services.ChunkAnalyzer import NBTTagReader, ChunkLayout
+from mc_chunk_analyzer.domain.services.WorldHandler import (
+    GroundProjector, chunk_surface, project_raster, project_stream
+)
+from mc_chunk_analyzer.domain.services.utils import ChunkManager
+from mc_chunk_analyzer.domain.services.Heightmaps import (
+    heightmap_layout, unpack_heightmaps, surface_ys, world_range
+)
+
+SAMPLE = Path(__file__).resolve().parent.parent / "r.-6.-6.mca"
+
+
+class TestSurfaceRaster(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = Path(tempfile.mkdtemp())
+        (cls.temp_dir / "region").mkdir()
+        shutil.copy(SAMPLE, cls.temp_dir / "region" / "r.-6.-6.mca")
+        # угол области за краем сгенерированной части - часть чанков отсутствует
+        cls.corners = Corners(-185, -178, -184, -180)
+        cls.manager = ChunkManager(cls.temp_dir, "Overworld")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_projector_raster(self):
+        chunks = self.manager.get_chunks(self.corners)
+        raster = GroundProjector(chunks, cache=None).project()
+        self.assertEqual(raster.blocks.shape, (raster.shape[0] * 16, raster.shape[1] * 16))
+        self.assertEqual(raster.blocks.dtype, np.uint16)
+        self.assertEqual(raster.heights.dtype, np.int16)
+
+        existing = 0
+        for chunk in chunks:
+            zi, xi = chunk.abs_cord.z - raster.min_z, chunk.abs_cord.x - raster.min_x
+            tile = np.s_[zi * 16:zi * 16 + 16, xi * 16:xi * 16 + 16]
+            if not chunk.exists:
+                self.assertFalse(raster.present[zi, xi])
+                self.assertTrue((raster.blocks[tile] == MISSING_BLOCK).all())
+                self.assertTrue((raster.heights[tile] == MISSING_HEIGHT).all())
+                self.assertTrue(raster.masked_blocks().mask[tile].all())
+                continue
+            existing += 1
+            heights, blocks = chunk_surface(chunk.raw_data, chunk.dimension)
+            self.assertTrue(raster.present[zi, xi])
+            self.assertEqual(raster.blocks[tile].reshape(-1).tolist(), blocks.tolist())
+            self.assertEqual(raster.heights[tile].reshape(-1).tolist(), heights.tolist())
+        self.assertGreater(existing, 0)
+        self.assertLess(existing, len(chunks))
+
+    def test_parallel_raster_matches(self):
+        raster = project_raster(self.manager, self.corners)
+        self.assertEqual(raster.shape, (5, 8))
+        self.assertEqual((raster.min_x, raster.min_z), (-185, -184))
+
+        reference = GroundProjector(self.manager.get_chunks(self.corners), cache=None).project()
+        # GroundProjector охватывает и чанки отступа get_chunks
+        dz, dx = (raster.min_z - reference.min_z) * 16, (raster.min_x - reference.min_x) * 16
+        window = np.s_[dz:dz + raster.blocks.shape[0], dx:dx + raster.blocks.shape[1]]
+        self.assertTrue(np.array_equal(raster.blocks, reference.blocks[window]))
+        self.assertTrue(np.array_equal(raster.heights, reference.heights[window]))
+
+    def test_stream_matches_parallel(self):
+        streamed = project_stream(self.manager, self.corners)
+        raster = project_raster(self.manager, self.corners)
+        self.assertEqual((streamed.min_x, streamed.min_z), (raster.min_x, raster.min_z))
+        self.assertTrue(np.array_equal(streamed.blocks, raster.blocks))
+        self.assertTrue(np.array_equal(streamed.heights, raster.heights))
+        self.assertTrue(np.array_equal(streamed.present, raster.present))
+
+
+def pack(values, bits, spanning):
+    """Эталонная упаковка значений в long через битовую строку"""
+    if spanning:
+        stream = "".join(format(v, f"0{bits}b")[::-1] for v in values)
+        stream += "0" * (-len(stream) % 64)
+        chunks = [stream[i:i + 64] for i in range(0, len(stream), 64)]
+    else:
+        per_long = 64 // bits
+        chunks = ["".join(format(v, f"0{bits}b")[::-1] for v in values[i:i + per_long]).ljust(64, "0")
+                  for i in range(0, len(values), per_long)]
+    return np.array([int(c[::-1], 2) for c in chunks], dtype=np.uint64).view(np.int64)
+
+
+class TestHeightmaps(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        shutil.copy(SAMPLE, self.temp_dir / "r.-6.-6.mca")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_layouts(self):
+        rng = np.random.default_rng(5)
+        # (DataVersion, высота мира, ожидаемые bits, spanning, число long)
+        cases = [(4440, 384, 9, False, 37), (2230, 256, 9, True, 36),
+                 (3000, 1024, 11, False, 52), (3000, 4064, 12, False, 52), (1500, 2032, 11, True, 44)]
+        for data_version, height, bits, spanning, count in cases:
+            values = rng.integers(0, height + 1, (3, 256)).tolist()
+            longs = np.stack([pack(v, bits, spanning) for v in values])
+            self.assertEqual(longs.shape[1], count)
+            self.assertEqual(heightmap_layout(count, data_version, height), (bits, spanning))
+            self.assertEqual(unpack_heightmaps(longs, bits, spanning).tolist(), values)
+        # без высоты мира 52 long не различить: 11 или 12 бит
+        with self.assertRaises(ValueError):
+            heightmap_layout(52, 3000, 384)
+        self.assertEqual(heightmap_layout(44, 1500, 256), (11, True))
+
+    def test_datapack_height(self):
+        values = (np.arange(256) * 15).tolist()
+        longs = [pack(values, 12, False)] * 2
+        ys, valid = surface_ys(longs, [3000, 3000], [-4, -4], "Overworld", [4064, None])
+        self.assertEqual(valid.tolist(), [True, False])
+        self.assertEqual(ys[0].tolist(), [v - 65 for v in values])
+
+    def test_surface_ys(self):
+        values = np.arange(256) % 300
+        longs = [pack(values.tolist(), 9, False), None, pack(values.tolist(), 9, True)]
+        ys, valid = surface_ys(longs, [4440, 4440, 2200], [-4, None, None], "Overworld")
+        self.assertEqual(valid.tolist(), [True, False, True])
+        self.assertEqual(ys[0].tolist(), (values - 65).tolist())
+        self.assertEqual(ys[2].tolist(), (values - 1).tolist())
+        self.assertEqual(world_range("Nether", 4440), (0, 256))
+        self.assertEqual(world_range("Overworld", 2000), (0, 256))
+
+    def test_sample_heightmaps(self):
+        chunk = next(c for c in ChunkManager(self.temp_dir, "Overworld").get_chunks(Corners(-180, -180, -180, -180))
+                     if c.exists)
+        full = NBTTagReader(chunk.raw_data).read().value
+        ys, valid = surface_ys([np.array(full["Heightmaps"]["WORLD_SURFACE"])], [full["DataVersion"]],
+                               [full["yPos"]], "Overworld")
+        layout = ChunkLayout(chunk.raw_data)
+        self.assertEqual((layout.data_version, layout.y_pos), (full["DataVersion"], full["yPos"]))
+        self.assertEqual(layout.height, 384)
+        self.assertTrue(valid[0])
+        # обратная упаковка: высота над дном мира -64, на единицу выше верхнего блока
+        self.assertEqual(pack((ys[0] + 65).tolist(), 9, False).tolist(), full["Heightmaps"]["WORLD_SURFACE"])
+        heights, _ = chunk_surface(chunk.raw_data, "Overworld")
+        self.assertEqual(heights.tolist(), ys[0].tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
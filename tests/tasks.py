@@ -0,0 +1,135 @@
+import unittest
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from mc_chunk_analyzer.presentation.models.events import Event
+from mc_chunk_analyzer.presentation.utils import EventBus
+from mc_chunk_analyzer.presentation.TaskRunner import TaskRunner
+from mc_chunk_analyzer.presentation.jobs import survey_world
+from mc_chunk_analyzer.infrastructure.fs.services import WorldInfo
+
+SAMPLE = Path(__file__).resolve().parent.parent / "r.-6.-6.mca"
+
+
+class Loop:
+    """after() без Tk: отложенные вызовы выполняет run_until"""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, fn):
+        self.pending.append(fn)
+
+    def run_until(self, condition, timeout=30):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                raise TimeoutError
+            pending, self.pending = self.pending, []
+            for fn in pending:
+                fn()
+            time.sleep(0.01)
+
+
+class TestTaskRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = Loop()
+        self.bus = EventBus()
+        self.events = []
+        for event in (Event.TASK_PROGRESS, Event.TASK_FINISHED, Event.TASK_FAILED, Event.TASK_CANCELLED):
+            self.bus.subscribe(event, lambda event=event, **payload: self.events.append((event, payload)))
+        self.runner = TaskRunner(self.loop, self.bus)
+        self.main_thread = threading.get_ident()
+
+    def kinds(self):
+        return [event for event, _ in self.events]
+
+    def test_progress_and_result_on_loop_thread(self):
+        threads = []
+        self.bus.subscribe(Event.TASK_FINISHED, lambda **payload: threads.append(threading.get_ident()))
+
+        def job(context):
+            self.assertNotEqual(threading.get_ident(), self.main_thread)
+            for i in range(1, 5):
+                context.progress(i / 4, i * 10)
+            return "done"
+
+        task_id = self.runner.submit(job)
+        self.loop.run_until(lambda: not self.runner.busy)
+        self.assertEqual(threads, [self.main_thread])
+        self.assertEqual(self.kinds()[-1], Event.TASK_FINISHED)
+        self.assertEqual(self.events[-1][1]["result"], "done")
+        progress = [payload for event, payload in self.events if event is Event.TASK_PROGRESS]
+        # накопившийся прогресс схлопывается до последнего
+        self.assertEqual((progress[-1]["task_id"], progress[-1]["done"], progress[-1]["chunks"]), (task_id, 1.0, 40))
+        self.assertEqual(progress[-1]["eta"], 0)
+
+    def test_new_task_cancels_current(self):
+        started, release = threading.Event(), threading.Event()
+        seen = []
+
+        def slow(context):
+            started.set()
+            release.wait(5)
+            seen.append(context.cancelled)
+            context.progress(0.5, 1)
+            context.check()
+            return "stale"
+
+        first = self.runner.submit(slow)
+        started.wait(5)
+        second = self.runner.submit(lambda context: "fresh")
+        release.set()
+        self.runner.join(5)
+        self.loop.run_until(lambda: not self.runner.busy)
+        time.sleep(0.05)
+        self.loop.run_until(lambda: not self.loop.pending)
+
+        self.assertEqual(seen, [True])
+        self.assertEqual(self.events[0], (Event.TASK_CANCELLED, {"task_id": first}))
+        self.assertEqual([p["task_id"] for _, p in self.events[1:]], [second])
+        self.assertEqual(self.events[-1][1]["result"], "fresh")
+
+    def test_failure(self):
+        self.runner.submit(lambda context: 1 / 0)
+        self.loop.run_until(lambda: not self.runner.busy)
+        self.assertEqual(self.kinds(), [Event.TASK_FAILED])
+        self.assertIn("ZeroDivisionError", self.events[0][1]["error"])
+
+
+class TestSurveyWorld(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        (self.temp_dir / "region").mkdir()
+        (self.temp_dir / "DIM-1").mkdir()
+        for name in ("r.-6.-6.mca", "r.-5.-6.mca"):
+            shutil.copy(SAMPLE, self.temp_dir / "region" / name)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_survey(self):
+        loop, bus, events = Loop(), EventBus(), []
+        bus.subscribe(Event.TASK_PROGRESS, lambda **p: events.append(p))
+        bus.subscribe(Event.TASK_FINISHED, lambda **p: events.append(p))
+        runner = TaskRunner(loop, bus)
+        root = WorldInfo(self.temp_dir).path_to_dim("Over")
+        self.assertEqual(root, self.temp_dir)
+        self.assertEqual(WorldInfo(self.temp_dir).path_to_dim("Nether"), self.temp_dir / "DIM-1")
+        with self.assertRaises(FileNotFoundError):
+            WorldInfo(self.temp_dir).path_to_dim("End")
+
+        runner.submit(lambda context: survey_world(context, root, "Overworld", workers=2))
+        loop.run_until(lambda: not runner.busy, timeout=120)
+        result = events[-1]["result"]
+        self.assertEqual((result["regions"], result["chunks"]), (2, 2 * 387))
+        self.assertLessEqual(sum(n for _, n in result["blocks"]), 2 * 387 * 256)
+        self.assertEqual(events[-2]["done"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()